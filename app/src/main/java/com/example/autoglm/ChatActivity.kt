@@ -2160,6 +2160,8 @@ class ChatActivity : ComponentActivity() {
                 val callback = AndroidAgentCallback(
                     onAction = { msg -> appendOrMergeActionText(msg) },
                     onScreenshotBase64 = { b64 ->
+                        // 画面与上一步相同：Python 侧只发送标记，不重复追加图片。
+                        if (b64.startsWith("[[FRAME_UNCHANGED]]")) return@AndroidAgentCallback
                         var used = b64
                         try {
                             val execEnv = ConfigManager(this@ChatActivity).getExecutionEnvironment()
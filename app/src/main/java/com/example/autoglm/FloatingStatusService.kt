@@ -3572,6 +3572,8 @@ class FloatingStatusService : Service() {
                     update(this@FloatingStatusService, display)
                 },
                 onScreenshotBase64 = { b64 ->
+                    // 画面与上一步相同：Python 侧只发送标记，不重复推送图片。
+                    if (b64.startsWith("[[FRAME_UNCHANGED]]")) return@AndroidAgentCallback
                     val bytes = try {
                         android.util.Base64.decode(b64, android.util.Base64.DEFAULT)
                     } catch (_: Exception) {
@@ -231,25 +231,36 @@ object VirtualDisplayController {
 
     private val asyncInputInjector by lazy { VirtualAsyncInputInjector() }
 
+    /**
+     * 注入前检查：displayId 有效、Shizuku 可用，且虚拟屏引擎仍在运行并且就是该 displayId。
+     * 不满足时注入器返回 false，Python 侧据此使缓存的 displayId 失效并重新准备虚拟屏。
+     */
+    private fun canInjectTo(displayId: Int): Boolean {
+        if (displayId <= 0) return false
+        if (!ShizukuBridge.pingBinder() || !ShizukuBridge.hasPermission()) return false
+        if (!ShizukuVirtualDisplayEngine.isStarted()) return false
+        return ShizukuVirtualDisplayEngine.getDisplayId() == displayId
+    }
+
+    /** @return 是否已成功下发事件（虚拟屏不可用或注入异常时返回 false）。 */
     @JvmStatic
-    fun injectTapBestEffort(displayId: Int, x: Int, y: Int) {
-        if (displayId <= 0) return
-        if (!ShizukuBridge.pingBinder() || !ShizukuBridge.hasPermission()) return
+    fun injectTapBestEffort(displayId: Int, x: Int, y: Int): Boolean {
+        if (!canInjectTo(displayId)) return false
         val downTime = android.os.SystemClock.uptimeMillis()
-        runCatching {
+        return runCatching {
             asyncInputInjector.injectSingleTouchAsync(displayId, downTime, x.toFloat(), y.toFloat(), android.view.MotionEvent.ACTION_DOWN)
             asyncInputInjector.injectSingleTouchAsync(displayId, downTime, x.toFloat(), y.toFloat(), android.view.MotionEvent.ACTION_UP)
-        }
+        }.isSuccess
     }
 
+    /** @return 是否已成功下发事件（虚拟屏不可用或注入异常时返回 false）。 */
     @JvmStatic
-    fun injectSwipeBestEffort(displayId: Int, startX: Int, startY: Int, endX: Int, endY: Int, durationMs: Long) {
-        if (displayId <= 0) return
-        if (!ShizukuBridge.pingBinder() || !ShizukuBridge.hasPermission()) return
+    fun injectSwipeBestEffort(displayId: Int, startX: Int, startY: Int, endX: Int, endY: Int, durationMs: Long): Boolean {
+        if (!canInjectTo(displayId)) return false
 
         val downTime = android.os.SystemClock.uptimeMillis()
         val dur = durationMs.coerceAtLeast(1)
-        runCatching {
+        return runCatching {
             asyncInputInjector.injectSingleTouchAsync(displayId, downTime, startX.toFloat(), startY.toFloat(), android.view.MotionEvent.ACTION_DOWN)
             val startTime = android.os.SystemClock.uptimeMillis()
             val endTime = startTime + dur
@@ -265,27 +276,27 @@ object VirtualDisplayController {
                 }
             }
             asyncInputInjector.injectSingleTouchAsync(displayId, downTime, endX.toFloat(), endY.toFloat(), android.view.MotionEvent.ACTION_UP)
-        }
+        }.isSuccess
     }
 
+    /** @return 是否已成功下发事件（虚拟屏不可用或注入异常时返回 false）。 */
     @JvmStatic
-    fun injectBackBestEffort(displayId: Int) {
-        if (displayId <= 0) return
-        if (!ShizukuBridge.pingBinder() || !ShizukuBridge.hasPermission()) return
-        runCatching {
+    fun injectBackBestEffort(displayId: Int): Boolean {
+        if (!canInjectTo(displayId)) return false
+        return runCatching {
             asyncInputInjector.injectKeyEventAsync(displayId, KeyEvent.KEYCODE_BACK, KeyEvent.ACTION_DOWN)
             asyncInputInjector.injectKeyEventAsync(displayId, KeyEvent.KEYCODE_BACK, KeyEvent.ACTION_UP)
-        }
+        }.isSuccess
     }
 
+    /** @return 是否已成功下发事件（虚拟屏不可用或注入异常时返回 false）。 */
     @JvmStatic
-    fun injectHomeBestEffort(displayId: Int) {
-        if (displayId <= 0) return
-        if (!ShizukuBridge.pingBinder() || !ShizukuBridge.hasPermission()) return
-        runCatching {
+    fun injectHomeBestEffort(displayId: Int): Boolean {
+        if (!canInjectTo(displayId)) return false
+        return runCatching {
             asyncInputInjector.injectKeyEventAsync(displayId, KeyEvent.KEYCODE_HOME, KeyEvent.ACTION_DOWN)
             asyncInputInjector.injectKeyEventAsync(displayId, KeyEvent.KEYCODE_HOME, KeyEvent.ACTION_UP)
-        }
+        }.isSuccess
     }
 
     fun hardResetOverlayAsync(context: Context) {
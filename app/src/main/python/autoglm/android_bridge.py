@@ -41,38 +41,34 @@ def run_task(task: str, callback: Any = None, internal_adb_path: str | None = No
         if internal_adb_path:
             os.environ["INTERNAL_ADB_PATH"] = str(internal_adb_path)
 
-        from phone_agent.adb import get_screenshot
         from phone_agent.adb.adb_path import set_internal_adb_path
         from phone_agent.agent import AgentConfig, PhoneAgent
         from phone_agent.model import ModelConfig
+        from phone_agent.observation import PreviewPublisher
 
         if internal_adb_path:
             set_internal_adb_path(str(internal_adb_path))
 
-        # 先截一张图，让用户实时看到 AI 在看什么
-        _safe_call(callback, "on_action", "正在查阅屏幕")
-        ss = get_screenshot(device_id=None)
-        _safe_call(callback, "on_screenshot", ss.base64_data)
-
-        _safe_call(callback, "on_action", "正在思考...")
-
         agent = PhoneAgent(
             model_config=ModelConfig(),
             agent_config=AgentConfig(max_steps=30, device_id=None, lang="cn", verbose=False),
         )
+        # UI 只收缩略图；画面未变化时只收一个 [[FRAME_UNCHANGED]] 标记。
+        preview = PreviewPublisher(lambda data: _safe_call(callback, "on_screenshot", data))
 
-        # step 循环：每一步前都推送截图，让聊天流里能看到 AI 的观察过程
+        # step 循环：每一步截一次图，同一份观测先推送给 UI 再交给 agent，避免重复截图
         first = True
         last_action_json = None
         for i in range(agent.agent_config.max_steps):
+            _safe_call(callback, "on_action", "正在查阅屏幕")
+            observation = agent.observe()
+            preview.publish(observation)
             if first:
-                step = agent.step(task)
+                _safe_call(callback, "on_action", "正在思考...")
+                step = agent.step(task, observation=observation)
                 first = False
             else:
-                _safe_call(callback, "on_action", "正在查阅屏幕")
-                ss = get_screenshot(device_id=None)
-                _safe_call(callback, "on_screenshot", ss.base64_data)
-                step = agent.step(None)
+                step = agent.step(None, observation=observation)
 
             if step.action is not None:
                 try:
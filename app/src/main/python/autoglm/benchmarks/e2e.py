@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of ``PhoneAgent`` against a mock device and a stub model.
+
+Runs the full agent loop with no phone attached: the ``mock`` device backend
+replays a recorded trajectory (or synthetic screens) with simulated call
+latencies, and a local OpenAI-compatible server streams scripted responses
+with a fixed time to first token and token rate.
+
+Reports the per-stage step latency, the loop overhead (step wall time minus
+simulated device I/O and simulated model time, i.e. what the framework itself
+costs per step), and peak memory. The stub server runs in this process, so
+its own CPU time (and GIL contention) is part of the measured overhead; with
+``--zero-latency`` that is the dominant share of the model stage.
+
+Usage:
+    python -m benchmarks.e2e --runs 5
+    python -m benchmarks.e2e --trajectory runs/run-20260101-120000-1-1 --ttft 0.5
+    python -m benchmarks.e2e --zero-latency --runs 20 --trace-memory
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import os
+import resource
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.jpeg_encode import _synthetic_screens
+from benchmarks.model_server import ScriptedModelServer
+from phone_agent.agent import AgentConfig, PhoneAgent
+from phone_agent.device_factory import DeviceType, set_device_type
+from phone_agent.mock import (
+    MockFrame,
+    MockLatency,
+    configure_mock_device,
+    get_mock_device,
+    load_trajectory,
+)
+from phone_agent.model import ModelClient, ModelConfig
+
+STAGES = (
+    "observe",
+    "observe_wait",
+    "screenshot",
+    "current_app",
+    "model_ttft",
+    "model",
+    "execute",
+    "step",
+)
+
+
+def _frames_from_images(count: int) -> list[MockFrame]:
+    frames = []
+    for image in _synthetic_screens(count, (1080, 2400), 0):
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, format="JPEG", quality=80)
+        data = buffer.getvalue()
+        frames.append(
+            MockFrame(
+                base64_data=base64.b64encode(data).decode("utf-8"),
+                mime="image/jpeg",
+                width=image.width,
+                height=image.height,
+                digest=hashlib.sha256(data).hexdigest()[:32],
+            )
+        )
+    return frames
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _run_task(
+    agent: PhoneAgent, server: ScriptedModelServer, task: str
+) -> list[dict[str, float]]:
+    device = get_mock_device(None)
+    device.reset()
+    server.reset()
+    agent.reset()
+
+    rows = []
+    first = True
+    while True:
+        io0, model0 = device.simulated_io, server.simulated_time
+        start = time.perf_counter()
+        result = agent.step(task if first else None)
+        wall = time.perf_counter() - start
+        first = False
+        row = dict(result.timings)
+        row["wall"] = wall
+        row["device_io"] = device.simulated_io - io0
+        row["model_sim"] = server.simulated_time - model0
+        row["overhead"] = wall - row["device_io"] - row["model_sim"]
+        rows.append(row)
+        if result.finished or agent.step_count >= agent.agent_config.max_steps:
+            return rows
+
+
+def _report(rows: list[dict[str, float]], pipelined: bool) -> None:
+    print(f"{'stage':<12} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for key in STAGES + ("device_io", "model_sim", "overhead"):
+        values = [row[key] for row in rows if key in row]
+        if not values:
+            continue
+        print(
+            f"{key:<12} {statistics.mean(values) * 1000:9.1f} "
+            f"{_percentile(values, 0.5) * 1000:9.1f} {_percentile(values, 0.95) * 1000:9.1f}"
+        )
+    if pipelined:
+        print(
+            "(pipelined: a step's capture starts once the previous action's post-action wait is over\n"
+            " and overlaps only the rest of that step; observe_wait is the capture time left on the\n"
+            " critical path. device_io includes overlapped I/O, so overhead is a lower bound)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="End-to-end agent loop benchmark without a phone"
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Number of task runs")
+    parser.add_argument("--trajectory", help="Recorded run directory to replay")
+    parser.add_argument(
+        "--ttft", type=float, default=0.3, help="Stub model time to first token"
+    )
+    parser.add_argument(
+        "--tps", type=float, default=40.0, help="Stub model tokens per second"
+    )
+    parser.add_argument(
+        "--zero-latency",
+        action="store_true",
+        help="No simulated device or model latency (pure framework cost)",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Pipelined agent mode (see AgentConfig.pipelined)",
+    )
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="Also report the tracemalloc peak"
+    )
+    parser.add_argument("--task", default="Check the Wi-Fi settings")
+    args = parser.parse_args()
+
+    script = None
+    if args.trajectory:
+        frames, script = load_trajectory(args.trajectory)
+    else:
+        frames = _frames_from_images(6)
+    latency = MockLatency.zero() if args.zero_latency else MockLatency()
+    configure_mock_device(frames=frames, latency=latency)
+    set_device_type(DeviceType.MOCK)
+
+    ttft, tps = (0.0, 0.0) if args.zero_latency else (args.ttft, args.tps)
+    if args.trace_memory:
+        tracemalloc.start()
+
+    with ScriptedModelServer(script=script, ttft=ttft, tokens_per_sec=tps) as server:
+        os.environ.pop("PHONE_AGENT_BASE_URL", None)
+        model_config = ModelConfig(
+            base_url=server.base_url, api_key="stub", model_name="stub", verbose=False
+        )
+        agent = PhoneAgent(
+            model_config=model_config,
+            agent_config=AgentConfig(
+                verbose=False, pipelined=args.pipelined, max_steps=50
+            ),
+            model_client=ModelClient(model_config),
+        )
+        rows: list[dict[str, float]] = []
+        start = time.perf_counter()
+        try:
+            for _ in range(args.runs):
+                rows.extend(_run_task(agent, server, args.task))
+        finally:
+            agent.close()
+        total = time.perf_counter() - start
+
+    print(
+        f"runs={args.runs} steps={len(rows)} frames={len(frames)} wall={total:.2f}s "
+        f"ttft={ttft}s tps={tps} latency={'zero' if args.zero_latency else 'default'}"
+    )
+    _report(rows, args.pipelined)
+    print(
+        f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB"
+    )
+    if args.trace_memory:
+        print(
+            f"peak Python heap (tracemalloc): {tracemalloc.get_traced_memory()[1] / 2**20:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
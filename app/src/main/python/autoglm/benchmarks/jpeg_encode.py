@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the screenshot JPEG target-size encoder.
+
+Compares the legacy binary-search encoder with JpegTargetEncoder over a
+corpus of screenshots and reports encodes per frame, output size and wall
+time per frame.
+
+Usage:
+    python -m benchmarks.jpeg_encode --corpus path/to/screenshots
+    python -m benchmarks.jpeg_encode --synthetic 30
+"""
+
+import argparse
+import random
+import statistics
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from phone_agent.imaging import JpegTargetEncoder
+
+
+def _legacy_encode(
+    img: Image.Image,
+    target_bytes: int = 25 * 1024,
+    min_quality: int = 25,
+    max_quality: int = 85,
+    min_scale: float = 0.35,
+) -> tuple[bytes, int]:
+    """The original binary-search encoder, kept here as the baseline."""
+    encodes = 0
+
+    def _to_rgb(im: Image.Image) -> Image.Image:
+        if im.mode in ("RGB",):
+            return im
+        if im.mode in ("RGBA", "LA"):
+            bg = Image.new("RGB", im.size, (0, 0, 0))
+            bg.paste(im, mask=im.split()[-1])
+            return bg
+        return im.convert("RGB")
+
+    def _encode(im: Image.Image, quality: int) -> bytes:
+        nonlocal encodes
+        encodes += 1
+        buf = BytesIO()
+        _to_rgb(im).save(
+            buf, format="JPEG", quality=int(quality), optimize=True, progressive=True
+        )
+        return buf.getvalue()
+
+    working = img
+    scale = 1.0
+    while True:
+        lo, hi = int(min_quality), int(max_quality)
+        best = _encode(working, hi)
+        if len(best) <= target_bytes:
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                b = _encode(working, mid)
+                if len(b) <= target_bytes:
+                    best = b
+                    lo = mid + 1
+                else:
+                    hi = mid - 1
+            return best, encodes
+
+        best = _encode(working, lo)
+        if len(best) <= target_bytes:
+            lo2, hi2 = lo, int(max_quality)
+            while lo2 <= hi2:
+                mid = (lo2 + hi2) // 2
+                b = _encode(working, mid)
+                if len(b) <= target_bytes:
+                    best = b
+                    lo2 = mid + 1
+                else:
+                    hi2 = mid - 1
+            return best, encodes
+
+        if scale <= min_scale:
+            return best, encodes
+
+        scale *= 0.85
+        new_w = max(1, int(img.size[0] * scale))
+        new_h = max(1, int(img.size[1] * scale))
+        working = img.resize((new_w, new_h), resample=Image.BILINEAR)
+
+
+def _synthetic_screens(
+    count: int, size: tuple[int, int], seed: int
+) -> list[Image.Image]:
+    """Generate UI-like frames: toolbars, list rows, text-ish noise, a photo block."""
+    rng = random.Random(seed)
+    frames = []
+    w, h = size
+    for _ in range(count):
+        img = Image.new("RGBA", size, (250, 250, 250, 255))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle([0, 0, w, 160], fill=(rng.randint(0, 80), 120, 200, 255))
+        y = 200
+        while y < h - 200:
+            row_h = rng.randint(120, 260)
+            draw.rectangle(
+                [40, y, 200, y + row_h - 40], fill=(rng.randint(0, 255), 180, 90, 255)
+            )
+            for line in range(rng.randint(1, 4)):
+                x0 = 240
+                ty = y + 10 + line * 40
+                while x0 < w - 80:
+                    word = rng.randint(20, 90)
+                    draw.rectangle([x0, ty, x0 + word, ty + 22], fill=(40, 40, 40, 255))
+                    x0 += word + 14
+            y += row_h
+        photo = Image.effect_noise((w // 2, h // 6), rng.randint(20, 80)).convert(
+            "RGBA"
+        )
+        img.paste(photo, (w // 4, h // 2))
+        frames.append(img)
+    return frames
+
+
+def _load_corpus(path: Path) -> list[Image.Image]:
+    frames = []
+    for p in sorted(path.iterdir()):
+        if p.suffix.lower() in (".png", ".jpg", ".jpeg", ".webp"):
+            with Image.open(p) as im:
+                im.load()
+                frames.append(im.copy())
+    return frames
+
+
+def _report(
+    name: str, times: list[float], encodes: list[int], sizes: list[int]
+) -> None:
+    print(
+        f"{name:<10} frames={len(times):<4} "
+        f"encodes/frame={statistics.mean(encodes):5.2f} (max {max(encodes)})  "
+        f"ms/frame mean={statistics.mean(times) * 1000:7.1f} "
+        f"p95={sorted(times)[int(0.95 * (len(times) - 1))] * 1000:7.1f}  "
+        f"avg KiB={statistics.mean(sizes) / 1024:5.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JPEG target-size encoder benchmark")
+    parser.add_argument("--corpus", type=Path, help="Directory of sample screenshots")
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=20,
+        help="Synthetic frames if no corpus (default: 20)",
+    )
+    parser.add_argument("--target-kib", type=int, default=25, help="Target size in KiB")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.corpus:
+        frames = _load_corpus(args.corpus)
+    else:
+        frames = _synthetic_screens(args.synthetic, (1080, 2400), args.seed)
+    if not frames:
+        raise SystemExit("No frames to benchmark")
+
+    target = args.target_kib * 1024
+
+    times, encodes, sizes = [], [], []
+    for img in frames:
+        start = time.perf_counter()
+        data, n = _legacy_encode(img, target_bytes=target)
+        times.append(time.perf_counter() - start)
+        encodes.append(n)
+        sizes.append(len(data))
+    _report("legacy", times, encodes, sizes)
+
+    encoder = JpegTargetEncoder(target_bytes=target)
+    times, encodes, sizes = [], [], []
+    for img in frames:
+        start = time.perf_counter()
+        data, _ = encoder.encode(img, key="bench")
+        times.append(time.perf_counter() - start)
+        encodes.append(encoder.last_encodes)
+        sizes.append(len(data))
+    _report("predictive", times, encodes, sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stub server that streams scripted responses.
+
+``POST /v1/chat/completions`` with ``stream: true`` answers with the next
+response of the script as server-sent events: the first chunk after
+``ttft`` seconds, then one chunk per token at ``tokens_per_sec``. Tokens are
+approximated as ``chars_per_token`` characters. Connections are kept alive
+(chunked transfer encoding), and a client closing the stream early (early
+stop) is handled like a real server: generation simply stops.
+
+The script is either a list of raw model outputs, the ``raw_content`` of a
+recorded trajectory, or a built-in sequence of actions ending in finish.
+
+Usage:
+    python -m benchmarks.model_server --port 8765 --ttft 0.4 --tps 40
+    python -m benchmarks.model_server --trajectory runs/run-20260101-120000-1-1
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SCRIPT = [
+    "<think>The task needs the Settings app, which is not open yet. I will launch it first.</think>"
+    '<answer>do(action="Launch", app="Settings")</answer>',
+    "<think>Settings is open. The Wi-Fi entry is near the top of the list, I will tap it.</think>"
+    '<answer>do(action="Tap", element=[500, 220])</answer>',
+    "<think>The Wi-Fi page is shown. I need to scroll down to see the list of networks.</think>"
+    '<answer>do(action="Swipe", start=[500, 800], end=[500, 300])</answer>',
+    "<think>The search field is focused, I will type the network name.</think>"
+    '<answer>do(action="Type", text="HomeNetwork")</answer>',
+    "<think>The network settings are visible. I will go back to the previous page.</think>"
+    '<answer>do(action="Back")</answer>',
+    "<think>The task is complete.</think>"
+    '<answer>finish(message="Wi-Fi settings checked")</answer>',
+]
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that stop early reset their connection; that is expected.
+        pass
+
+
+class ScriptedModelServer:
+    """
+    Threaded stub server; use as a context manager or call start/stop.
+
+    Args:
+        script: Raw model outputs, served in order and cycled.
+        ttft: Seconds before the first chunk.
+        tokens_per_sec: Streaming rate after the first chunk.
+        chars_per_token: Characters per simulated token.
+        host: Bind address.
+        port: Bind port (0 picks a free one).
+
+    Example:
+        >>> with ScriptedModelServer(ttft=0.2, tokens_per_sec=50) as server:
+        ...     config = ModelConfig(base_url=server.base_url)
+    """
+
+    def __init__(
+        self,
+        script: list[str] | None = None,
+        ttft: float = 0.3,
+        tokens_per_sec: float = 40.0,
+        chars_per_token: int = 3,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.script = list(script or DEFAULT_SCRIPT)
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.chars_per_token = max(1, chars_per_token)
+        self.requests = 0
+        self.simulated_time = 0.0  # Seconds spent in scripted waits
+        self._lock = threading.Lock()
+        self._next = itertools.cycle(range(len(self.script)))
+        self._server = _QuietServer((host, port), self._handler_class())
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "ScriptedModelServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="model-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self) -> None:
+        """Start again at the first response of the script."""
+        with self._lock:
+            self._next = itertools.cycle(range(len(self.script)))
+
+    def __enter__(self) -> "ScriptedModelServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _take(self) -> str:
+        with self._lock:
+            self.requests += 1
+            return self.script[next(self._next)]
+
+    def _sleep(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        time.sleep(seconds)
+        with self._lock:
+            self.simulated_time += seconds
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _write_chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                body = json.dumps(
+                    {"object": "list", "data": [{"id": "stub", "object": "model"}]}
+                )
+                self._send_json(body)
+
+            def _send_json(self, body: str) -> None:
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                content = server._take()
+                model = request.get("model", "stub")
+
+                step = server.chars_per_token
+                interval = (
+                    1.0 / server.tokens_per_sec if server.tokens_per_sec > 0 else 0.0
+                )
+
+                if not request.get("stream"):
+                    server._sleep(server.ttft + interval * (len(content) // step))
+                    self._send_json(
+                        json.dumps(
+                            {
+                                "id": "chatcmpl-stub",
+                                "object": "chat.completion",
+                                "created": int(time.time()),
+                                "model": model,
+                                "choices": [
+                                    {
+                                        "index": 0,
+                                        "message": {
+                                            "role": "assistant",
+                                            "content": content,
+                                        },
+                                        "finish_reason": "stop",
+                                    }
+                                ],
+                            }
+                        )
+                    )
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                try:
+                    server._sleep(server.ttft)
+                    for i in range(0, len(content), step):
+                        if i:
+                            server._sleep(interval)
+                        chunk = {
+                            "id": "chatcmpl-stub",
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": model,
+                            "choices": [
+                                {
+                                    "index": 0,
+                                    "delta": {"content": content[i : i + step]},
+                                    "finish_reason": None,
+                                }
+                            ],
+                        }
+                        self._write_chunk(
+                            f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+                        )
+                    self._write_chunk(b"data: [DONE]\n\n")
+                    self._write_chunk(b"")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading after the action (early stop).
+                    self.close_connection = True
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--ttft", type=float, default=0.3, help="Seconds to first token"
+    )
+    parser.add_argument("--tps", type=float, default=40.0, help="Tokens per second")
+    parser.add_argument(
+        "--trajectory", help="Serve the raw model outputs of a recorded run directory"
+    )
+    args = parser.parse_args()
+
+    script = None
+    if args.trajectory:
+        from phone_agent.mock import load_trajectory
+
+        script = load_trajectory(args.trajectory)[1]
+    server = ScriptedModelServer(
+        script=script,
+        ttft=args.ttft,
+        tokens_per_sec=args.tps,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Serving {len(server.script)} scripted responses at {server.base_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the PNG and raw ``screencap`` capture paths.
+
+With a device, captures frames through both paths and reports capture
+latency (adb round trip, including on-device encoding), bytes on the wire,
+host decode + JPEG encode time and host CPU time per frame.
+
+Without a device, synthetic frames are used: the PNG path is charged with a
+host-side PNG encode as a stand-in for the on-device one, and only host
+times are reported.
+
+Usage:
+    python -m benchmarks.screencap --device emulator-5554 --frames 10
+    python -m benchmarks.screencap --synthetic 10
+"""
+
+import argparse
+import os
+import statistics
+import struct
+import subprocess
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from benchmarks.jpeg_encode import _synthetic_screens
+from phone_agent.adb.adb_path import adb_prefix
+from phone_agent.imaging import JpegTargetEncoder, decode_raw_screencap
+
+
+def _cpu_time() -> float:
+    """Host CPU seconds of this process and its finished children (adb)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _capture(device_id: str | None, png: bool) -> bytes:
+    args = adb_prefix(device_id) + ["exec-out", "screencap"] + (["-p"] if png else [])
+    result = subprocess.run(args, capture_output=True, timeout=30)
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(f"screencap failed: {result.stderr!r}")
+    return result.stdout
+
+
+def _to_raw(img: Image.Image) -> bytes:
+    """Serialize a frame like ``screencap`` on Android 10+ (RGBA_8888)."""
+    rgba = img.convert("RGBA")
+    return struct.pack("<IIII", rgba.width, rgba.height, 1, 0) + rgba.tobytes()
+
+
+def _decode(data: bytes, png: bool, max_side: int | None) -> Image.Image:
+    if png:
+        img = Image.open(BytesIO(data))
+        img.load()
+        return img
+    return decode_raw_screencap(data, max_side=max_side)
+
+
+def _report(name: str, rows: list[dict[str, float]]) -> None:
+    def ms(key: str) -> float:
+        return statistics.mean(r[key] for r in rows) * 1000
+
+    print(
+        f"{name:<6} frames={len(rows):<4} "
+        f"capture ms={ms('capture'):7.1f}  "
+        f"decode ms={ms('decode'):6.1f}  "
+        f"encode ms={ms('encode'):6.1f}  "
+        f"host cpu ms={ms('cpu'):7.1f}  "
+        f"wire KiB={statistics.mean(r['bytes'] for r in rows) / 1024:8.1f}"
+    )
+
+
+def _run_device(
+    device_id: str | None, frames: int, png: bool, max_side: int | None
+) -> list:
+    encoder = JpegTargetEncoder()
+    rows = []
+    for _ in range(frames):
+        cpu0 = _cpu_time()
+        t0 = time.perf_counter()
+        data = _capture(device_id, png)
+        t1 = time.perf_counter()
+        img = _decode(data, png, max_side)
+        t2 = time.perf_counter()
+        encoder.encode(img, key=png)
+        t3 = time.perf_counter()
+        rows.append(
+            {
+                "capture": t1 - t0,
+                "decode": t2 - t1,
+                "encode": t3 - t2,
+                "cpu": _cpu_time() - cpu0,
+                "bytes": len(data),
+            }
+        )
+    return rows
+
+
+def _run_synthetic(images: list[Image.Image], png: bool, max_side: int | None) -> list:
+    encoder = JpegTargetEncoder()
+    rows = []
+    for image in images:
+        cpu0 = _cpu_time()
+        t0 = time.perf_counter()
+        if png:
+            buf = BytesIO()
+            image.save(buf, format="PNG")
+            data = buf.getvalue()
+        else:
+            data = _to_raw(image)
+        t1 = time.perf_counter()
+        img = _decode(data, png, max_side)
+        t2 = time.perf_counter()
+        encoder.encode(img, key=png)
+        t3 = time.perf_counter()
+        rows.append(
+            {
+                "capture": t1 - t0,
+                "decode": t2 - t1,
+                "encode": t3 - t2,
+                "cpu": _cpu_time() - cpu0,
+                "bytes": len(data),
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PNG vs raw screencap benchmark")
+    parser.add_argument("--device", help="ADB device ID (omit with --synthetic)")
+    parser.add_argument("--frames", type=int, default=10, help="Frames per path")
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=0,
+        help="Use N synthetic frames instead of a device",
+    )
+    parser.add_argument(
+        "--max-side",
+        type=int,
+        default=0,
+        help="Downscale raw frames to this longer side",
+    )
+    args = parser.parse_args()
+    max_side = args.max_side or None
+
+    if args.synthetic:
+        images = _synthetic_screens(args.synthetic, (1080, 2400), 0)
+        _report("png", _run_synthetic(images, True, max_side))
+        _report("raw", _run_synthetic(images, False, max_side))
+    else:
+        _report("png", _run_device(args.device, args.frames, True, max_side))
+        _report("raw", _run_device(args.device, args.frames, False, max_side))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ Environment Variables:
     PHONE_AGENT_API_KEY: API key for model authentication (default: empty)
     PHONE_AGENT_MAX_STEPS: Maximum steps per task (default: 100)
     PHONE_AGENT_DEVICE_ID: ADB device ID for multi-device setups
+    PHONE_AGENT_PIPELINED: Overlap screen capture with the previous step (default: false)
+    PHONE_AGENT_CONTEXT_BUDGET: Prompt tokens above which older steps are summarized (default: 0, never)
 """
 
 import argparse
@@ -33,6 +35,7 @@ from phone_agent.config.apps_harmonyos import list_supported_apps as list_harmon
 from phone_agent.config.apps_ios import list_supported_apps as list_ios_apps
 from phone_agent.device_factory import DeviceType, get_device_factory, set_device_type
 from phone_agent.model import ModelConfig
+from phone_agent.model.transport import get_openai_client
 from phone_agent.xctest import XCTestConnection
 from phone_agent.xctest import list_devices as list_ios_devices
 from phone_agent.adb.adb_path import INTERNAL_ADB_PATH, adb_prefix
@@ -303,8 +306,8 @@ def check_model_api(base_url: str, model_name: str, api_key: str = "EMPTY") -> b
         if OpenAI is None:
             raise RuntimeError("Missing Python package: openai")
 
-        # Create OpenAI client
-        client = OpenAI(base_url=base_url, api_key=api_key, timeout=30.0)
+        # Shared pooled client (same connections the agent will use)
+        client = get_openai_client(base_url, api_key).with_options(timeout=30.0)
 
         # Use chat completion to test connectivity (more universally supported than /models)
         response = client.chat.completions.create(
@@ -504,6 +507,39 @@ Examples:
         "--quiet", "-q", action="store_true", help="Suppress verbose output"
     )
 
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        default=os.getenv("PHONE_AGENT_PIPELINED", "false").lower()
+        in ("true", "1", "yes"),
+        help="Capture screenshot and foreground app concurrently, starting as soon as the previous action settles (Android/HarmonyOS)",
+    )
+
+    parser.add_argument(
+        "--fleet",
+        type=str,
+        metavar="TASKS_FILE",
+        help="Run tasks from a file (one per line) in parallel on all connected "
+        "devices, or on the comma-separated --device-id list (Android/HarmonyOS)",
+    )
+
+    parser.add_argument(
+        "--context-budget",
+        type=int,
+        default=int(os.getenv("PHONE_AGENT_CONTEXT_BUDGET", "0")),
+        help="Estimated prompt tokens above which older steps are summarized "
+        "(default: 0, never)",
+    )
+
+    parser.add_argument(
+        "--record",
+        type=str,
+        metavar="DIR",
+        default=os.getenv("PHONE_AGENT_RECORD_DIR"),
+        help="Record each step (prompt, model output, action, timings, screenshot) "
+        "to a run directory under DIR",
+    )
+
     parser.add_argument(
         "--list-apps", action="store_true", help="List supported apps and exit"
     )
@@ -691,6 +727,58 @@ def handle_device_commands(args) -> bool:
     return False
 
 
+def run_fleet(args, model_config: ModelConfig, device_type: DeviceType) -> None:
+    """Run a task file across several devices and print throughput."""
+    from phone_agent.fleet import FleetRunner
+
+    with open(args.fleet, encoding="utf-8") as f:
+        tasks = [
+            line.strip() for line in f if line.strip() and not line.startswith("#")
+        ]
+
+    device_ids = None
+    if args.device_id:
+        device_ids = [d.strip() for d in args.device_id.split(",") if d.strip()]
+
+    def on_result(result) -> None:
+        status = "✓" if result.success else "✗"
+        print(
+            f"{status} [{result.device_id}] {result.task} -> {result.message} "
+            f"({result.steps} steps, {result.duration:.1f}s)"
+        )
+
+    runner = FleetRunner(
+        device_ids=device_ids,
+        model_config=model_config,
+        agent_config=AgentConfig(
+            max_steps=args.max_steps,
+            verbose=False,
+            lang=args.lang,
+            pipelined=args.pipelined,
+            context_budget_tokens=args.context_budget,
+            record_dir=args.record,
+        ),
+        device_type=device_type,
+        on_result=on_result,
+    )
+    print(f"Running {len(tasks)} tasks on {len(runner.device_ids)} devices...")
+    report = runner.run(tasks)
+
+    summary = report.summary()
+    print("=" * 50)
+    print(
+        f"Tasks: {summary['tasks']} ({summary['failed']} failed), steps: {summary['steps']}"
+    )
+    print(f"Wall time: {summary['wall_time']:.1f}s")
+    print(
+        f"Throughput: {summary['tasks_per_hour']:.1f} tasks/hour, {summary['steps_per_sec']:.2f} steps/s"
+    )
+    print(
+        f"Step latency: p50={summary['step_p50']:.2f}s, p95={summary['step_p95']:.2f}s"
+    )
+    print("=" * 50)
+
+
 def main():
     """Main entry point."""
     args = parse_args()
@@ -762,6 +850,10 @@ def main():
         lang=args.lang,
     )
 
+    if args.fleet and device_type != DeviceType.IOS:
+        run_fleet(args, model_config, device_type)
+        return
+
     if device_type == DeviceType.IOS:
         # Create iOS agent
         agent_config = IOSAgentConfig(
@@ -770,6 +862,7 @@ def main():
             device_id=args.device_id,
             verbose=not args.quiet,
             lang=args.lang,
+            record_dir=args.record,
         )
 
         agent = IOSPhoneAgent(
@@ -783,6 +876,9 @@ def main():
             device_id=args.device_id,
             verbose=not args.quiet,
             lang=args.lang,
+            pipelined=args.pipelined,
+            context_budget_tokens=args.context_budget,
+            record_dir=args.record,
         )
 
         agent = PhoneAgent(
@@ -827,36 +923,39 @@ def main():
 
     print("=" * 50)
 
-    # Run with provided task or enter interactive mode
-    if args.task:
-        print(f"\nTask: {args.task}\n")
-        result = agent.run(args.task)
-        print(f"\nResult: {result}")
-    else:
-        # Interactive mode
-        print("\nEntering interactive mode. Type 'quit' to exit.\n")
+    try:
+        # Run with provided task or enter interactive mode
+        if args.task:
+            print(f"\nTask: {args.task}\n")
+            result = agent.run(args.task)
+            print(f"\nResult: {result}")
+        else:
+            # Interactive mode
+            print("\nEntering interactive mode. Type 'quit' to exit.\n")
 
-        while True:
-            try:
-                task = input("Enter your task: ").strip()
+            while True:
+                try:
+                    task = input("Enter your task: ").strip()
 
-                if task.lower() in ("quit", "exit", "q"):
-                    print("Goodbye!")
-                    break
+                    if task.lower() in ("quit", "exit", "q"):
+                        print("Goodbye!")
+                        break
 
-                if not task:
-                    continue
+                    if not task:
+                        continue
 
-                print()
-                result = agent.run(task)
-                print(f"\nResult: {result}\n")
-                agent.reset()
+                    print()
+                    result = agent.run(task)
+                    print(f"\nResult: {result}\n")
+                    agent.reset()
 
-            except KeyboardInterrupt:
-                print("\n\nInterrupted. Goodbye!")
-                break
-            except Exception as e:
-                print(f"\nError: {e}\n")
+                except KeyboardInterrupt:
+                    print("\n\nInterrupted. Goodbye!")
+                    break
+                except Exception as e:
+                    print(f"\nError: {e}\n")
+    finally:
+        agent.close()
 
 
 if __name__ == "__main__":
@@ -7,9 +7,12 @@ import time
 from dataclasses import dataclass
 from typing import Any, Callable
 
+from phone_agent import cancellation
 from phone_agent.config.timing import TIMING_CONFIG
-from phone_agent.device_factory import get_device_factory
-from phone_agent.adb.adb_path import adb_prefix
+from phone_agent.device_factory import DeviceFactory, get_device_factory
+from phone_agent.metrics import ACTION_SECONDS, ACTIONS
+from phone_agent.settle import wait_for_settle
+from phone_agent.adb.shell import run_shell
 
 
 @dataclass
@@ -31,6 +34,8 @@ class ActionHandler:
         confirmation_callback: Optional callback for sensitive action confirmation.
             Should return True to proceed, False to cancel.
         takeover_callback: Optional callback for takeover requests (login, captcha).
+        device_factory: Device backend to use; defaults to the global factory.
+            Pass a dedicated instance to drive several devices in one process.
     """
 
     def __init__(
@@ -38,13 +43,22 @@ class ActionHandler:
         device_id: str | None = None,
         confirmation_callback: Callable[[str], bool] | None = None,
         takeover_callback: Callable[[str], None] | None = None,
+        device_factory: DeviceFactory | None = None,
     ):
         self.device_id = device_id
+        self._device_factory = device_factory
+        self._keyboard = None
+        self._on_settled: Callable[[], None] | None = None
         self.confirmation_callback = confirmation_callback or self._default_confirmation
         self.takeover_callback = takeover_callback or self._default_takeover
 
     def execute(
-        self, action: dict[str, Any], screen_width: int, screen_height: int
+        self,
+        action: dict[str, Any],
+        screen_width: int,
+        screen_height: int,
+        cancel_token: cancellation.CancellationToken | None = None,
+        on_settled: Callable[[], None] | None = None,
     ) -> ActionResult:
         """
         Execute an action from the AI model.
@@ -53,10 +67,25 @@ class ActionHandler:
             action: The action dictionary from the model.
             screen_width: Current screen width in pixels.
             screen_height: Current screen height in pixels.
+            cancel_token: Interrupts device commands and waits of this
+                action; defaults to the token bound to the current context.
+            on_settled: Called once the action's post-action wait (settle
+                detection or fixed delay) is over, i.e. as soon as the
+                screen may be captured again, before the handler's own
+                bookkeeping. Not called for actions without a device effect.
 
         Returns:
             ActionResult indicating success and whether to finish.
+
+        Raises:
+            TaskCancelled: If the token was cancelled during the action.
         """
+        if cancel_token is not None:
+            with cancellation.use_token(cancel_token):
+                return self.execute(
+                    action, screen_width, screen_height, on_settled=on_settled
+                )
+
         action_type = action.get("_metadata")
 
         if action_type == "finish":
@@ -81,12 +110,53 @@ class ActionHandler:
                 message=f"Unknown action: {action_name}",
             )
 
+        start = time.perf_counter()
+        outcome = "error"
+        self._on_settled = on_settled
         try:
-            return handler_method(action, screen_width, screen_height)
+            result = handler_method(action, screen_width, screen_height)
+            outcome = "ok" if result.success else "failed"
+            return result
+        except cancellation.TaskCancelled:
+            outcome = "cancelled"
+            raise
         except Exception as e:
             return ActionResult(
                 success=False, should_finish=False, message=f"Action failed: {e}"
             )
+        finally:
+            self._on_settled = None
+            device = self.device_id or "default"
+            ACTION_SECONDS.observe(time.perf_counter() - start, action=action_name, device=device)
+            ACTIONS.inc(action=action_name, device=device, outcome=outcome)
+            if action_name not in self._NON_FOCUS_ACTIONS:
+                self._invalidate_current_app()
+
+    # Actions that never change the foreground app; all others invalidate
+    # the cached foreground app of the device. Wait is not one of them: the
+    # model waits exactly when a splash screen or redirect is switching apps.
+    _NON_FOCUS_ACTIONS = frozenset({"Note", "Call_API", "Interact"})
+
+    def _invalidate_current_app(self) -> None:
+        try:
+            self.device_factory.invalidate_current_app(self.device_id)
+        except Exception:
+            pass
+
+    def end_task(self) -> None:
+        """
+        Restore device state changed during the task (the input method).
+
+        Called from ``finally`` blocks, possibly after the task was cancelled,
+        so the restore runs with the cancellation token unbound.
+        """
+        keyboard, self._keyboard = self._keyboard, None
+        if keyboard is not None:
+            with cancellation.use_token(None):
+                try:
+                    keyboard.close()
+                except Exception:
+                    pass
 
     def _get_handler(self, action_name: str) -> Callable | None:
         """Get the handler method for an action."""
@@ -108,6 +178,45 @@ class ActionHandler:
         }
         return handlers.get(action_name)
 
+    @property
+    def device_factory(self) -> DeviceFactory:
+        """The device backend used by this handler."""
+        return self._device_factory or get_device_factory()
+
+    def _settle_enabled(self) -> bool:
+        """Whether post-action waits use settle detection instead of fixed delays."""
+        if not TIMING_CONFIG.settle.enabled:
+            return False
+        try:
+            return self.device_factory.supports_frame_fingerprint
+        except Exception:
+            return False
+
+    def _action_delay(self) -> float | None:
+        """Delay passed to device operations (None means the configured default)."""
+        return 0.0 if self._settle_enabled() else None
+
+    def _settle(self, action_type: str) -> None:
+        """Wait until the screen stops changing after an action, if enabled."""
+        if self._settle_enabled():
+            device_factory = self.device_factory
+            wait_for_settle(
+                action_type,
+                lambda: device_factory.get_frame_fingerprint(self.device_id),
+            )
+        # Without settle detection the fixed delay already ran inside the
+        # device operation.
+        self._notify_settled()
+
+    def _notify_settled(self) -> None:
+        """Run the ``on_settled`` callback of the current action (once)."""
+        callback, self._on_settled = self._on_settled, None
+        if callback is not None:
+            try:
+                callback()
+            except Exception:
+                pass
+
     def _convert_relative_to_absolute(
         self, element: list[int], screen_width: int, screen_height: int
     ) -> tuple[int, int]:
@@ -122,9 +231,12 @@ class ActionHandler:
         if not app_name:
             return ActionResult(False, False, "No app name specified")
 
-        device_factory = get_device_factory()
-        success = device_factory.launch_app(app_name, self.device_id)
+        device_factory = self.device_factory
+        success = device_factory.launch_app(
+            app_name, self.device_id, delay=self._action_delay()
+        )
         if success:
+            self._settle("Launch")
             return ActionResult(True, False)
 
         # 启动失败：结束当前任务并提示用户重新输入。
@@ -152,31 +264,21 @@ class ActionHandler:
                     message="User cancelled sensitive operation",
                 )
 
-        device_factory = get_device_factory()
-        device_factory.tap(x, y, self.device_id)
+        device_factory = self.device_factory
+        device_factory.tap(x, y, self.device_id, delay=self._action_delay())
+        self._settle("Tap")
         return ActionResult(True, False)
 
     def _handle_type(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle text input action."""
         text = action.get("text", "")
 
-        device_factory = get_device_factory()
-
-        # Switch to ADB keyboard
-        original_ime = device_factory.detect_and_set_adb_keyboard(self.device_id)
-        time.sleep(TIMING_CONFIG.action.keyboard_switch_delay)
-
-        # Clear existing text and type new text
-        device_factory.clear_text(self.device_id)
-        time.sleep(TIMING_CONFIG.action.text_clear_delay)
-
-        # Handle multiline text by splitting on newlines
-        device_factory.type_text(text, self.device_id)
-        time.sleep(TIMING_CONFIG.action.text_input_delay)
-
-        # Restore original keyboard
-        device_factory.restore_keyboard(original_ime, self.device_id)
-        time.sleep(TIMING_CONFIG.action.keyboard_restore_delay)
+        # The ADB keyboard stays active for the rest of the task; the
+        # original keyboard is restored by end_task().
+        if self._keyboard is None:
+            self._keyboard = self.device_factory.create_keyboard_session(self.device_id)
+        self._keyboard.enter_text(text, clear=True)
+        self._notify_settled()
 
         return ActionResult(True, False)
 
@@ -191,20 +293,30 @@ class ActionHandler:
         start_x, start_y = self._convert_relative_to_absolute(start, width, height)
         end_x, end_y = self._convert_relative_to_absolute(end, width, height)
 
-        device_factory = get_device_factory()
-        device_factory.swipe(start_x, start_y, end_x, end_y, device_id=self.device_id)
+        device_factory = self.device_factory
+        device_factory.swipe(
+            start_x,
+            start_y,
+            end_x,
+            end_y,
+            device_id=self.device_id,
+            delay=self._action_delay(),
+        )
+        self._settle("Swipe")
         return ActionResult(True, False)
 
     def _handle_back(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle back button action."""
-        device_factory = get_device_factory()
-        device_factory.back(self.device_id)
+        device_factory = self.device_factory
+        device_factory.back(self.device_id, delay=self._action_delay())
+        self._settle("Back")
         return ActionResult(True, False)
 
     def _handle_home(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle home button action."""
-        device_factory = get_device_factory()
-        device_factory.home(self.device_id)
+        device_factory = self.device_factory
+        device_factory.home(self.device_id, delay=self._action_delay())
+        self._settle("Home")
         return ActionResult(True, False)
 
     def _handle_double_tap(self, action: dict, width: int, height: int) -> ActionResult:
@@ -214,8 +326,9 @@ class ActionHandler:
             return ActionResult(False, False, "No element coordinates")
 
         x, y = self._convert_relative_to_absolute(element, width, height)
-        device_factory = get_device_factory()
-        device_factory.double_tap(x, y, self.device_id)
+        device_factory = self.device_factory
+        device_factory.double_tap(x, y, self.device_id, delay=self._action_delay())
+        self._settle("Double Tap")
         return ActionResult(True, False)
 
     def _handle_long_press(self, action: dict, width: int, height: int) -> ActionResult:
@@ -225,8 +338,11 @@ class ActionHandler:
             return ActionResult(False, False, "No element coordinates")
 
         x, y = self._convert_relative_to_absolute(element, width, height)
-        device_factory = get_device_factory()
-        device_factory.long_press(x, y, device_id=self.device_id)
+        device_factory = self.device_factory
+        device_factory.long_press(
+            x, y, device_id=self.device_id, delay=self._action_delay()
+        )
+        self._settle("Long Press")
         return ActionResult(True, False)
 
     def _handle_wait(self, action: dict, width: int, height: int) -> ActionResult:
@@ -237,12 +353,16 @@ class ActionHandler:
         except ValueError:
             duration = 1.0
 
-        time.sleep(duration)
+        cancellation.sleep(duration)
+        self._notify_settled()
         return ActionResult(True, False)
 
     def _handle_takeover(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle takeover request (login, captcha, etc.)."""
         message = action.get("message", "User intervention required")
+        # The person taking over needs their own keyboard back; the next
+        # Type activates the ADB keyboard again.
+        self.end_task()
         self.takeover_callback(message)
         return ActionResult(True, False)
 
@@ -261,14 +381,15 @@ class ActionHandler:
     def _handle_interact(self, action: dict, width: int, height: int) -> ActionResult:
         """Handle interaction request (user choice needed)."""
         # This action signals that user input is needed
+        self.end_task()
         return ActionResult(True, False, message="User interaction required")
 
     def _send_keyevent(self, keycode: str) -> None:
         """Send a keyevent to the device."""
-        from phone_agent.device_factory import DeviceType, get_device_factory
+        from phone_agent.device_factory import DeviceType
         from phone_agent.hdc.connection import _run_hdc_command
 
-        device_factory = get_device_factory()
+        device_factory = self.device_factory
 
         # Handle HDC devices with HarmonyOS-specific keyEvent command
         if device_factory.device_type == DeviceType.HDC:
@@ -318,12 +439,7 @@ class ActionHandler:
                     )
         else:
             # ADB devices use standard input keyevent command
-            cmd_prefix = adb_prefix(self.device_id)
-            subprocess.run(
-                cmd_prefix + ["shell", "input", "keyevent", keycode],
-                capture_output=True,
-                text=True,
-            )
+            run_shell(["input", "keyevent", keycode], self.device_id)
 
     @staticmethod
     def _default_confirmation(message: str) -> bool:
@@ -337,12 +453,13 @@ class ActionHandler:
         input(f"{message}\nPress Enter after completing manual operation...")
 
 
-def parse_action(response: str) -> dict[str, Any]:
+def parse_action(response: str, verbose: bool = True) -> dict[str, Any]:
     """
     Parse action from model response.
 
     Args:
         response: Raw response string from the model.
+        verbose: Print the response being parsed.
 
     Returns:
         Parsed action dictionary.
@@ -350,7 +467,8 @@ def parse_action(response: str) -> dict[str, Any]:
     Raises:
         ValueError: If the response cannot be parsed.
     """
-    print(f"Parsing action: {response}")
+    if verbose:
+        print(f"Parsing action: {response}")
     try:
         response = response.strip()
         if response.startswith('do(action="Type"') or response.startswith(
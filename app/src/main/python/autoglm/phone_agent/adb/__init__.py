@@ -12,6 +12,7 @@ from phone_agent.adb.device import (
     double_tap,
     get_current_app,
     home,
+    invalidate_current_app,
     launch_app,
     long_press,
     swipe,
@@ -23,18 +24,32 @@ from phone_agent.adb.input import (
     restore_keyboard,
     type_text,
 )
-from phone_agent.adb.screenshot import get_screenshot
+from phone_agent.adb.keyboard import ADBKeyboardSession, create_keyboard_session
+from phone_agent.adb.launcher import LauncherIndex, get_launcher_index
+from phone_agent.adb.screenshot import get_frame_fingerprint, get_screenshot
+from phone_agent.adb.shell import ADBShellSession, close_shell_sessions, run_shell
+from phone_agent.adb.stream import (
+    FileSource,
+    ScreenrecordSource,
+    ScreenStream,
+    get_screen_stream,
+    stop_screen_streams,
+)
 
 __all__ = [
     # Screenshot
     "get_screenshot",
+    "get_frame_fingerprint",
     # Input
     "type_text",
     "clear_text",
     "detect_and_set_adb_keyboard",
     "restore_keyboard",
+    "ADBKeyboardSession",
+    "create_keyboard_session",
     # Device control
     "get_current_app",
+    "invalidate_current_app",
     "tap",
     "swipe",
     "back",
@@ -42,10 +57,22 @@ __all__ = [
     "double_tap",
     "long_press",
     "launch_app",
+    "LauncherIndex",
+    "get_launcher_index",
     # Connection management
     "ADBConnection",
     "DeviceInfo",
     "ConnectionType",
     "quick_connect",
     "list_devices",
+    # Persistent shell
+    "ADBShellSession",
+    "run_shell",
+    "close_shell_sessions",
+    # Screen streaming
+    "ScreenStream",
+    "ScreenrecordSource",
+    "FileSource",
+    "get_screen_stream",
+    "stop_screen_streams",
 ]
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import List, Optional
 
 
@@ -7,16 +8,25 @@ INTERNAL_ADB_PATH: str = os.environ.get("INTERNAL_ADB_PATH") or "adb"
 
 def set_internal_adb_path(path: str) -> None:
     global INTERNAL_ADB_PATH
+    changed = path != INTERNAL_ADB_PATH
     INTERNAL_ADB_PATH = path
+    if changed:
+        # 持久 shell 会话绑定的是旧的 adb 路径，切换后需要重建。
+        try:
+            from phone_agent.adb.shell import close_shell_sessions
 
+            close_shell_sessions()
+        except Exception:
+            pass
 
-def adb_prefix(device_id: Optional[str] = None) -> List[str]:
-    base = INTERNAL_ADB_PATH
+
+@lru_cache(maxsize=8)
+def _base_argv(base: str) -> tuple[str, ...]:
     # Android 上 filesDir 可能被挂载为 noexec，或脚本文件没有可执行权限。
     # 此时直接 exec 会报 PermissionError: [Errno 13]。
     # 统一用 /system/bin/sh 包装启动脚本，可绕过 exec 限制。
+    # 结果按路径缓存：每条命令都重新读取文件头会白白多一次 open()。
     try:
-        base_argv = [base]
         if base and "/" in base and os.path.exists(base):
             # 只要它不是 ELF（二进制），就认为是脚本包装器，强制用 sh。
             # 这样不依赖 X_OK/noexec 的行为差异，彻底避免 PermissionError。
@@ -28,10 +38,14 @@ def adb_prefix(device_id: Optional[str] = None) -> List[str]:
                 is_elf = False
 
             if not is_elf:
-                base_argv = ["/system/bin/sh", base]
+                return ("/system/bin/sh", base)
     except Exception:
-        base_argv = [base]
+        pass
+    return (base,)
 
+
+def adb_prefix(device_id: Optional[str] = None) -> List[str]:
+    base_argv = list(_base_argv(INTERNAL_ADB_PATH))
     if device_id:
         return base_argv + ["-s", device_id]
     return base_argv
@@ -311,6 +311,12 @@ class ADBConnection:
             Tuple of (success, message).
         """
         try:
+            # Persistent shells die with the server; drop them so the next
+            # command reconnects instead of writing into a dead pipe.
+            from phone_agent.adb.shell import close_shell_sessions
+
+            close_shell_sessions()
+
             # Kill server
             subprocess.run(
                 [self.adb_path, "kill-server"], capture_output=True, timeout=5
@@ -1,42 +1,63 @@
 """Device control utilities for Android automation."""
 
 import os
-import subprocess
-import time
 from typing import List, Optional, Tuple
 
+from phone_agent import cancellation
 from phone_agent.config.apps import APP_PACKAGES
 from phone_agent.config.timing import TIMING_CONFIG
 from phone_agent.adb.adb_path import adb_prefix, get_display_id
+from phone_agent.adb.launcher import launch_package
+from phone_agent.adb.shell import run_shell
+from phone_agent.foreground_app import ForegroundAppDetector
+from phone_agent.metrics import untimed
+
+
+# Lines naming the focused window / resumed activity; filtered on the device
+# so only a few hundred bytes cross the adb connection.
+_FOCUS_PATTERN = "'mCurrentFocus|mFocusedApp|topResumedActivity|mResumedActivity'"
+
+
+def _query_window_displays(device_id: str | None) -> str:
+    # Display section only (Android 10+), a small fraction of a full dump.
+    command = f"dumpsys window displays 2>/dev/null | grep -E {_FOCUS_PATTERN}"
+    return run_shell(command, device_id, timeout=5).stdout
+
+
+def _query_top_activity(device_id: str | None) -> str:
+    command = f"dumpsys activity activities 2>/dev/null | grep -E -m 2 {_FOCUS_PATTERN}"
+    return run_shell(command, device_id, timeout=5).stdout
+
+
+def _query_window_full(device_id: str | None) -> str:
+    command = f"dumpsys window 2>/dev/null | grep -E {_FOCUS_PATTERN}"
+    return run_shell(command, device_id, timeout=10).stdout
+
+
+_foreground = ForegroundAppDetector(
+    [_query_window_displays, _query_top_activity, _query_window_full]
+)
 
 
 def get_current_app(device_id: str | None = None) -> str:
     """
     Get the currently focused app name.
 
+    The result is cached until :func:`invalidate_current_app` is called for
+    the device (after any action that may change focus).
+
     Args:
         device_id: Optional ADB device ID for multi-device setups.
 
     Returns:
         The app name if recognized, otherwise "System Home".
     """
-    cmd_prefix = adb_prefix(device_id)
+    return _foreground.get(device_id)
 
-    result = subprocess.run(
-        cmd_prefix + ["shell", "dumpsys", "window"], capture_output=True, text=True, encoding="utf-8"
-    )
-    output = result.stdout
-    if not output:
-        raise ValueError("No output from dumpsys window")
-
-    # Parse window focus info
-    for line in output.split("\n"):
-        if "mCurrentFocus" in line or "mFocusedApp" in line:
-            for app_name, package in APP_PACKAGES.items():
-                if package in line:
-                    return app_name
 
-    return "System Home"
+def invalidate_current_app(device_id: str | None = None) -> None:
+    """Forget the cached foreground app of a device."""
+    _foreground.invalidate(device_id)
 
 
 def tap(
@@ -54,17 +75,9 @@ def tap(
     if delay is None:
         delay = TIMING_CONFIG.device.default_tap_delay
 
-    cmd_prefix = adb_prefix(device_id)
-    display_id = get_display_id()
-
-    subprocess.run(
-        cmd_prefix
-        + ["shell", "input"]
-        + (["-d", str(display_id)] if display_id else [])
-        + ["tap", str(x), str(y)],
-        capture_output=True,
-    )
-    time.sleep(delay)
+    run_shell(_input_cmd() + ["tap", str(x), str(y)], device_id)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def double_tap(
@@ -82,25 +95,11 @@ def double_tap(
     if delay is None:
         delay = TIMING_CONFIG.device.default_double_tap_delay
 
-    adb_prefix = _get_adb_prefix(device_id)
-    display_id = get_display_id()
-
-    subprocess.run(
-        adb_prefix
-        + ["shell", "input"]
-        + (["-d", str(display_id)] if display_id else [])
-        + ["tap", str(x), str(y)],
-        capture_output=True,
-    )
-    time.sleep(TIMING_CONFIG.device.double_tap_interval)
-    subprocess.run(
-        adb_prefix
-        + ["shell", "input"]
-        + (["-d", str(display_id)] if display_id else [])
-        + ["tap", str(x), str(y)],
-        capture_output=True,
-    )
-    time.sleep(delay)
+    run_shell(_input_cmd() + ["tap", str(x), str(y)], device_id)
+    cancellation.sleep(TIMING_CONFIG.device.double_tap_interval)
+    run_shell(_input_cmd() + ["tap", str(x), str(y)], device_id)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def long_press(
@@ -123,17 +122,13 @@ def long_press(
     if delay is None:
         delay = TIMING_CONFIG.device.default_long_press_delay
 
-    cmd_prefix = adb_prefix(device_id)
-    display_id = get_display_id()
-
-    subprocess.run(
-        cmd_prefix
-        + ["shell", "input"]
-        + (["-d", str(display_id)] if display_id else [])
+    run_shell(
+        _input_cmd()
         + ["swipe", str(x), str(y), str(x), str(y), str(duration_ms)],
-        capture_output=True,
+        device_id,
     )
-    time.sleep(delay)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def swipe(
@@ -160,23 +155,19 @@ def swipe(
     if delay is None:
         delay = TIMING_CONFIG.device.default_swipe_delay
 
-    cmd_prefix = adb_prefix(device_id)
-    display_id = get_display_id()
-
     if duration_ms is None:
         # Calculate duration based on distance
         dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
         duration_ms = int(dist_sq / 1000)
         duration_ms = max(1000, min(duration_ms, 2000))  # Clamp between 1000-2000ms
 
-    subprocess.run(
-        cmd_prefix
-        + ["shell", "input"]
-        + (["-d", str(display_id)] if display_id else [])
+    run_shell(
+        _input_cmd()
         + ["swipe", str(start_x), str(start_y), str(end_x), str(end_y), str(duration_ms)],
-        capture_output=True,
+        device_id,
     )
-    time.sleep(delay)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def back(device_id: str | None = None, delay: float | None = None) -> None:
@@ -190,17 +181,9 @@ def back(device_id: str | None = None, delay: float | None = None) -> None:
     if delay is None:
         delay = TIMING_CONFIG.device.default_back_delay
 
-    cmd_prefix = adb_prefix(device_id)
-    display_id = get_display_id()
-
-    subprocess.run(
-        cmd_prefix
-        + ["shell", "input"]
-        + (["-d", str(display_id)] if display_id else [])
-        + ["keyevent", "4"],
-        capture_output=True,
-    )
-    time.sleep(delay)
+    run_shell(_input_cmd() + ["keyevent", "4"], device_id)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def home(device_id: str | None = None, delay: float | None = None) -> None:
@@ -214,17 +197,9 @@ def home(device_id: str | None = None, delay: float | None = None) -> None:
     if delay is None:
         delay = TIMING_CONFIG.device.default_home_delay
 
-    cmd_prefix = adb_prefix(device_id)
-    display_id = get_display_id()
-
-    subprocess.run(
-        cmd_prefix
-        + ["shell", "input"]
-        + (["-d", str(display_id)] if display_id else [])
-        + ["keyevent", "KEYCODE_HOME"],
-        capture_output=True,
-    )
-    time.sleep(delay)
+    run_shell(_input_cmd() + ["keyevent", "KEYCODE_HOME"], device_id)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def launch_app(
@@ -244,18 +219,12 @@ def launch_app(
     if delay is None:
         delay = TIMING_CONFIG.device.default_launch_delay
 
-    cmd_prefix = adb_prefix(device_id)
     try:
-        from phone_agent.app_package_resolver import resolve_package, is_package_installed
+        from phone_agent.app_package_resolver import resolve_package
 
         package = resolve_package(app_name, device_id=device_id)
         if not package:
             return False
-        try:
-            if not is_package_installed(package, device_id=device_id):
-                return False
-        except Exception:
-            pass
     except Exception:
         if app_name not in APP_PACKAGES:
             return False
@@ -270,15 +239,31 @@ def launch_app(
             AdbBridge = jclass("com.example.autoglm.AdbBridge")
             ok = bool(AdbBridge.launchAppOnDisplay(str(package), int(display_id)))
             if ok:
-                time.sleep(delay)
+                with untimed():
+                    cancellation.sleep(delay)
                 return True
         except Exception:
             pass
 
-        subprocess.run(
-            cmd_prefix
-            + [
-                "shell",
+    # A cached launcher component means the package is installed: one
+    # "am start -W -n" replaces the package list check and monkey.
+    launched, _ = launch_package(package, device_id, display_id)
+    if launched:
+        with untimed():
+            cancellation.sleep(delay)
+        return True
+
+    try:
+        from phone_agent.app_package_resolver import is_package_installed
+
+        if not is_package_installed(package, device_id=device_id):
+            return False
+    except Exception:
+        pass
+
+    if display_id:
+        run_shell(
+            [
                 "am",
                 "start",
                 "--display",
@@ -290,15 +275,14 @@ def launch_app(
                 "-p",
                 package,
             ],
-            capture_output=True,
+            device_id,
         )
-        time.sleep(delay)
+        with untimed():
+            cancellation.sleep(delay)
         return True
 
-    subprocess.run(
-        cmd_prefix
-        + [
-            "shell",
+    run_shell(
+        [
             "monkey",
             "-p",
             package,
@@ -306,12 +290,19 @@ def launch_app(
             "android.intent.category.LAUNCHER",
             "1",
         ],
-        capture_output=True,
+        device_id,
     )
-    time.sleep(delay)
+    with untimed():
+        cancellation.sleep(delay)
     return True
 
 
+def _input_cmd() -> list[str]:
+    """Build the ``input`` command, targeting the configured display if any."""
+    display_id = get_display_id()
+    return ["input"] + (["-d", str(display_id)] if display_id else [])
+
+
 def _get_adb_prefix(device_id: str | None) -> list:
     """Backward-compatible wrapper. Prefer using adb_prefix directly."""
     return adb_prefix(device_id)
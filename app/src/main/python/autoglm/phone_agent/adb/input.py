@@ -1,10 +1,10 @@
 """Input utilities for Android device text input."""
 
 import base64
-import subprocess
 from typing import Optional
 
 from phone_agent.adb.adb_path import adb_prefix
+from phone_agent.adb.shell import run_shell
 
 
 def type_text(text: str, device_id: str | None = None) -> None:
@@ -19,23 +19,11 @@ def type_text(text: str, device_id: str | None = None) -> None:
         Requires ADB Keyboard to be installed on the device.
         See: https://github.com/nicnocquee/AdbKeyboard
     """
-    cmd_prefix = adb_prefix(device_id)
     encoded_text = base64.b64encode(text.encode("utf-8")).decode("utf-8")
 
-    subprocess.run(
-        cmd_prefix
-        + [
-            "shell",
-            "am",
-            "broadcast",
-            "-a",
-            "ADB_INPUT_B64",
-            "--es",
-            "msg",
-            encoded_text,
-        ],
-        capture_output=True,
-        text=True,
+    run_shell(
+        ["am", "broadcast", "-a", "ADB_INPUT_B64", "--es", "msg", encoded_text],
+        device_id,
     )
 
 
@@ -46,13 +34,7 @@ def clear_text(device_id: str | None = None) -> None:
     Args:
         device_id: Optional ADB device ID for multi-device setups.
     """
-    cmd_prefix = adb_prefix(device_id)
-
-    subprocess.run(
-        cmd_prefix + ["shell", "am", "broadcast", "-a", "ADB_CLEAR_TEXT"],
-        capture_output=True,
-        text=True,
-    )
+    run_shell(["am", "broadcast", "-a", "ADB_CLEAR_TEXT"], device_id)
 
 
 def detect_and_set_adb_keyboard(device_id: str | None = None) -> str:
@@ -65,23 +47,13 @@ def detect_and_set_adb_keyboard(device_id: str | None = None) -> str:
     Returns:
         The original keyboard IME identifier for later restoration.
     """
-    cmd_prefix = adb_prefix(device_id)
-
     # Get current IME
-    result = subprocess.run(
-        cmd_prefix + ["shell", "settings", "get", "secure", "default_input_method"],
-        capture_output=True,
-        text=True,
-    )
+    result = run_shell(["settings", "get", "secure", "default_input_method"], device_id)
     current_ime = (result.stdout + result.stderr).strip()
 
     # Switch to ADB Keyboard if not already set
     if "com.android.adbkeyboard/.AdbIME" not in current_ime:
-        subprocess.run(
-            cmd_prefix + ["shell", "ime", "set", "com.android.adbkeyboard/.AdbIME"],
-            capture_output=True,
-            text=True,
-        )
+        run_shell(["ime", "set", "com.android.adbkeyboard/.AdbIME"], device_id)
 
     # Warm up the keyboard
     type_text("", device_id)
@@ -97,11 +69,7 @@ def restore_keyboard(ime: str, device_id: str | None = None) -> None:
         ime: The IME identifier to restore.
         device_id: Optional ADB device ID for multi-device setups.
     """
-    cmd_prefix = adb_prefix(device_id)
-
-    subprocess.run(
-        cmd_prefix + ["shell", "ime", "set", ime], capture_output=True, text=True
-    )
+    run_shell(["ime", "set", ime], device_id)
 
 
 def _get_adb_prefix(device_id: str | None) -> list:
@@ -0,0 +1,77 @@
+"""ADB keyboard session with broadcast confirmation instead of fixed delays."""
+
+import base64
+import shlex
+import time
+
+from phone_agent import cancellation
+from phone_agent.adb.shell import run_shell
+from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.keyboard import KeyboardSession
+
+ADB_IME = "com.android.adbkeyboard/.AdbIME"
+
+_BROADCAST_DONE = "Broadcast completed"
+
+
+class ADBKeyboardSession(KeyboardSession):
+    """
+    Keyboard session for ADB devices.
+
+    ``am broadcast`` returns only after the keyboard's receiver handled the
+    intent, so its "Broadcast completed" line confirms each step and no
+    delays are needed. Clearing and typing go out in one shell invocation.
+    Switching waits until the input method service reports the ADB keyboard
+    as current, capped at ``keyboard_switch_delay``.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+
+    Example:
+        >>> session = ADBKeyboardSession("emulator-5554")
+        >>> session.enter_text("hello")
+        >>> session.close()
+    """
+
+    def __init__(self, device_id: str | None = None):
+        super().__init__(None, device_id)
+
+    def _shell(self, command: str) -> str:
+        result = run_shell(command, self.device_id, timeout=10)
+        return result.stdout or ""
+
+    def _switch(self) -> str:
+        current = self._shell("settings get secure default_input_method").strip()
+        if ADB_IME in current:
+            return current
+        self._shell(f"ime enable {ADB_IME} >/dev/null; ime set {ADB_IME}")
+
+        deadline = time.monotonic() + max(
+            TIMING_CONFIG.action.keyboard_switch_delay, 0.3
+        )
+        while time.monotonic() < deadline:
+            output = self._shell("dumpsys input_method | grep -m 1 mCurMethodId")
+            if ADB_IME in output:
+                break
+            cancellation.sleep(0.1)
+        return current
+
+    def _enter(self, text: str, clear: bool) -> None:
+        encoded = base64.b64encode(text.encode("utf-8")).decode("utf-8")
+        commands = []
+        if clear:
+            commands.append("am broadcast -a ADB_CLEAR_TEXT")
+        commands.append(
+            f"am broadcast -a ADB_INPUT_B64 --es msg {shlex.quote(encoded)}"
+        )
+        output = self._shell("; ".join(commands))
+        if output.count(_BROADCAST_DONE) < len(commands):
+            raise RuntimeError(f"ADB keyboard broadcast failed: {output.strip()[:200]}")
+
+    def _restore(self, ime: str) -> None:
+        self._shell(f"ime set {shlex.quote(ime)}")
+
+
+def create_keyboard_session(device_id: str | None = None) -> ADBKeyboardSession:
+    """Create a keyboard session for an ADB device."""
+    return ADBKeyboardSession(device_id)
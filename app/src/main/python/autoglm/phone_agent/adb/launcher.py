@@ -0,0 +1,186 @@
+"""Launcher-component index and direct ``am start -n`` launches."""
+
+import re
+import shlex
+import threading
+
+from phone_agent.adb.shell import run_shell
+from phone_agent.persistent_cache import JsonCache
+
+_COMPONENT_RE = re.compile(r"^([\w.]+)/([\w.$]+)$")
+_VERSION_RE = re.compile(r"versionCode=(\d+)")
+_TOTAL_TIME_RE = re.compile(r"TotalTime:\s*(\d+)")
+
+
+class LauncherIndex:
+    """
+    Per-device index of launcher activities, persisted across runs.
+
+    Entries are keyed by device serial and package and store the launcher
+    component and the package's versionCode at resolve time. An entry is
+    dropped (and resolved again) when launching it fails, e.g. after an
+    update renamed the activity.
+
+    Args:
+        cache: Backing store; defaults to ``adb_launchers.json`` in the
+            persistent cache directory.
+    """
+
+    def __init__(self, cache: JsonCache | None = None):
+        self.cache = cache or JsonCache("adb_launchers.json")
+        self._serials: dict[str | None, str] = {}
+        self._lock = threading.Lock()
+
+    def _serial(self, device_id: str | None) -> str:
+        if device_id:
+            return device_id
+        with self._lock:
+            serial = self._serials.get(device_id)
+        if serial is None:
+            try:
+                serial = run_shell(
+                    "getprop ro.serialno", device_id, timeout=5
+                ).stdout.strip()
+            except Exception:
+                serial = ""
+            serial = serial or "default"
+            with self._lock:
+                self._serials[device_id] = serial
+        return serial
+
+    def _key(self, package: str, device_id: str | None) -> str:
+        return f"{self._serial(device_id)}|{package}"
+
+    def get(self, package: str, device_id: str | None = None) -> dict | None:
+        """Get the cached entry of a package, if any."""
+        return self.cache.get(self._key(package, device_id))
+
+    def resolve(self, package: str, device_id: str | None = None) -> str | None:
+        """
+        Get the launcher component of a package, resolving it on a miss.
+
+        The component and the versionCode are queried in one shell command.
+
+        Args:
+            package: Package name.
+            device_id: Optional ADB device ID for multi-device setups.
+
+        Returns:
+            "pkg/cls" component, or None if the package is not installed or
+            has no launcher activity.
+        """
+        entry = self.get(package, device_id)
+        if entry and entry.get("component"):
+            return entry["component"]
+
+        quoted = shlex.quote(package)
+        command = (
+            "cmd package resolve-activity --brief "
+            f"-a android.intent.action.MAIN -c android.intent.category.LAUNCHER {quoted}; "
+            f"dumpsys package {quoted} | grep -m 1 versionCode"
+        )
+        try:
+            output = run_shell(command, device_id, timeout=10).stdout or ""
+        except Exception:
+            return None
+
+        component = None
+        for line in output.splitlines():
+            match = _COMPONENT_RE.match(line.strip())
+            if match and match.group(1) == package:
+                component = match.group(0)
+                break
+        if component is None:
+            return None
+
+        version = _VERSION_RE.search(output)
+        self.cache.set(
+            self._key(package, device_id),
+            {
+                "component": component,
+                "version": int(version.group(1)) if version else None,
+            },
+        )
+        return component
+
+    def record_launch(
+        self, package: str, launch_ms: int, device_id: str | None = None
+    ) -> None:
+        """Store the last measured launch time of a package."""
+        key = self._key(package, device_id)
+        entry = self.cache.get(key)
+        if entry:
+            self.cache.set(key, {**entry, "launch_ms": launch_ms})
+
+    def invalidate(self, package: str, device_id: str | None = None) -> None:
+        """Drop the entry of a package."""
+        self.cache.pop(self._key(package, device_id))
+
+
+_index = LauncherIndex()
+
+
+def get_launcher_index() -> LauncherIndex:
+    """Get the process-wide launcher index."""
+    return _index
+
+
+def start_component(
+    component: str, device_id: str | None = None, display_id: str | None = None
+) -> tuple[bool, int | None]:
+    """
+    Launch an activity with ``am start -W -n`` and wait for it to be drawn.
+
+    Args:
+        component: "pkg/cls" component.
+        device_id: Optional ADB device ID for multi-device setups.
+        display_id: Optional display to launch on.
+
+    Returns:
+        Tuple of (success, TotalTime in milliseconds if reported).
+    """
+    args = ["am", "start", "-W"]
+    if display_id:
+        args += ["--display", str(display_id)]
+    args += ["-n", component]
+    try:
+        result = run_shell(args, device_id, timeout=15)
+    except Exception:
+        return False, None
+    output = result.stdout or ""
+    if result.returncode != 0 or "Error" in output or "Status: ok" not in output:
+        return False, None
+    match = _TOTAL_TIME_RE.search(output)
+    return True, int(match.group(1)) if match else None
+
+
+def launch_package(
+    package: str, device_id: str | None = None, display_id: str | None = None
+) -> tuple[bool, int | None]:
+    """
+    Launch a package through its cached launcher component.
+
+    Args:
+        package: Package name.
+        device_id: Optional ADB device ID for multi-device setups.
+        display_id: Optional display to launch on.
+
+    Returns:
+        Tuple of (launched, TotalTime in milliseconds if reported). Not
+        launched means the package has no launcher activity or ``am start``
+        failed twice (with the cached and with a freshly resolved component).
+    """
+    index = get_launcher_index()
+    # A cached component may be stale; a freshly resolved one gets one try.
+    attempts = 2 if index.get(package, device_id) else 1
+    for _ in range(attempts):
+        component = index.resolve(package, device_id)
+        if component is None:
+            return False, None
+        ok, launch_ms = start_component(component, device_id, display_id)
+        if ok:
+            if launch_ms is not None:
+                index.record_launch(package, launch_ms, device_id)
+            return True, launch_ms
+        index.invalidate(package, device_id)
+    return False, None
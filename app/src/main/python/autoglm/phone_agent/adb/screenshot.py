@@ -2,34 +2,31 @@
 
 import base64
 import os
-import subprocess
 import tempfile
 import uuid
 from dataclasses import dataclass
 from io import BytesIO
-from typing import Tuple
+from typing import Any, Tuple
 
 from PIL import Image
 
 from phone_agent.adb.adb_path import adb_prefix, get_display_id
-
-
-def _is_likely_black_image(img: Image.Image) -> bool:
-    try:
-        rgb = img.convert("RGB")
-        w, h = rgb.size
-        tw, th = min(64, w), min(64, h)
-        thumb = rgb.resize((tw, th), resample=Image.BILINEAR)
-        pixels = thumb.getdata()
-        non_black = 0
-        for r, g, b in pixels:
-            if r > 10 or g > 10 or b > 10:
-                non_black += 1
-                if non_black >= 20:
-                    return False
-        return True
-    except Exception:
-        return True
+from phone_agent.adb.shell import run_shell
+from phone_agent.adb.stream import (
+    get_stream_fingerprint,
+    get_stream_screenshot,
+    stream_enabled,
+)
+from phone_agent.cancellation import run_process
+from phone_agent.command_executor import get_command_executor
+from phone_agent.imaging import (
+    decode_raw_screencap,
+    encode_jpeg_to_target,
+    fallback_frame,
+    is_likely_black_image,
+    parse_raw_screencap,
+)
+from phone_agent.metrics import SCREENCAP_SECONDS
 
 
 @dataclass
@@ -43,13 +40,14 @@ class Screenshot:
     is_sensitive: bool = False
 
 
-def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screenshot:
+def get_screenshot(device_id: str | None = None, timeout: float | None = None) -> Screenshot:
     """
     Capture a screenshot from the connected Android device.
 
     Args:
         device_id: Optional ADB device ID for multi-device setups.
-        timeout: Timeout in seconds for screenshot operations.
+        timeout: Timeout in seconds per capture attempt; defaults to the
+            ``screencap`` budget of the command executor.
 
     Returns:
         Screenshot object containing base64 data and dimensions.
@@ -60,6 +58,8 @@ def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screensho
     """
     cmd_prefix = adb_prefix(device_id)
     display_id = get_display_id()
+    device = device_id or "default"
+    executor = get_command_executor()
 
     try:
         java_available = False
@@ -69,17 +69,20 @@ def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screensho
             java_available = True
 
             VirtualDisplayController = jclass("com.example.autoglm.VirtualDisplayController")
-            b64 = str(VirtualDisplayController.screenshotPngBase64())
+            with SCREENCAP_SECONDS.time(mode="virtual_display", device=device):
+                b64 = str(VirtualDisplayController.screenshotPngBase64())
             if b64:
                 png_bytes = base64.b64decode(b64)
                 if len(png_bytes) < 2048:
                     raise ValueError("virtual display png too small")
                 img = Image.open(BytesIO(png_bytes))
-                if _is_likely_black_image(img):
+                if is_likely_black_image(img):
                     raise ValueError("virtual display screenshot is black")
                 width, height = img.size
 
-                jpeg_bytes, mime = _encode_jpeg_to_target(img, target_bytes=25 * 1024)
+                jpeg_bytes, mime = encode_jpeg_to_target(
+                    img, target_bytes=25 * 1024, key=device_id
+                )
                 base64_data = base64.b64encode(jpeg_bytes).decode("utf-8")
 
                 return Screenshot(
@@ -92,17 +95,20 @@ def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screensho
 
             AdbBridge = jclass("com.example.autoglm.AdbBridge")
             did = int(display_id) if display_id else None
-            b64 = str(AdbBridge.screencapPngBase64(did))
+            with SCREENCAP_SECONDS.time(mode="bridge", device=device):
+                b64 = str(AdbBridge.screencapPngBase64(did))
             if b64:
                 png_bytes = base64.b64decode(b64)
                 if len(png_bytes) < 2048:
                     raise ValueError("adb screencap png too small")
                 img = Image.open(BytesIO(png_bytes))
-                if _is_likely_black_image(img):
+                if is_likely_black_image(img):
                     raise ValueError("adb screencap screenshot is black")
                 width, height = img.size
 
-                jpeg_bytes, mime = _encode_jpeg_to_target(img, target_bytes=25 * 1024)
+                jpeg_bytes, mime = encode_jpeg_to_target(
+                    img, target_bytes=25 * 1024, key=device_id
+                )
                 base64_data = base64.b64encode(jpeg_bytes).decode("utf-8")
 
                 return Screenshot(
@@ -118,25 +124,54 @@ def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screensho
         if java_available:
             return _create_fallback_screenshot(is_sensitive=True)
 
-        screencap_args = ["exec-out", "screencap"]
-        if display_id:
-            screencap_args += ["-d", str(display_id)]
-        screencap_args += ["-p"]
+        if stream_enabled():
+            with SCREENCAP_SECONDS.time(mode="stream", device=device):
+                streamed = get_stream_screenshot(device_id)
+            if streamed is not None:
+                base64_data, mime, width, height = streamed
+                return Screenshot(
+                    base64_data=base64_data,
+                    width=width,
+                    height=height,
+                    mime=mime,
+                    is_sensitive=False,
+                )
 
-        result = subprocess.run(
-            cmd_prefix + screencap_args,
-            capture_output=True,
-            timeout=timeout,
-        )
+        img = None
+        if _use_raw_screencap(device_id):
+            with SCREENCAP_SECONDS.time(mode="raw", device=device):
+                img, width, height = executor.run(
+                    lambda t: _capture_raw(cmd_prefix, display_id, t),
+                    device_id=device_id,
+                    op="screencap",
+                    timeout=timeout,
+                )
+        if img is None:
+            screencap_args = ["exec-out", "screencap"]
+            if display_id:
+                screencap_args += ["-d", str(display_id)]
+            screencap_args += ["-p"]
+
+            with SCREENCAP_SECONDS.time(mode="png", device=device):
+                result = executor.run(
+                    lambda t: run_process(
+                        cmd_prefix + screencap_args, capture_output=True, timeout=t
+                    ),
+                    device_id=device_id,
+                    op="screencap",
+                    timeout=timeout,
+                )
 
-        png_bytes = result.stdout
-        if result.returncode != 0 or not png_bytes:
-            return _create_fallback_screenshot(is_sensitive=True)
+            png_bytes = result.stdout
+            if result.returncode != 0 or not png_bytes:
+                return _create_fallback_screenshot(is_sensitive=True)
 
-        img = Image.open(BytesIO(png_bytes))
-        width, height = img.size
+            img = Image.open(BytesIO(png_bytes))
+            width, height = img.size
 
-        jpeg_bytes, mime = _encode_jpeg_to_target(img, target_bytes=25 * 1024)
+        jpeg_bytes, mime = encode_jpeg_to_target(
+            img, target_bytes=25 * 1024, key=device_id
+        )
         base64_data = base64.b64encode(jpeg_bytes).decode("utf-8")
 
         return Screenshot(
@@ -152,6 +187,90 @@ def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screensho
         return _create_fallback_screenshot(is_sensitive=False)
 
 
+def _use_raw_screencap(device_id: str | None) -> bool:
+    """
+    Whether to capture raw framebuffers instead of PNGs.
+
+    ``PHONE_AGENT_SCREENCAP_MODE`` is "raw", "png" or "auto" (default). A raw
+    frame skips the on-device PNG encode but is ~5x larger on the wire, so
+    "auto" only uses it for USB devices, not for adb over TCP ("host:port").
+    """
+    mode = os.getenv("PHONE_AGENT_SCREENCAP_MODE", "auto").strip().lower()
+    if mode == "raw":
+        return True
+    if mode == "png":
+        return False
+    return not (device_id and ":" in device_id)
+
+
+def _screencap_max_side() -> int | None:
+    try:
+        return int(os.getenv("PHONE_AGENT_SCREENCAP_MAX_SIDE", "0")) or None
+    except ValueError:
+        return None
+
+
+def _capture_raw(
+    cmd_prefix: list, display_id: Any, timeout: float
+) -> tuple[Image.Image | None, int, int]:
+    """
+    Capture an uncompressed framebuffer with ``screencap`` (no ``-p``).
+
+    Returns:
+        Tuple of (image, device width, device height). The image may be
+        downscaled (``PHONE_AGENT_SCREENCAP_MAX_SIDE``); the dimensions are
+        always the device's. The image is None if the raw capture failed and
+        the caller should fall back to PNG.
+    """
+    screencap_args = ["exec-out", "screencap"]
+    if display_id:
+        screencap_args += ["-d", str(display_id)]
+
+    result = run_process(
+        cmd_prefix + screencap_args,
+        capture_output=True,
+        timeout=timeout,
+    )
+    if result.returncode != 0 or not result.stdout:
+        return None, 0, 0
+    try:
+        width, height, _, _ = parse_raw_screencap(result.stdout)
+        img = decode_raw_screencap(result.stdout, max_side=_screencap_max_side())
+    except ValueError:
+        return None, 0, 0
+    return img, width, height
+
+
+def get_frame_fingerprint(device_id: str | None = None) -> str | None:
+    """
+    Get a cheap fingerprint of the current frame for settle detection.
+
+    The raw framebuffer is hashed on the device, so only a 32-character
+    digest crosses the adb connection and no PNG encoding is involved.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+
+    Returns:
+        Hex digest of the frame, or None if it could not be computed.
+    """
+    if stream_enabled():
+        fingerprint = get_stream_fingerprint(device_id)
+        if fingerprint is not None:
+            return fingerprint
+
+    display_id = get_display_id()
+    command = "screencap" + (f" -d {display_id}" if display_id else "") + " | md5sum"
+    try:
+        result = run_shell(command, device_id, timeout=5)
+    except Exception:
+        return None
+    parts = (result.stdout or "").split()
+    if result.returncode != 0 or not parts or len(parts[0]) != 32:
+        return None
+    return parts[0]
+
+
 def _get_adb_prefix(device_id: str | None) -> list:
     """Backward-compatible wrapper. Prefer using adb_prefix directly."""
     return adb_prefix(device_id)
@@ -161,9 +280,7 @@ def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
     """Create a black fallback image when screenshot fails."""
     default_width, default_height = 1080, 2400
 
-    black_img = Image.new("RGB", (default_width, default_height), color="black")
-    jpeg_bytes, mime = _encode_jpeg_to_target(black_img, target_bytes=25 * 1024)
-    base64_data = base64.b64encode(jpeg_bytes).decode("utf-8")
+    base64_data, mime = fallback_frame(default_width, default_height)
 
     return Screenshot(
         base64_data=base64_data,
@@ -177,65 +294,7 @@ def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
 def _encode_jpeg_to_target(
     img: Image.Image,
     target_bytes: int = 25 * 1024,
-    min_quality: int = 25,
-    max_quality: int = 85,
-    min_scale: float = 0.35,
+    key: Any = None,
 ) -> tuple[bytes, str]:
-    def _to_rgb(im: Image.Image) -> Image.Image:
-        if im.mode in ("RGB",):
-            return im
-        if im.mode in ("RGBA", "LA"):
-            bg = Image.new("RGB", im.size, (0, 0, 0))
-            bg.paste(im, mask=im.split()[-1])
-            return bg
-        return im.convert("RGB")
-
-    def _encode(im: Image.Image, quality: int) -> bytes:
-        buf = BytesIO()
-        _to_rgb(im).save(
-            buf,
-            format="JPEG",
-            quality=int(quality),
-            optimize=True,
-            progressive=True,
-        )
-        return buf.getvalue()
-
-    working = img
-    scale = 1.0
-
-    while True:
-        lo, hi = int(min_quality), int(max_quality)
-        best = _encode(working, hi)
-
-        if len(best) <= target_bytes:
-            while lo <= hi:
-                mid = (lo + hi) // 2
-                b = _encode(working, mid)
-                if len(b) <= target_bytes:
-                    best = b
-                    lo = mid + 1
-                else:
-                    hi = mid - 1
-            return best, "image/jpeg"
-
-        best = _encode(working, lo)
-        if len(best) <= target_bytes:
-            lo2, hi2 = lo, int(max_quality)
-            while lo2 <= hi2:
-                mid = (lo2 + hi2) // 2
-                b = _encode(working, mid)
-                if len(b) <= target_bytes:
-                    best = b
-                    lo2 = mid + 1
-                else:
-                    hi2 = mid - 1
-            return best, "image/jpeg"
-
-        if scale <= min_scale:
-            return best, "image/jpeg"
-
-        scale *= 0.85
-        new_w = max(1, int(img.size[0] * scale))
-        new_h = max(1, int(img.size[1] * scale))
-        working = img.resize((new_w, new_h), resample=Image.BILINEAR)
+    """Backward-compatible wrapper. Prefer phone_agent.imaging directly."""
+    return encode_jpeg_to_target(img, target_bytes=target_bytes, key=key)
@@ -0,0 +1,314 @@
+"""Persistent ADB shell sessions for low-latency device commands.
+
+Spawning a fresh ``adb`` client per input event costs a process fork plus an
+adb-server handshake (80-200 ms on Android hosts). This module keeps one
+long-lived ``adb shell`` per device and writes commands into it over a pipe.
+Each command is followed by a sentinel line carrying its exit status, so the
+reader knows exactly where the command's output ends.
+
+If a session cannot be started, or dies while a command is in flight, the
+command falls back to the one-shot ``subprocess.run`` path.
+"""
+
+import atexit
+import os
+import shlex
+import subprocess
+import threading
+import uuid
+
+from phone_agent.adb.adb_path import adb_prefix
+from phone_agent.cancellation import current_token, run_process
+from phone_agent.command_executor import classify_command, get_command_executor
+
+
+def _persistent_shell_enabled() -> bool:
+    value = os.getenv("PHONE_AGENT_ADB_PERSISTENT_SHELL", "true")
+    return value.strip().lower() in ("true", "1", "yes")
+
+
+class ShellSessionError(RuntimeError):
+    """Raised when a persistent shell session is unusable."""
+
+
+class ADBShellSession:
+    """
+    A long-lived ``adb shell`` process for a single device.
+
+    Commands are serialized: one command is in flight at any time.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+
+    Example:
+        >>> session = ADBShellSession("emulator-5554")
+        >>> returncode, output = session.run("input tap 100 200")
+    """
+
+    def __init__(self, device_id: str | None = None):
+        self.device_id = device_id
+        self._marker = f"__PA_END_{uuid.uuid4().hex}__".encode("ascii")
+        self._proc: subprocess.Popen | None = None
+        self._reader: threading.Thread | None = None
+        self._buf = bytearray()
+        self._eof = False
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        """Whether the underlying adb process is running."""
+        return self._proc is not None and self._proc.poll() is None and not self._eof
+
+    def start(self) -> None:
+        """Start the adb shell process if it is not running yet."""
+        if self.alive:
+            return
+        self.close()
+        try:
+            proc = subprocess.Popen(
+                adb_prefix(self.device_id) + ["shell"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=0,
+            )
+        except OSError as e:
+            raise ShellSessionError(f"Failed to start adb shell: {e}") from e
+
+        with self._cond:
+            self._buf = bytearray()
+            self._eof = False
+        self._proc = proc
+        self._reader = threading.Thread(
+            target=self._read_loop,
+            args=(proc,),
+            name=f"adb-shell-{self.device_id or 'default'}",
+            daemon=True,
+        )
+        self._reader.start()
+
+    def _read_loop(self, proc: subprocess.Popen) -> None:
+        stdout = proc.stdout
+        try:
+            while True:
+                chunk = stdout.read(65536) if stdout else b""
+                if not chunk:
+                    break
+                with self._cond:
+                    if proc is not self._proc:
+                        break
+                    self._buf.extend(chunk)
+                    self._cond.notify_all()
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._cond:
+                if proc is self._proc:
+                    self._eof = True
+                self._cond.notify_all()
+
+    def _find_sentinel(self) -> tuple[int, int, int] | None:
+        """Locate the sentinel line; returns (output_end, line_end, exit_code)."""
+        needle = b"\n" + self._marker + b" "
+        idx = self._buf.find(needle)
+        if idx < 0:
+            return None
+        line_end = self._buf.find(b"\n", idx + len(needle))
+        if line_end < 0:
+            return None
+        status = self._buf[idx + len(needle) : line_end].strip()
+        try:
+            code = int(status)
+        except ValueError:
+            code = -1
+        return idx, line_end + 1, code
+
+    def run(self, command: str, timeout: float | None = None) -> tuple[int, str]:
+        """
+        Run a shell command inside the session.
+
+        Args:
+            command: Shell command line, executed by the device's ``sh``.
+            timeout: Seconds to wait for the command to finish (None waits forever).
+
+        Returns:
+            Tuple of (exit status, combined stdout/stderr text).
+
+        Raises:
+            ShellSessionError: If the session died before the command completed.
+            subprocess.TimeoutExpired: If the command did not finish in time.
+            TaskCancelled: If the current task was cancelled; the session is
+                closed, which kills the command on the device.
+        """
+        token = current_token()
+        with self._lock:
+            if token is not None:
+                token.raise_if_cancelled()
+            self.start()
+            proc = self._proc
+            # stdin is redirected so the command can never swallow the
+            # session's own command stream. The group applies the redirects
+            # to the whole command line, not just the last command of a
+            # pipeline or list. printf starts the sentinel on a fresh line
+            # even when the output has no trailing newline.
+            line = (
+                f"{{ {command}\n}} </dev/null 2>&1; "
+                f"printf '\\n%s %d\\n' {self._marker.decode('ascii')} $?\n"
+            )
+            try:
+                proc.stdin.write(line.encode("utf-8"))
+                proc.stdin.flush()
+            except (OSError, ValueError, AttributeError) as e:
+                self.close()
+                raise ShellSessionError(f"adb shell pipe closed: {e}") from e
+
+            remove_wake = token.on_cancel(self._wake) if token is not None else None
+            try:
+                with self._cond:
+                    found = self._cond.wait_for(
+                        lambda: self._find_sentinel() is not None
+                        or self._eof
+                        or (token is not None and token.cancelled),
+                        timeout=timeout,
+                    )
+                    sentinel = self._find_sentinel()
+                    if sentinel is None:
+                        eof = self._eof
+                    else:
+                        output_end, consumed, code = sentinel
+                        output = bytes(self._buf[:output_end])
+                        del self._buf[:consumed]
+            finally:
+                if remove_wake is not None:
+                    remove_wake()
+
+            if sentinel is None:
+                # The session is in an unknown state; never reuse it.
+                self.close()
+                if token is not None:
+                    token.raise_if_cancelled()
+                if not found:
+                    raise subprocess.TimeoutExpired(command, timeout)
+                raise ShellSessionError(
+                    "adb shell exited" if eof else "adb shell produced no sentinel"
+                )
+
+            return code, output.decode("utf-8", errors="replace")
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Terminate the adb shell process."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.stdin:
+                proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.terminate()
+            proc.wait(timeout=2)
+        except Exception:
+            try:
+                proc.kill()
+            except Exception:
+                pass
+
+
+_sessions: dict[str | None, ADBShellSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_shell_session(device_id: str | None = None) -> ADBShellSession:
+    """
+    Get the shared shell session for a device, creating it on first use.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+
+    Returns:
+        The ADBShellSession for the device.
+    """
+    with _sessions_lock:
+        session = _sessions.get(device_id)
+        if session is None:
+            session = ADBShellSession(device_id)
+            _sessions[device_id] = session
+        return session
+
+
+def close_shell_sessions() -> None:
+    """Close all persistent shell sessions (e.g. after an adb server restart)."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+atexit.register(close_shell_sessions)
+
+
+def run_shell(
+    args: list[str] | str,
+    device_id: str | None = None,
+    timeout: float | None = None,
+) -> subprocess.CompletedProcess:
+    """
+    Run ``adb shell <args>`` through the persistent session when possible.
+
+    The command runs under the command executor, which applies its timeout
+    budget, retries read-only commands and tracks the device's health.
+
+    Args:
+        args: Shell command arguments, e.g. ``["input", "tap", "10", "20"]``,
+            or a raw command line (pipes allowed) such as ``"screencap | md5sum"``.
+        device_id: Optional ADB device ID for multi-device setups.
+        timeout: Timeout in seconds per attempt; defaults to the budget of
+            the command's class (see ``classify_command``).
+
+    Returns:
+        CompletedProcess with text stdout (stderr is merged into stdout
+        when the persistent session is used).
+
+    Raises:
+        subprocess.TimeoutExpired: If the command did not finish in time.
+    """
+    command = args if isinstance(args, str) else shlex.join(args)
+    return get_command_executor().run(
+        lambda t: _run_shell_once(args, command, device_id, t),
+        device_id=device_id,
+        op=classify_command(command),
+        timeout=timeout,
+    )
+
+
+def _run_shell_once(
+    args: list[str] | str,
+    command: str,
+    device_id: str | None,
+    timeout: float | None,
+) -> subprocess.CompletedProcess:
+    if _persistent_shell_enabled():
+        try:
+            code, output = get_shell_session(device_id).run(command, timeout=timeout)
+            return subprocess.CompletedProcess(args, code, stdout=output, stderr="")
+        except ShellSessionError:
+            # The next call reconnects; this one goes through the one-shot path.
+            pass
+
+    return run_process(
+        adb_prefix(device_id)
+        + ["shell"]
+        + ([command] if isinstance(args, str) else args),
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        timeout=timeout,
+    )
@@ -0,0 +1,457 @@
+"""Continuous screen capture through ``screenrecord`` with a latest-frame buffer.
+
+A background thread reads the H.264 stream of ``adb exec-out screenrecord``,
+decodes it on the host and keeps only the most recent frame, so a screenshot
+costs a buffer lookup (plus the JPEG encode, cached per frame) instead of a
+full on-device capture. Decoding needs the optional PyAV package (``av``);
+without it the stream is unavailable and callers fall back to ``screencap``.
+
+screenrecord stops after three minutes, and it records one display; the
+stream restarts transparently in both cases.
+"""
+
+import atexit
+import base64
+import hashlib
+import os
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Iterator
+
+from PIL import Image
+
+from phone_agent.adb.adb_path import adb_prefix, get_display_id
+from phone_agent.adb.shell import run_shell
+from phone_agent.imaging import encode_jpeg_to_target
+
+try:
+    import av
+except ImportError:  # pragma: no cover - optional dependency
+    av = None
+
+
+def stream_enabled() -> bool:
+    """Whether screenshots should come from a screen stream (PHONE_AGENT_SCREEN_STREAM)."""
+    value = os.getenv("PHONE_AGENT_SCREEN_STREAM", "false")
+    return value.strip().lower() in ("true", "1", "yes") and av is not None
+
+
+class ScreenrecordSource:
+    """
+    Live H.264 stream of a device display via ``adb exec-out screenrecord``.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+        display_id: Display to record; defaults to PHONE_AGENT_DISPLAY_ID.
+        bit_rate: Encoder bit rate in bits per second.
+        size: Optional "WIDTHxHEIGHT" to record at a lower resolution.
+    """
+
+    realtime = False
+
+    def __init__(
+        self,
+        device_id: str | None = None,
+        display_id: str | None = None,
+        bit_rate: int = 4_000_000,
+        size: str | None = None,
+    ):
+        self.device_id = device_id
+        self.display_id = display_id if display_id is not None else get_display_id()
+        self.bit_rate = bit_rate
+        self.size = size
+        self._proc: subprocess.Popen | None = None
+
+    def open(self) -> BinaryIO:
+        """Start screenrecord and return its stdout."""
+        args = ["exec-out", "screenrecord", "--output-format=h264"]
+        args += ["--bit-rate", str(self.bit_rate)]
+        if self.display_id:
+            args += ["--display-id", str(self.display_id)]
+        if self.size:
+            args += ["--size", self.size]
+        args.append("-")
+        self._proc = subprocess.Popen(
+            adb_prefix(self.device_id) + args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        return self._proc.stdout
+
+    def close(self) -> None:
+        """Stop screenrecord."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.terminate()
+            proc.wait(timeout=2)
+        except Exception:
+            try:
+                proc.kill()
+            except Exception:
+                pass
+
+
+class FileSource:
+    """
+    Replay a recorded raw H.264 file (e.g. ``screenrecord --output-format=h264``).
+
+    Args:
+        path: Path of the recording.
+        realtime: Pace frames by their timestamps instead of decoding as fast
+            as possible.
+    """
+
+    def __init__(self, path: str, realtime: bool = True):
+        self.path = path
+        self.realtime = realtime
+        self._file: BinaryIO | None = None
+
+    def open(self) -> BinaryIO:
+        """Open the recording."""
+        self._file = open(self.path, "rb")
+        return self._file
+
+    def close(self) -> None:
+        """Close the recording."""
+        file, self._file = self._file, None
+        if file is not None:
+            file.close()
+
+
+def decode_h264(stream: BinaryIO) -> Iterator[tuple[Any, float | None]]:
+    """
+    Decode a raw H.264 byte stream with PyAV.
+
+    Yields:
+        Tuples of (frame, presentation time in seconds or None). Frames are
+        ``av.VideoFrame`` objects, converted to images only on demand.
+    """
+    if av is None:
+        raise RuntimeError("PyAV (av) is required for screen streaming")
+    container = av.open(
+        stream,
+        format="h264",
+        mode="r",
+        options={"probesize": "32", "analyzeduration": "0", "fflags": "nobuffer"},
+    )
+    try:
+        video = container.streams.video[0]
+        for frame in container.decode(video):
+            yield frame, frame.time
+    finally:
+        container.close()
+
+
+@dataclass
+class StreamFrame:
+    """The latest decoded frame of a screen stream."""
+
+    seq: int
+    timestamp: float
+    frame: Any
+    _image: Image.Image | None = None
+
+    def image(self) -> Image.Image:
+        """The frame as a PIL image (converted once)."""
+        if self._image is None:
+            self._image = self.frame.to_image()
+        return self._image
+
+
+class ScreenStream:
+    """
+    Background decoder that keeps the most recent frame of a screen.
+
+    Args:
+        source_factory: Creates a source with ``open()`` returning a binary
+            stream and ``close()``; called again on every restart.
+        decoder: Turns the opened stream into (frame, pts) tuples; frames
+            need ``to_image()``. Defaults to :func:`decode_h264`.
+        max_session: Seconds after which the source is restarted ahead of
+            screenrecord's three-minute limit.
+
+    Example:
+        >>> stream = ScreenStream(lambda: ScreenrecordSource("emulator-5554"))
+        >>> stream.start()
+        >>> frame = stream.wait_for_frame(timeout=3)
+        >>> frame.image().size
+    """
+
+    def __init__(
+        self,
+        source_factory: Callable[[], Any],
+        decoder: Callable[[BinaryIO], Iterator[tuple[Any, float | None]]] | None = None,
+        max_session: float = 170.0,
+    ):
+        self.source_factory = source_factory
+        self.decoder = decoder or decode_h264
+        self.max_session = max_session
+        self.restarts = 0
+        self._cond = threading.Condition()
+        self._latest: StreamFrame | None = None
+        self._source: Any = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._restart = threading.Event()
+        self._display_id = get_display_id()
+
+    @property
+    def running(self) -> bool:
+        """Whether the decoder thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the decoder thread (no-op if already running)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="screen-stream", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the decoder thread and the source."""
+        self._stop.set()
+        self._close_source()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=3)
+        self._thread = None
+
+    def restart(self) -> None:
+        """Reopen the source, e.g. after the recorded display changed."""
+        self._restart.set()
+        self._close_source()
+
+    def latest(self, max_age: float | None = None) -> StreamFrame | None:
+        """
+        Get the most recent frame.
+
+        Restarts the stream (and returns None) if the target display changed
+        since the stream was opened.
+
+        Args:
+            max_age: Ignore frames older than this many seconds. Note that an
+                unchanged screen produces no new frames, so only use this when
+                a recent frame is really required.
+
+        Returns:
+            The latest frame, or None if none is available.
+        """
+        if get_display_id() != self._display_id:
+            self._display_id = get_display_id()
+            with self._cond:
+                self._latest = None
+            self.restart()
+            return None
+        with self._cond:
+            frame = self._latest
+        if frame is None:
+            return None
+        if max_age is not None and time.monotonic() - frame.timestamp > max_age:
+            return None
+        return frame
+
+    def wait_for_frame(
+        self, after_seq: int = 0, timeout: float | None = None
+    ) -> StreamFrame | None:
+        """
+        Block until a frame newer than ``after_seq`` is decoded.
+
+        Args:
+            after_seq: Sequence number of the last frame seen (0 for any).
+            timeout: Maximum wait in seconds.
+
+        Returns:
+            The new frame, or None on timeout.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._latest is not None and self._latest.seq > after_seq,
+                timeout=timeout,
+            )
+            frame = self._latest
+        if frame is None or frame.seq <= after_seq:
+            return None
+        return frame
+
+    def _close_source(self) -> None:
+        source = self._source
+        if source is not None:
+            try:
+                source.close()
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        backoff = 0.5
+        seq = 0
+        while not self._stop.is_set():
+            self._restart.clear()
+            opened = time.monotonic()
+            decoded = False
+            try:
+                self._source = self.source_factory()
+                stream = self._source.open()
+                realtime = getattr(self._source, "realtime", False)
+                pts0: float | None = None
+                for frame, pts in self.decoder(stream):
+                    if self._stop.is_set() or self._restart.is_set():
+                        break
+                    now = time.monotonic()
+                    if realtime and pts is not None:
+                        if pts0 is None:
+                            pts0 = pts
+                        delay = opened + (pts - pts0) - now
+                        if delay > 0:
+                            time.sleep(delay)
+                            now = time.monotonic()
+                    seq += 1
+                    decoded = True
+                    with self._cond:
+                        self._latest = StreamFrame(seq=seq, timestamp=now, frame=frame)
+                        self._cond.notify_all()
+                    if now - opened > self.max_session:
+                        break
+            except Exception:
+                pass
+            finally:
+                self._close_source()
+                self._source = None
+
+            if self._stop.is_set():
+                break
+            self.restarts += 1
+            if decoded:
+                backoff = 0.5
+            else:
+                # Source failed before producing a frame; back off.
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 5.0)
+
+
+_streams: dict[str | None, ScreenStream] = {}
+_streams_lock = threading.Lock()
+# Encoded screenshots cached per stream frame: (seq, base64, mime, width, height).
+_encoded: dict[str | None, tuple[int, str, str, int, int]] = {}
+
+
+def get_screen_stream(device_id: str | None = None) -> ScreenStream:
+    """
+    Get the running screen stream of a device, starting it on first use.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+
+    Returns:
+        The ScreenStream for the device.
+    """
+    with _streams_lock:
+        stream = _streams.get(device_id)
+        if stream is None:
+            stream = ScreenStream(lambda: ScreenrecordSource(device_id))
+            _streams[device_id] = stream
+    stream.start()
+    return stream
+
+
+def stop_screen_streams() -> None:
+    """Stop all screen streams."""
+    with _streams_lock:
+        streams = list(_streams.values())
+        _streams.clear()
+        _encoded.clear()
+        _device_sizes.clear()
+    for stream in streams:
+        stream.stop()
+
+
+atexit.register(stop_screen_streams)
+
+
+_WM_SIZE_RE = re.compile(r"(\d+)x(\d+)")
+_device_sizes: dict[str | None, tuple[int, int]] = {}
+
+
+def _device_size(device_id: str | None, frame_size: tuple[int, int]) -> tuple[int, int]:
+    """
+    Screen size in device pixels, oriented like the frame.
+
+    screenrecord may encode at a lower resolution than the display (encoder
+    limits or ``--size``); taps must still use device coordinates.
+    """
+    size = _device_sizes.get(device_id)
+    if size is None:
+        try:
+            output = run_shell(["wm", "size"], device_id, timeout=5).stdout or ""
+            # "Override size" (if any) is listed after "Physical size".
+            matches = _WM_SIZE_RE.findall(output)
+            size = (int(matches[-1][0]), int(matches[-1][1]))
+            _device_sizes[device_id] = size
+        except Exception:
+            return frame_size
+    width, height = size
+    if (frame_size[0] > frame_size[1]) != (width > height):
+        width, height = height, width
+    return width, height
+
+
+def get_stream_screenshot(
+    device_id: str | None = None, first_frame_timeout: float = 2.0
+) -> tuple[str, str, int, int] | None:
+    """
+    Encode the latest stream frame as a screenshot.
+
+    Args:
+        device_id: Optional ADB device ID for multi-device setups.
+        first_frame_timeout: How long to wait for the first frame after the
+            stream was started.
+
+    Returns:
+        Tuple of (base64 data, mime, width, height), or None if the stream has
+        no frame and the caller should capture one with screencap.
+    """
+    stream = get_screen_stream(device_id)
+    frame = stream.latest()
+    if frame is None:
+        frame = stream.wait_for_frame(timeout=first_frame_timeout)
+    if frame is None:
+        return None
+
+    with _streams_lock:
+        cached = _encoded.get(device_id)
+    if cached is not None and cached[0] == frame.seq:
+        return cached[1:]
+
+    img = frame.image()
+    width, height = _device_size(device_id, img.size)
+    jpeg_bytes, mime = encode_jpeg_to_target(img, target_bytes=25 * 1024, key=device_id)
+    result = (base64.b64encode(jpeg_bytes).decode("utf-8"), mime, width, height)
+    with _streams_lock:
+        _encoded[device_id] = (frame.seq, *result)
+    return result
+
+
+def get_stream_fingerprint(device_id: str | None = None) -> str | None:
+    """
+    Fingerprint of the latest stream frame for settle detection.
+
+    Hashes a coarse grayscale thumbnail, so encoder noise between two frames
+    of the same screen content does not change the fingerprint.
+
+    Returns:
+        Hex digest, or None if the stream has no frame.
+    """
+    frame = get_screen_stream(device_id).latest()
+    if frame is None:
+        return None
+    thumb = frame.image().convert("L").resize((32, 64), resample=Image.BILINEAR)
+    coarse = bytes(value >> 4 for value in thumb.tobytes())
+    return hashlib.md5(coarse).hexdigest()
@@ -1,16 +1,26 @@
 """Main PhoneAgent class for orchestrating phone automation."""
 
+import contextvars
 import json
+import time
 import traceback
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
 from typing import Any, Callable
 
 from phone_agent.actions import ActionHandler
 from phone_agent.actions.handler import do, finish, parse_action
 from phone_agent.config import get_messages, get_system_prompt
-from phone_agent.device_factory import get_device_factory
+from phone_agent.device_factory import DeviceFactory, get_device_factory
+from phone_agent.events import ActionEvent, EventBus, ScreenshotEvent, StepTimingEvent
+from phone_agent.metrics import observe_step_timings, start_exporters_from_env
 from phone_agent.model import ModelClient, ModelConfig
 from phone_agent.model.client import MessageBuilder
+from phone_agent.model.context import ContextConfig, ContextManager
+from phone_agent.model.prefix_cache import PrefixCacheTracker
+from phone_agent.observation import Observation, capture_observation
+from phone_agent.recorder import TrajectoryRecorder
 
 
 @dataclass
@@ -22,6 +32,12 @@ class AgentConfig:
     lang: str = "cn"
     system_prompt: str | None = None
     verbose: bool = True
+    pipelined: bool = (
+        False  # Concurrent capture, started when the previous action settles
+    )
+    context_budget_tokens: int = 0  # Compact older turns above this estimate (0: never)
+    context_keep_turns: int = 4  # Most recent turns always kept in full
+    record_dir: str | None = None  # Record each step's trajectory under this directory
 
     def __post_init__(self):
         if self.system_prompt is None:
@@ -37,6 +53,8 @@ class StepResult:
     action: dict[str, Any] | None
     thinking: str
     message: str | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    prompt_tokens: int = 0  # Estimated prompt size sent to the model
 
 
 class PhoneAgent:
@@ -51,6 +69,13 @@ class PhoneAgent:
         agent_config: Configuration for the agent behavior.
         confirmation_callback: Optional callback for sensitive action confirmation.
         takeover_callback: Optional callback for takeover requests.
+        model_client: Optional model client to share between agents.
+        device_factory: Optional device backend for this agent; defaults to the
+            global factory. Pass one per agent to run agents concurrently.
+        recorder: Optional trajectory recorder; by default one is created
+            when ``agent_config.record_dir`` is set.
+        events: Optional event bus receiving streamed tokens, screenshots,
+            actions and step timings (see :mod:`phone_agent.events`).
 
     Example:
         >>> from phone_agent import PhoneAgent
@@ -67,20 +92,44 @@ class PhoneAgent:
         agent_config: AgentConfig | None = None,
         confirmation_callback: Callable[[str], bool] | None = None,
         takeover_callback: Callable[[str], None] | None = None,
+        model_client: ModelClient | None = None,
+        device_factory: DeviceFactory | None = None,
+        recorder: TrajectoryRecorder | None = None,
+        events: EventBus | None = None,
     ):
         self.model_config = model_config or ModelConfig()
         self.agent_config = agent_config or AgentConfig()
+        self.events = events or EventBus()
 
-        self.model_client = ModelClient(self.model_config)
+        self.model_client = model_client or ModelClient(self.model_config)
+        # Own tracker: a shared client serves other agents between our steps.
+        self.prefix_tracker = PrefixCacheTracker()
+        self._device_factory = device_factory
         self.action_handler = ActionHandler(
             device_id=self.agent_config.device_id,
             confirmation_callback=confirmation_callback,
             takeover_callback=takeover_callback,
+            device_factory=device_factory,
         )
 
-        self._context: list[dict[str, Any]] = []
+        self._context = ContextManager(
+            ContextConfig(
+                budget_tokens=self.agent_config.context_budget_tokens,
+                keep_turns=self.agent_config.context_keep_turns,
+            )
+        )
         self._step_count = 0
 
+        if recorder is None and self.agent_config.record_dir:
+            recorder = TrajectoryRecorder(self.agent_config.record_dir)
+        self.recorder = recorder
+        start_exporters_from_env()
+
+        # Pipelined mode: observation for the next step is captured in the
+        # background as soon as the current action's post-action wait is over.
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending_observation: Future | None = None
+
     def run(self, task: str) -> str:
         """
         Run the agent to complete a task.
@@ -91,25 +140,31 @@ class PhoneAgent:
         Returns:
             Final message from the agent.
         """
-        self._context = []
+        self._context.reset()
         self._step_count = 0
+        self._discard_pending_observation()
 
-        # First step with user prompt
-        result = self._execute_step(task, is_first=True)
-
-        if result.finished:
-            return result.message or "Task completed"
-
-        # Continue until finished or max steps reached
-        while self._step_count < self.agent_config.max_steps:
-            result = self._execute_step(is_first=False)
+        try:
+            # First step with user prompt
+            result = self._execute_step(task, is_first=True)
 
             if result.finished:
                 return result.message or "Task completed"
 
-        return "Max steps reached"
+            # Continue until finished or max steps reached
+            while self._step_count < self.agent_config.max_steps:
+                result = self._execute_step(is_first=False)
+
+                if result.finished:
+                    return result.message or "Task completed"
+
+            return "Max steps reached"
+        finally:
+            self.action_handler.end_task()
 
-    def step(self, task: str | None = None) -> StepResult:
+    def step(
+        self, task: str | None = None, observation: Observation | None = None
+    ) -> StepResult:
         """
         Execute a single step of the agent.
 
@@ -117,86 +172,223 @@ class PhoneAgent:
 
         Args:
             task: Task description (only needed for first step).
+            observation: Screen state from :meth:`observe` to act on; captured
+                by the step if omitted.
 
         Returns:
             StepResult with step details.
         """
-        is_first = len(self._context) == 0
+        is_first = self._context.is_empty
 
         if is_first and not task:
             raise ValueError("Task is required for the first step")
 
-        return self._execute_step(task, is_first)
+        return self._execute_step(task, is_first, observation)
+
+    def observe(self) -> Observation:
+        """
+        Capture the screen state for the next step.
+
+        Lets a caller show the screen (e.g. a UI preview) and then pass the
+        same observation to :meth:`step`, instead of capturing twice. Returns
+        the prefetched observation in pipelined mode.
+        """
+        return self._take_observation()
 
     def reset(self) -> None:
         """Reset the agent state for a new task."""
-        self._context = []
+        self._context.reset()
         self._step_count = 0
+        self._discard_pending_observation()
+        self.action_handler.end_task()
+
+    def close(self) -> None:
+        """Release background resources and restore the device keyboard."""
+        self._discard_pending_observation()
+        self.action_handler.end_task()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="phone-agent-observe"
+            )
+        return self._executor
+
+    def _start_prefetch(self) -> None:
+        """Start capturing the next step's observation in the background."""
+        if self._pending_observation is not None:
+            return
+        # The prefetch runs in a copy of this context, so a cancellation
+        # token bound by the caller also interrupts it.
+        self._pending_observation = self._get_executor().submit(
+            contextvars.copy_context().run, self._observe
+        )
+
+    def _discard_pending_observation(self) -> None:
+        pending, self._pending_observation = self._pending_observation, None
+        if pending is not None and not pending.cancel():
+            # Already running: wait so it cannot race with the next capture.
+            try:
+                pending.result()
+            except BaseException:
+                # Including TaskCancelled from a cancelled prefetch.
+                pass
+
+    @staticmethod
+    def _timed(fn: Callable[..., Any], *args) -> tuple[Any, float]:
+        start = time.perf_counter()
+        value = fn(*args)
+        return value, time.perf_counter() - start
+
+    def _observe(self) -> Observation:
+        """
+        Capture the screenshot and the foreground app.
+
+        In pipelined mode both queries run concurrently, so the observe phase
+        costs max(screenshot, current_app) instead of their sum.
+        """
+        return capture_observation(
+            self._device_factory or get_device_factory(),
+            self.agent_config.device_id,
+            executor=self._get_executor() if self.agent_config.pipelined else None,
+        )
+
+    def _take_observation(self) -> Observation:
+        """Use the prefetched observation if there is one, otherwise capture now."""
+        pending, self._pending_observation = self._pending_observation, None
+        if pending is None:
+            return self._observe()
+
+        start = time.perf_counter()
+        observation = pending.result()
+        # Time the step actually spent blocked on the observation; the
+        # difference to "observe" is what the overlap saved.
+        observation.timings["observe_wait"] = time.perf_counter() - start
+        return observation
+
+    @staticmethod
+    def _format_timings(timings: dict[str, float]) -> str:
+        return ", ".join(f"{name}={value:.3f}s" for name, value in timings.items())
 
     def _execute_step(
-        self, user_prompt: str | None = None, is_first: bool = False
+        self,
+        user_prompt: str | None = None,
+        is_first: bool = False,
+        observation: Observation | None = None,
     ) -> StepResult:
         """Execute a single step of the agent loop."""
         self._step_count += 1
+        step_start = time.perf_counter()
 
         # Capture current screen state
-        device_factory = get_device_factory()
-        screenshot = device_factory.get_screenshot(self.agent_config.device_id)
-        current_app = device_factory.get_current_app(self.agent_config.device_id)
+        if observation is None:
+            observation = self._take_observation()
+        screenshot, current_app = observation.screenshot, observation.current_app
+        timings = dict(observation.timings)
+        if self.events.active:
+            self.events.emit(
+                ScreenshotEvent(
+                    step=self._step_count,
+                    base64_data=screenshot.base64_data,
+                    width=screenshot.width,
+                    height=screenshot.height,
+                    mime=getattr(screenshot, "mime", None) or "image/png",
+                )
+            )
 
         # Build messages
+        # Layout: fixed system block, task block, then rolling turns, so
+        # consecutive requests share a byte-identical prefix.
+        screen_info = MessageBuilder.build_screen_info(current_app)
         if is_first:
-            self._context.append(
+            self._context.start(
                 MessageBuilder.create_system_message(self.agent_config.system_prompt)
             )
-
-            screen_info = MessageBuilder.build_screen_info(current_app)
-            text_content = f"{user_prompt}\n\n{screen_info}"
-
-            self._context.append(
-                MessageBuilder.create_user_message(
-                    text=text_content,
-                    image_base64=screenshot.base64_data,
-                    image_mime=getattr(screenshot, "mime", None),
-                )
+            user_message = MessageBuilder.create_task_message(
+                task=user_prompt,
+                screen_info=screen_info,
+                image_base64=screenshot.base64_data,
+                image_mime=getattr(screenshot, "mime", None),
             )
         else:
-            screen_info = MessageBuilder.build_screen_info(current_app)
-            text_content = f"** Screen Info **\n\n{screen_info}"
-
-            self._context.append(
-                MessageBuilder.create_user_message(
-                    text=text_content,
-                    image_base64=screenshot.base64_data,
-                    image_mime=getattr(screenshot, "mime", None),
-                )
+            user_message = MessageBuilder.create_user_message(
+                text=f"** Screen Info **\n\n{screen_info}",
+                image_base64=screenshot.base64_data,
+                image_mime=getattr(screenshot, "mime", None),
             )
 
+        prompt_tokens = self._context.add_user(user_message, current_app=current_app)
+        prompt_messages = self._context.messages
+        recorded_messages = None
+        if self.recorder is not None:
+            # Only this step's user turn (the reply is recorded as raw_content),
+            # so the log grows linearly. Copy now: the image is stripped from
+            # the live message in place once the model has answered.
+            recorded_messages = [dict(prompt_messages[-1])]
+            if is_first:
+                self.recorder.record(
+                    "task",
+                    task=user_prompt,
+                    device_id=self.agent_config.device_id,
+                    system=self.agent_config.system_prompt,
+                )
+
         # Get model response
         try:
             msgs = get_messages(self.agent_config.lang)
-            print("\n" + "=" * 50)
-            print(f"💭 {msgs['thinking']}:")
-            print("-" * 50)
-            response = self.model_client.request(self._context)
+            if self.agent_config.verbose:
+                print("\n" + "=" * 50)
+                print(f"💭 {msgs['thinking']}:")
+                print("-" * 50)
+            response, timings["model"] = self._timed(
+                partial(
+                    self.model_client.request,
+                    events=self.events,
+                    prefix_tracker=self.prefix_tracker,
+                ),
+                prompt_messages,
+            )
         except Exception as e:
             if self.agent_config.verbose:
                 traceback.print_exc()
+            if self.recorder is not None:
+                self.recorder.record_step(
+                    self._step_count,
+                    messages=recorded_messages,
+                    timings=timings,
+                    screenshot=screenshot.base64_data,
+                    screenshot_mime=getattr(screenshot, "mime", None),
+                    current_app=current_app,
+                    error=f"Model error: {e}",
+                )
             return StepResult(
                 success=False,
                 finished=True,
                 action=None,
                 thinking="",
                 message=f"Model error: {e}",
+                timings=timings,
+                prompt_tokens=prompt_tokens,
             )
+        if response.time_to_first_token is not None:
+            timings["model_ttft"] = response.time_to_first_token
 
         # Parse action from response
         try:
-            action = parse_action(response.action)
+            action = parse_action(response.action, verbose=self.agent_config.verbose)
         except ValueError:
             if self.agent_config.verbose:
                 traceback.print_exc()
             action = finish(message=response.action)
+        if self.events.active:
+            self.events.emit(
+                ActionEvent(step=self._step_count, action=action, raw=response.action)
+            )
 
         if self.agent_config.verbose:
             # Print thinking process
@@ -206,12 +398,23 @@ class PhoneAgent:
             print("=" * 50 + "\n")
 
         # Remove image from context to save space
-        self._context[-1] = MessageBuilder.remove_images_from_message(self._context[-1])
+        self._context.replace_last_user(
+            MessageBuilder.remove_images_from_message(self._context.messages[-1])
+        )
 
-        # Execute action
+        # Execute action. In pipelined mode the next observation is captured
+        # as soon as the action's post-action wait is over, overlapping the
+        # rest of this step. Not while device commands are timing out: the
+        # capture would race the slow action and the server recovery.
+        prefetch = None
+        if self.agent_config.pipelined:
+            factory = self._device_factory or get_device_factory()
+            if factory.device_health(self.agent_config.device_id).healthy:
+                prefetch = self._start_prefetch
+        execute_start = time.perf_counter()
         try:
             result = self.action_handler.execute(
-                action, screenshot.width, screenshot.height
+                action, screenshot.width, screenshot.height, on_settled=prefetch
             )
         except Exception as e:
             if self.agent_config.verbose:
@@ -219,17 +422,50 @@ class PhoneAgent:
             result = self.action_handler.execute(
                 finish(message=str(e)), screenshot.width, screenshot.height
             )
+        timings["execute"] = time.perf_counter() - execute_start
 
         # Add assistant response to context
-        self._context.append(
+        self._context.add_assistant(
             MessageBuilder.create_assistant_message(
                 f"<think>{response.thinking}</think><answer>{response.action}</answer>"
-            )
+            ),
+            summary=response.action,
         )
 
         # Check if finished
         finished = action.get("_metadata") == "finish" or result.should_finish
 
+        if finished:
+            self._discard_pending_observation()
+        elif prefetch is not None:
+            # Actions without a device effect (Note, Take_over, ...) never
+            # report a settled screen; capture for them now.
+            prefetch()
+
+        timings["step"] = time.perf_counter() - step_start
+        observe_step_timings(timings, self.agent_config.device_id)
+        if self.events.active:
+            self.events.emit(
+                StepTimingEvent(step=self._step_count, timings=dict(timings))
+            )
+        if self.recorder is not None:
+            self.recorder.record_step(
+                self._step_count,
+                messages=recorded_messages,
+                raw_content=response.raw_content,
+                action=action,
+                timings=timings,
+                screenshot=screenshot.base64_data,
+                screenshot_mime=getattr(screenshot, "mime", None),
+                current_app=current_app,
+                prompt_tokens=prompt_tokens,
+                success=result.success,
+                finished=finished,
+                message=result.message,
+            )
+        if self.agent_config.verbose:
+            print(f"⏱️  {self._format_timings(timings)}, prompt≈{prompt_tokens} tokens")
+
         if finished and self.agent_config.verbose:
             msgs = get_messages(self.agent_config.lang)
             print("\n" + "🎉 " + "=" * 48)
@@ -244,12 +480,14 @@ class PhoneAgent:
             action=action,
             thinking=response.thinking,
             message=result.message or action.get("message"),
+            timings=timings,
+            prompt_tokens=prompt_tokens,
         )
 
     @property
     def context(self) -> list[dict[str, Any]]:
-        """Get the current conversation context."""
-        return self._context.copy()
+        """Get the current (compacted) conversation context."""
+        return self._context.messages
 
     @property
     def step_count(self) -> int:
@@ -1,6 +1,7 @@
 """iOS PhoneAgent class for orchestrating iOS phone automation."""
 
 import json
+import time
 import traceback
 from dataclasses import dataclass
 from typing import Any, Callable
@@ -8,8 +9,11 @@ from typing import Any, Callable
 from phone_agent.actions.handler import do, finish, parse_action
 from phone_agent.actions.handler_ios import IOSActionHandler
 from phone_agent.config import get_messages, get_system_prompt
+from phone_agent.events import EventBus
+from phone_agent.metrics import observe_step_timings, start_exporters_from_env
 from phone_agent.model import ModelClient, ModelConfig
 from phone_agent.model.client import MessageBuilder
+from phone_agent.recorder import TrajectoryRecorder
 from phone_agent.xctest import XCTestConnection, get_current_app, get_screenshot
 
 
@@ -24,6 +28,7 @@ class IOSAgentConfig:
     lang: str = "cn"
     system_prompt: str | None = None
     verbose: bool = True
+    record_dir: str | None = None  # Record each step's trajectory under this directory
 
     def __post_init__(self):
         if self.system_prompt is None:
@@ -53,6 +58,9 @@ class IOSPhoneAgent:
         agent_config: Configuration for the iOS agent behavior.
         confirmation_callback: Optional callback for sensitive action confirmation.
         takeover_callback: Optional callback for takeover requests.
+        recorder: Optional trajectory recorder; by default one is created
+            when ``agent_config.record_dir`` is set.
+        events: Optional event bus receiving the streamed model tokens.
 
     Example:
         >>> from phone_agent.agent_ios import IOSPhoneAgent, IOSAgentConfig
@@ -70,11 +78,13 @@ class IOSPhoneAgent:
         agent_config: IOSAgentConfig | None = None,
         confirmation_callback: Callable[[str], bool] | None = None,
         takeover_callback: Callable[[str], None] | None = None,
+        recorder: TrajectoryRecorder | None = None,
+        events: EventBus | None = None,
     ):
         self.model_config = model_config or ModelConfig()
         self.agent_config = agent_config or IOSAgentConfig()
 
-        self.model_client = ModelClient(self.model_config)
+        self.model_client = ModelClient(self.model_config, events=events)
 
         # Initialize WDA connection and create session if needed
         self.wda_connection = XCTestConnection(wda_url=self.agent_config.wda_url)
@@ -99,6 +109,11 @@ class IOSPhoneAgent:
         self._context: list[dict[str, Any]] = []
         self._step_count = 0
 
+        if recorder is None and self.agent_config.record_dir:
+            recorder = TrajectoryRecorder(self.agent_config.record_dir)
+        self.recorder = recorder
+        start_exporters_from_env()
+
     def run(self, task: str) -> str:
         """
         Run the agent to complete a task.
@@ -151,11 +166,18 @@ class IOSPhoneAgent:
         self._context = []
         self._step_count = 0
 
+    def close(self) -> None:
+        """Flush and stop the trajectory recorder, if any."""
+        if self.recorder is not None:
+            self.recorder.close()
+
     def _execute_step(
         self, user_prompt: str | None = None, is_first: bool = False
     ) -> StepResult:
         """Execute a single step of the agent loop."""
         self._step_count += 1
+        step_start = time.perf_counter()
+        timings: dict[str, float] = {}
 
         # Capture current screen state
         screenshot = get_screenshot(
@@ -163,9 +185,13 @@ class IOSPhoneAgent:
             session_id=self.agent_config.session_id,
             device_id=self.agent_config.device_id,
         )
+        timings["screenshot"] = time.perf_counter() - step_start
         current_app = get_current_app(
             wda_url=self.agent_config.wda_url, session_id=self.agent_config.session_id
         )
+        timings["current_app"] = (
+            time.perf_counter() - step_start - timings["screenshot"]
+        )
 
         # Build messages
         if is_first:
@@ -195,12 +221,37 @@ class IOSPhoneAgent:
                 )
             )
 
+        recorded_messages = None
+        if self.recorder is not None:
+            # Only this step's user turn (the reply is recorded as raw_content),
+            # so the log grows linearly. Copy now: the image is stripped from
+            # the live message in place once the model has answered.
+            recorded_messages = [dict(self._context[-1])]
+            if is_first:
+                self.recorder.record(
+                    "task",
+                    task=user_prompt,
+                    device_id=self.agent_config.device_id,
+                    system=self.agent_config.system_prompt,
+                )
+
         # Get model response
+        model_start = time.perf_counter()
         try:
             response = self.model_client.request(self._context)
         except Exception as e:
             if self.agent_config.verbose:
                 traceback.print_exc()
+            if self.recorder is not None:
+                self.recorder.record_step(
+                    self._step_count,
+                    messages=recorded_messages,
+                    timings=timings,
+                    screenshot=screenshot.base64_data,
+                    screenshot_mime=getattr(screenshot, "mime", None),
+                    current_app=current_app,
+                    error=f"Model error: {e}",
+                )
             return StepResult(
                 success=False,
                 finished=True,
@@ -208,10 +259,13 @@ class IOSPhoneAgent:
                 thinking="",
                 message=f"Model error: {e}",
             )
+        timings["model"] = time.perf_counter() - model_start
+        if response.time_to_first_token is not None:
+            timings["model_ttft"] = response.time_to_first_token
 
         # Parse action from response
         try:
-            action = parse_action(response.action)
+            action = parse_action(response.action, verbose=self.agent_config.verbose)
         except ValueError:
             if self.agent_config.verbose:
                 traceback.print_exc()
@@ -233,6 +287,7 @@ class IOSPhoneAgent:
         self._context[-1] = MessageBuilder.remove_images_from_message(self._context[-1])
 
         # Execute action
+        execute_start = time.perf_counter()
         try:
             result = self.action_handler.execute(
                 action, screenshot.width, screenshot.height
@@ -243,6 +298,7 @@ class IOSPhoneAgent:
             result = self.action_handler.execute(
                 finish(message=str(e)), screenshot.width, screenshot.height
             )
+        timings["execute"] = time.perf_counter() - execute_start
 
         # Add assistant response to context
         self._context.append(
@@ -254,6 +310,23 @@ class IOSPhoneAgent:
         # Check if finished
         finished = action.get("_metadata") == "finish" or result.should_finish
 
+        timings["step"] = time.perf_counter() - step_start
+        observe_step_timings(timings, self.agent_config.device_id)
+        if self.recorder is not None:
+            self.recorder.record_step(
+                self._step_count,
+                messages=recorded_messages,
+                raw_content=response.raw_content,
+                action=action,
+                timings=timings,
+                screenshot=screenshot.base64_data,
+                screenshot_mime=getattr(screenshot, "mime", None),
+                current_app=current_app,
+                success=result.success,
+                finished=finished,
+                message=result.message,
+            )
+
         if finished and self.agent_config.verbose:
             msgs = get_messages(self.agent_config.lang)
             print("\n" + "🎉 " + "=" * 48)
@@ -1,68 +1,153 @@
 from __future__ import annotations
 
-import subprocess
+import functools
+import re
+import threading
 import time
+import unicodedata
 from typing import Iterable
 
 from phone_agent.config.apps import APP_PACKAGES
 from phone_agent.device_factory import DeviceType, get_device_factory
-from phone_agent.adb.adb_path import adb_prefix
+from phone_agent.persistent_cache import JsonCache
 
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 可选依赖：没有时只用原名/英文别名
+    lazy_pinyin = None
 
-_cached_at: float = 0.0
-_cached_packages: set[str] = set()
-_cache_ttl_sec: float = 8.0
+
+# 已安装包索引：命中直接返回；未命中时最多每 _min_refresh_sec 刷新一次；
+# 超过 _max_age_sec 的索引在下一次查询时后台刷新。
+_min_refresh_sec: float = 5.0
+_max_age_sec: float = 300.0
+
+_PACKAGE_LINE_RE = re.compile(r"^package:(\S+)(?:\s+versionCode:(\d+))?")
 
 
 def _normalize(s: str) -> str:
     return (s or "").strip()
 
 
-def _list_packages_from_text(text: str) -> set[str]:
-    pkgs: set[str] = set()
+def _list_packages_from_text(text: str) -> dict[str, int | None]:
+    pkgs: dict[str, int | None] = {}
     for raw in (text or "").splitlines():
         line = (raw or "").strip()
         if not line:
             continue
-        # pm list packages 输出格式：package:com.xxx
-        if line.startswith("package:"):
-            line = line[len("package:") :]
-        line = line.strip()
-        if line and " " not in line and "/" not in line:
-            pkgs.add(line)
+        # pm list packages 输出格式：package:com.xxx [versionCode:123]
+        m = _PACKAGE_LINE_RE.match(line)
+        if m:
+            pkgs[m.group(1)] = int(m.group(2)) if m.group(2) else None
+        elif " " not in line and "/" not in line and ":" not in line:
+            pkgs[line] = None
     return pkgs
 
 
+class _PackageIndex:
+    """按设备区分的已安装包索引（包名 -> versionCode），持久化到磁盘。
+
+    刷新时与旧索引做差异比较：版本变化或被卸载的包会使启动组件缓存失效。
+    """
+
+    def __init__(self, cache: JsonCache | None = None):
+        self.cache = cache or JsonCache("installed_packages.json")
+        self._lock = threading.Lock()
+        self._packages: dict[str, dict[str, int | None]] = {}
+        self._updated: dict[str, float] = {}
+        self._attempted: dict[str, float] = {}
+
+    def _load(self, key: str) -> None:
+        if key in self._packages:
+            return
+        entry = self.cache.get(key) or {}
+        self._packages[key] = dict(entry.get("packages") or {})
+        self._updated[key] = float(entry.get("updated") or 0.0)
+
+    def packages(self, key: str, device_id: str | None, device_type: DeviceType, force_refresh: bool = False) -> dict[str, int | None]:
+        with self._lock:
+            self._load(key)
+            pkgs = self._packages[key]
+            stale = time.time() - self._updated[key] > _max_age_sec
+            stale = stale and time.monotonic() - self._attempted.get(key, -_min_refresh_sec) >= _min_refresh_sec
+        if force_refresh or not pkgs:
+            self.refresh(key, device_id, device_type)
+            with self._lock:
+                pkgs = self._packages[key]
+        elif stale:
+            # 过期（包括上次进程留下的）索引先照常回答，后台刷新，避免会话首次启动应用时等待全量列表。
+            threading.Thread(
+                target=self.refresh, args=(key, device_id, device_type), daemon=True
+            ).start()
+        return pkgs
+
+    def refresh(self, key: str, device_id: str | None, device_type: DeviceType) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._attempted.get(key, -_min_refresh_sec) < _min_refresh_sec:
+                return False
+            self._attempted[key] = now
+
+        fresh = _list_packages_from_text(_query_packages(device_id, device_type))
+        if not fresh:
+            return False
+
+        with self._lock:
+            self._load(key)
+            old = self._packages[key]
+            changed = [p for p, v in old.items() if p not in fresh or (v is not None and fresh[p] != v)]
+            self._packages[key] = fresh
+            self._updated[key] = time.time()
+        if changed or fresh != old:
+            self.cache.set(key, {"packages": fresh, "updated": self._updated[key]})
+        if changed and device_type == DeviceType.ADB:
+            try:
+                from phone_agent.adb.launcher import get_launcher_index
+
+                index = get_launcher_index()
+                for pkg in changed:
+                    index.invalidate(pkg, device_id)
+            except Exception:
+                pass
+        return True
+
+
+_index = _PackageIndex()
+
+
+def _device_key(device_id: str | None, device_type: DeviceType) -> str:
+    return f"{device_type.value}:{device_id or 'default'}"
+
+
+def _query_packages(device_id: str | None, device_type: DeviceType) -> str:
+    # cmd package 直接走 binder，比 pm（需启动 app_process）快得多；旧系统再回退到 pm。
+    commands = ["cmd package list packages --show-versioncode", "pm list packages"]
+    for command in commands:
+        out = ""
+        if device_type == DeviceType.SHIZUKU:
+            try:
+                from java import jclass
+
+                Bridge = jclass("com.example.autoglm.ShizukuBridge")
+                out = str(Bridge.execText(command) or "")
+            except Exception:
+                out = ""
+        else:
+            try:
+                from phone_agent.adb.shell import run_shell
+
+                out = run_shell(command, device_id, timeout=20).stdout or ""
+            except Exception:
+                out = ""
+        if "package:" in out:
+            return out
+    return ""
+
+
 def _get_all_packages(device_id: str | None = None, force_refresh: bool = False) -> set[str]:
-    global _cached_at, _cached_packages
-
-    now = time.time()
-    if not force_refresh and _cached_packages and (now - _cached_at) <= _cache_ttl_sec:
-        return _cached_packages
-
-    df = get_device_factory()
-    out = ""
-    if df.device_type == DeviceType.SHIZUKU:
-        try:
-            from java import jclass
-
-            Bridge = jclass("com.example.autoglm.ShizukuBridge")
-            out = str(Bridge.execText("pm list packages") or "")
-        except Exception:
-            out = ""
-    else:
-        try:
-            cmd = adb_prefix(device_id) + ["shell", "pm", "list", "packages"]
-            r = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8")
-            out = r.stdout or ""
-        except Exception:
-            out = ""
-
-    pkgs = _list_packages_from_text(out)
-    if pkgs:
-        _cached_packages = pkgs
-        _cached_at = now
-    return _cached_packages
+    device_type = get_device_factory().device_type
+    key = _device_key(device_id, device_type)
+    return set(_index.packages(key, device_id, device_type, force_refresh=force_refresh))
 
 
 def is_package_installed(package_name: str, device_id: str | None = None) -> bool:
@@ -70,42 +155,79 @@ def is_package_installed(package_name: str, device_id: str | None = None) -> boo
     if not pkg:
         return False
 
-    pkgs = _get_all_packages(device_id=device_id)
-    return pkg in pkgs
+    device_type = get_device_factory().device_type
+    key = _device_key(device_id, device_type)
+    if pkg in _index.packages(key, device_id, device_type):
+        return True
+    # 未命中：可能是新安装的应用，刷新一次（有频率限制）再判断。
+    if _index.refresh(key, device_id, device_type):
+        return pkg in _index.packages(key, device_id, device_type)
+    return False
+
+
+def _fold(s: str) -> str:
+    """别名归一化：全角转半角、小写、去掉空白与标点。"""
+    s = unicodedata.normalize("NFKC", s or "").lower()
+    return "".join(ch for ch in s if ch.isalnum())
+
+
+@functools.lru_cache(maxsize=1)
+def _alias_index() -> tuple[dict[str, list[str]], list[tuple[str, str]]]:
+    """预计算别名索引：(归一化别名 -> 包名列表, [(归一化别名, 包名)] 按 APP_PACKAGES 顺序)。
+
+    别名包括应用名本身，以及安装了 pypinyin 时中文名的全拼与首字母（首字母仅用于精确匹配）。
+    """
+    exact: dict[str, list[str]] = {}
+    ordered: list[tuple[str, str]] = []
+
+    def add(alias: str, pkg: str, substring: bool = True) -> None:
+        if not alias or not pkg:
+            return
+        hits = exact.setdefault(alias, [])
+        if pkg not in hits:
+            hits.append(pkg)
+        if substring:
+            ordered.append((alias, pkg))
+
+    for name, pkg in APP_PACKAGES.items():
+        add(_fold(name), pkg)
+        if lazy_pinyin is not None and any(ord(ch) >= 0x2E80 for ch in name):
+            syllables = [_fold(p) for p in lazy_pinyin(name)]
+            add("".join(syllables), pkg)
+            add("".join(p[:1] for p in syllables), pkg, substring=False)
+    return exact, ordered
+
+
+@functools.lru_cache(maxsize=256)
+def _mapping_candidates(query: str) -> tuple[str, ...]:
+    # 1) 完整匹配
+    if query in APP_PACKAGES:
+        return (APP_PACKAGES.get(query) or "",)
+
+    folded = _fold(query)
+    if not folded:
+        return ()
+    exact, ordered = _alias_index()
+
+    # 2) 归一化后精确匹配（大小写、全半角、空格、拼音）
+    if folded in exact:
+        return tuple(exact[folded])
+
+    # 3) 模糊包含：优先中文/英文别名里出现关键词；去重保持顺序
+    seen: set[str] = set()
+    out: list[str] = []
+    for alias, pkg in ordered:
+        if folded in alias and pkg not in seen:
+            seen.add(pkg)
+            out.append(pkg)
+    return tuple(out)
 
 
 def _iter_mapping_candidates(query: str) -> Iterable[str]:
     q = query.strip()
     if not q:
         return []
-
-    # 1) 完整匹配（包含大小写变化）
-    if q in APP_PACKAGES:
-        return [APP_PACKAGES.get(q) or ""]
-
-    ql = q.lower()
-    for k, v in APP_PACKAGES.items():
-        if (k or "").strip().lower() == ql:
-            return [v]
-
-    # 2) 模糊包含：优先中文/英文别名里出现关键词
-    hits: list[str] = []
-    for k, v in APP_PACKAGES.items():
-        kl = (k or "").strip().lower()
-        if ql in kl:
-            hits.append(v)
-
-    if hits:
-        # 去重保持顺序
-        seen: set[str] = set()
-        out: list[str] = []
-        for p in hits:
-            if p and p not in seen:
-                seen.add(p)
-                out.append(p)
-        return out
-
-    return []
+    return list(_mapping_candidates(q))
 
 
 def resolve_package(app_or_pkg: str, device_id: str | None = None) -> str:
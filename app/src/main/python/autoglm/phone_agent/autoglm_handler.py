@@ -1,10 +1,8 @@
 import os
 import random
 import subprocess
-import sys
 import time
 import traceback
-from contextlib import contextmanager
 from typing import Any
 
 try:
@@ -27,56 +25,6 @@ def _safe_call(cb: Any, name: str, *args) -> None:
         pass
 
 
-class _CallbackWriter:
-    """将 stdout/stderr 重定向到回调，用于捕获 AI 思考内容。"""
-    def __init__(self, callback: Any, target: str = "on_action"):
-        self.callback = callback
-        self.target = target  # 目标回调方法名：on_action 或 on_assistant
-        self._buf = ""
-
-    def write(self, s: str) -> int:
-        if not s:
-            return 0
-        self._buf += s
-        while "\n" in self._buf:
-            line, self._buf = self._buf.split("\n", 1)
-            line = (line or "").strip()
-            if line:
-                # 根据目标回调发送，思考内容添加 [[THINK]] 前缀
-                if self.target == "on_assistant":
-                    _safe_call(self.callback, "on_assistant", "[[THINK]]" + line)
-                else:
-                    _safe_call(self.callback, "on_action", line)
-        return len(s)
-
-    def flush(self) -> None:
-        buf = (self._buf or "").strip()
-        if buf:
-            if self.target == "on_assistant":
-                _safe_call(self.callback, "on_assistant", "[[THINK]]" + buf)
-            else:
-                _safe_call(self.callback, "on_action", buf)
-        self._buf = ""
-
-
-@contextmanager
-def _redirect_std_to_callback(callback: Any, target: str = "on_action"):
-    """重定向 stdout/stderr 到指定回调。target 可以是 on_action 或 on_assistant。"""
-    old_out, old_err = sys.stdout, sys.stderr
-    w = _CallbackWriter(callback, target=target)
-    try:
-        sys.stdout = w
-        sys.stderr = w
-        yield
-    finally:
-        try:
-            w.flush()
-        except Exception:
-            pass
-        sys.stdout = old_out
-        sys.stderr = old_err
-
-
 class AutoGLMHandler:
     def __init__(self, callback: Any = None, internal_adb_path: str | None = None):
         self.callback = callback
@@ -87,6 +35,11 @@ class AutoGLMHandler:
         if not user_goal:
             return "请输入任务目标。"
 
+        from phone_agent.cancellation import CancellationToken, TaskCancelled, bind_token
+
+        # 停止按钮通过取消令牌立即生效：正在进行的模型流被断开，adb 子进程被杀掉，等待提前返回。
+        cancel_token = CancellationToken()
+
         def _should_continue() -> bool:
             try:
                 if _TaskControl is None:
@@ -96,19 +49,21 @@ class AutoGLMHandler:
                 return True
 
         def _sleep_interruptible(seconds: float) -> bool:
-            """Sleep in small chunks. Return False if should stop."""
+            """Sleep until the delay passes or the task is stopped. Return False if should stop."""
             try:
                 remaining = float(seconds or 0.0)
             except Exception:
                 remaining = 0.0
-            step = 0.1
-            while remaining > 0:
-                if not _should_continue():
-                    return False
-                time.sleep(step if remaining > step else remaining)
-                remaining -= step
+            if remaining > 0 and cancel_token.wait(remaining):
+                return False
             return _should_continue()
 
+        action_handler = None
+        recorder = None
+        dispatcher = None
+        # 后台线程每 50ms 轮询 TaskControl，停止时取消令牌。
+        stop_watching = cancel_token.watch(_should_continue)
+        unbind_token = bind_token(cancel_token)
         try:
             connect_mode = (os.environ.get("AUTOGM_CONNECT_MODE") or os.environ.get("PHONE_AGENT_CONNECT_MODE") or "").strip().upper()
             is_shizuku_mode = connect_mode == "SHIZUKU"
@@ -160,16 +115,29 @@ class AutoGLMHandler:
             from phone_agent.actions.handler import ActionHandler
             from phone_agent.actions.handler import finish, parse_action
             from phone_agent.config import get_system_prompt
+            from phone_agent.config.timing import TIMING_CONFIG
             from phone_agent.device_factory import get_device_factory
             from phone_agent.device_factory import DeviceType, set_device_type
+            from phone_agent.events import CoalescingDispatcher, EventBus, TokenEvent
             from phone_agent.model import ModelClient, ModelConfig
             from phone_agent.model.client import MessageBuilder
+            from phone_agent.model.context import ContextManager
+            from phone_agent.observation import PreviewPublisher, capture_observation
+            from phone_agent.metrics import observe_step_timings, start_exporters_from_env
+            from phone_agent.recorder import create_recorder_from_env
 
             if is_shizuku_mode:
                 try:
                     set_device_type(DeviceType.SHIZUKU)
                 except Exception:
                     pass
+                # 新任务：虚拟显示会话在首次操作时重新准备一次，之后复用。
+                try:
+                    from phone_agent.shizuku import reset_display_session
+
+                    reset_display_session()
+                except Exception:
+                    pass
             else:
                 try:
                     set_device_type(DeviceType.ADB)
@@ -203,19 +171,42 @@ class AutoGLMHandler:
                     except Exception:
                         pass
 
-            model_client = ModelClient(ModelConfig())
+            # 模型流式输出经事件总线送到 UI，不再替换全局 stdout/stderr；
+            # 思考片段在后台线程按 PHONE_AGENT_EVENT_COALESCE_MS 合并后再回调，减少 JNI 调用次数。
+            model_client = ModelClient(ModelConfig(verbose=False))
+            events = EventBus()
+
+            def _on_token(event) -> None:
+                if event.phase == "thinking":
+                    _safe_call(self.callback, "on_assistant", "[[THINK]]" + event.text)
+
+            dispatcher = CoalescingDispatcher(_on_token)
+            events.subscribe(dispatcher, TokenEvent)
             action_handler = ActionHandler(
                 device_id=None,
                 confirmation_callback=_confirmation_callback,
                 takeover_callback=_takeover_callback,
             )
 
-            context: list[dict[str, Any]] = []
+            # 设置 PHONE_AGENT_RECORD_DIR 时记录每一步（后台写入，队列满时丢弃记录而不阻塞）。
+            recorder = create_recorder_from_env()
+            # PHONE_AGENT_METRICS_SNAPSHOT / PHONE_AGENT_METRICS_PORT 开启指标快照文件与本地拉取端点。
+            start_exporters_from_env()
+
+            # 设置 PHONE_AGENT_CONTEXT_BUDGET 时按该 token 预算压缩早期步骤（保留系统提示、任务和最近几步）；默认不压缩
+            context = ContextManager()
             step_count = 0
+            # 每步只截一次图：同一个观测既送模型也送 UI；UI 只收缩略图，画面未变化时只收一个标记。
+            preview = PreviewPublisher(lambda data: _safe_call(self.callback, "on_screenshot", data))
             max_steps = 50
 
             system_prompt = get_system_prompt("cn")
-            context.append(MessageBuilder.create_system_message(system_prompt))
+            context.start(MessageBuilder.create_system_message(system_prompt))
+            if recorder is not None:
+                # 系统提示只在任务记录中写一次，每步只记录新增的用户消息。
+                recorder.record(
+                    "task", task=user_goal, mode=connect_mode or "ADB", system=system_prompt
+                )
 
             while step_count < max_steps:
                 if not _should_continue():
@@ -223,33 +214,75 @@ class AutoGLMHandler:
 
                 step_count += 1
 
+                # 设备命令近期频繁超时：先确认连接仍在，避免整步卡在超时上。
+                health = get_device_factory().device_health()
+                if not health.healthy:
+                    _safe_call(
+                        self.callback,
+                        "on_action",
+                        f"设备响应缓慢（超时 {health.timeouts} 次，已重连 {health.recoveries} 次），正在检查连接...",
+                    )
+                    if not is_shizuku_mode:
+                        from phone_agent.adb.connection import ADBConnection
+
+                        if not ADBConnection().is_connected(device_id=None):
+                            msg = "ADB 连接已断开：请重新连接设备后再继续。"
+                            _safe_call(self.callback, "on_error", msg)
+                            return msg
+
                 _safe_call(self.callback, "on_action", f"第 {step_count} 步：正在查阅屏幕")
-                device_factory = get_device_factory()
-                screenshot = device_factory.get_screenshot(device_id=None)
-                _safe_call(self.callback, "on_screenshot", screenshot.base64_data)
-                current_app = device_factory.get_current_app(device_id=None)
+                step_start = time.perf_counter()
+                observation = capture_observation(get_device_factory())
+                screenshot, current_app = observation.screenshot, observation.current_app
+                timings = dict(observation.timings)
+                preview.publish(observation)
                 screen_info = MessageBuilder.build_screen_info(current_app)
 
+                # 首条消息保持训练时的布局（截图在前，任务与屏幕信息在后）
                 if step_count == 1:
-                    text_content = f"{user_goal}\n\n{screen_info}"
+                    user_message = MessageBuilder.create_task_message(
+                        task=user_goal,
+                        screen_info=screen_info,
+                        image_base64=screenshot.base64_data,
+                        image_mime=getattr(screenshot, "mime", None),
+                    )
                 else:
-                    text_content = f"** Screen Info **\n\n{screen_info}"
-
-                context.append(
-                    MessageBuilder.create_user_message(
-                        text=text_content,
+                    user_message = MessageBuilder.create_user_message(
+                        text=f"** Screen Info **\n\n{screen_info}",
                         image_base64=screenshot.base64_data,
                         image_mime=getattr(screenshot, "mime", None),
                     )
-                )
+
+                context.add_user(user_message, current_app=current_app)
+                prompt_messages = context.messages
+                # 只记录本步新增的用户消息（模型回复记在 raw_content）；截图随后会从上下文消息中原地移除，需先复制。
+                recorded_messages = [dict(prompt_messages[-1])] if recorder is not None else None
 
                 try:
                     _safe_call(self.callback, "on_action", "正在调用模型...")
-                    # 将模型流式输出的思考内容重定向到 on_assistant 回调
-                    with _redirect_std_to_callback(self.callback, target="on_assistant"):
-                        response = model_client.request(context)
+                    model_start = time.perf_counter()
+                    try:
+                        response = model_client.request(prompt_messages, events=events)
+                    finally:
+                        dispatcher.flush()
+                    timings["model"] = time.perf_counter() - model_start
+                    _safe_call(
+                        self.callback,
+                        "on_assistant",
+                        "[[THINK]]\n" + model_client.format_metrics(response),
+                    )
                 except Exception as e:
                     msg = self._format_api_error(e)
+                    if recorder is not None:
+                        recorder.record_step(
+                            step_count,
+                            messages=recorded_messages,
+                            timings=timings,
+                            screenshot=screenshot.base64_data,
+                            screenshot_mime=getattr(screenshot, "mime", None),
+                            current_app=current_app,
+                            error=msg,
+                        )
                     _safe_call(self.callback, "on_error", msg)
                     return msg
 
@@ -281,7 +314,9 @@ class AutoGLMHandler:
                 except Exception:
                     _safe_call(self.callback, "on_action", "[[ACTION]]动作解析失败")
 
-                context[-1] = MessageBuilder.remove_images_from_message(context[-1])
+                context.replace_last_user(
+                    MessageBuilder.remove_images_from_message(context.messages[-1])
+                )
 
                 # 如果是 Tap/Long Press/Double Tap 动作，显示点击指示器
                 action_name = action.get("action", "")
@@ -298,6 +333,7 @@ class AutoGLMHandler:
                             _safe_call(self.callback, "on_tap_indicator", screen_x, screen_y)
                     except Exception:
                         pass  # 忽略指示器显示失败
+                execute_start = time.perf_counter()
                 try:
                     result = action_handler.execute(action, screenshot.width, screenshot.height)
                 except Exception as e:
@@ -305,24 +341,49 @@ class AutoGLMHandler:
                     result = action_handler.execute(
                         finish(message=str(e)), screenshot.width, screenshot.height
                     )
+                timings["execute"] = time.perf_counter() - execute_start
+
+                finished = action.get("_metadata") == "finish" or result.should_finish
+                if response.time_to_first_token is not None:
+                    timings["model_ttft"] = response.time_to_first_token
+                timings["step"] = time.perf_counter() - step_start
+                observe_step_timings(timings)
+                if recorder is not None:
+                    recorder.record_step(
+                        step_count,
+                        messages=recorded_messages,
+                        raw_content=response.raw_content,
+                        action=action,
+                        timings=timings,
+                        screenshot=screenshot.base64_data,
+                        screenshot_mime=getattr(screenshot, "mime", None),
+                        current_app=current_app,
+                        success=result.success,
+                        finished=finished,
+                        message=result.message,
+                    )
 
                 if not _should_continue():
                     return "已停止"
 
-                context.append(
+                context.add_assistant(
                     MessageBuilder.create_assistant_message(
                         f"<think>{response.thinking}</think><answer>{response.action}</answer>"
-                    )
+                    ),
+                    summary=str(response.action),
                 )
 
-                finished = action.get("_metadata") == "finish" or result.should_finish
                 if finished:
                     final_msg = result.message or action.get("message") or "任务完成"
                     _safe_call(self.callback, "on_done", final_msg)
                     return final_msg
 
-                delay = random.uniform(1.0, 2.0)
-                _safe_call(self.callback, "on_action", f"等待 {delay:.1f}s 后继续...")
+                if TIMING_CONFIG.settle.enabled:
+                    # 动作执行后已等待画面稳定（见 phone_agent.settle），无需再随机等待。
+                    delay = 0.0
+                else:
+                    delay = random.uniform(1.0, 2.0)
+                    _safe_call(self.callback, "on_action", f"等待 {delay:.1f}s 后继续...")
                 if not _sleep_interruptible(delay):
                     if not is_shizuku_mode:
                         # ADB 掉线检测（每步后检测一次）
@@ -337,11 +398,24 @@ class AutoGLMHandler:
             _safe_call(self.callback, "on_done", msg)
             return msg
 
+        except TaskCancelled:
+            return "已停止"
         except Exception as e:
             err = f"任务执行异常：{e}"
             _safe_call(self.callback, "on_error", err)
             _safe_call(self.callback, "on_action", traceback.format_exc())
             return "任务失败：发生未知错误，请查看日志。"
+        finally:
+            # 先解除令牌，收尾操作（恢复输入法等）不应被取消。
+            unbind_token()
+            stop_watching()
+            # 任务结束（含停止/异常）时恢复原输入法；ADB 键盘在任务内只切换一次。
+            if action_handler is not None:
+                action_handler.end_task()
+            if recorder is not None:
+                recorder.close()
+            if dispatcher is not None:
+                dispatcher.close()
 
     @staticmethod
     def _format_action_description(action: dict) -> str:
@@ -0,0 +1,240 @@
+"""Cooperative cancellation of a running task.
+
+A :class:`CancellationToken` is bound to the current context with
+:func:`use_token` (or :func:`bind_token`). Blocking work started while it is
+bound checks it: device operations refuse to start, waits return early,
+child processes are killed and model streams are closed as soon as the token
+is cancelled, and the work raises :class:`TaskCancelled`.
+
+Example:
+    >>> token = CancellationToken()
+    >>> stop_watching = token.watch(lambda: not stop_button_pressed())
+    >>> with use_token(token):
+    ...     agent.run("Open Settings")
+"""
+
+import contextvars
+import os
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+
+class TaskCancelled(BaseException):
+    """
+    Raised when the current task was cancelled.
+
+    Like ``asyncio.CancelledError`` it derives from ``BaseException``, so the
+    many best-effort ``except Exception`` blocks do not swallow it.
+    """
+
+
+class CancellationToken:
+    """A one-shot cancellation flag with callbacks."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+        self.reason = ""
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "") -> None:
+        """Cancel the token and run the registered callbacks once."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise TaskCancelled(self.reason or "Task cancelled")
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run ``callback`` when the token is cancelled (now, if it already is).
+
+        Returns:
+            Function that unregisters the callback.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+
+                def remove() -> None:
+                    with self._lock:
+                        try:
+                            self._callbacks.remove(callback)
+                        except ValueError:
+                            pass
+
+                return remove
+        try:
+            callback()
+        except Exception:
+            pass
+        return lambda: None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait up to ``timeout`` seconds; returns True if cancelled."""
+        return self._event.wait(timeout)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep, raising :class:`TaskCancelled` as soon as the token is cancelled."""
+        if seconds > 0 and self._event.wait(seconds):
+            self.raise_if_cancelled()
+        self.raise_if_cancelled()
+
+    def watch(
+        self, should_continue: Callable[[], bool], interval: float = 0.05
+    ) -> Callable[[], None]:
+        """
+        Cancel the token once ``should_continue()`` returns False.
+
+        The predicate is polled from a daemon thread every ``interval``
+        seconds, e.g. to bridge a UI stop flag.
+
+        Returns:
+            Function that stops watching.
+        """
+        stopped = threading.Event()
+
+        def loop() -> None:
+            while not stopped.wait(interval) and not self._event.is_set():
+                try:
+                    keep_going = should_continue()
+                except Exception:
+                    keep_going = True
+                if not keep_going:
+                    self.cancel("Stopped by user")
+                    return
+
+        threading.Thread(target=loop, name="cancel-watch", daemon=True).start()
+        return stopped.set
+
+
+_current: contextvars.ContextVar[CancellationToken | None] = contextvars.ContextVar(
+    "phone_agent_cancellation_token", default=None
+)
+
+
+def current_token() -> CancellationToken | None:
+    """The token bound to the current context, if any."""
+    return _current.get()
+
+
+def bind_token(token: CancellationToken | None) -> Callable[[], None]:
+    """
+    Bind a token to the current context.
+
+    Returns:
+        Function that restores the previously bound token.
+    """
+    handle = _current.set(token)
+    return lambda: _current.reset(handle)
+
+
+@contextmanager
+def use_token(token: CancellationToken | None) -> Iterator[CancellationToken | None]:
+    """Bind a token to the current context for the duration of the block."""
+    unbind = bind_token(token)
+    try:
+        yield token
+    finally:
+        unbind()
+
+
+def check_cancelled() -> None:
+    """Raise :class:`TaskCancelled` if the current token was cancelled."""
+    token = _current.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def sleep(seconds: float) -> None:
+    """``time.sleep`` that wakes up (and raises) when the current token is cancelled."""
+    token = _current.get()
+    if token is None:
+        if seconds > 0:
+            time.sleep(seconds)
+        return
+    token.sleep(seconds)
+
+
+def _kill(proc: subprocess.Popen) -> None:
+    """Kill a process and its children (which may hold its output pipes open)."""
+    if os.name == "posix":
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+            return
+        except OSError:
+            pass
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+
+def run_process(
+    args: Any,
+    timeout: float | None = None,
+    input: Any = None,
+    capture_output: bool = False,
+    **kwargs: Any,
+) -> subprocess.CompletedProcess:
+    """
+    ``subprocess.run`` that kills the child when the current token is cancelled.
+
+    Without a bound token this is plain ``subprocess.run``.
+
+    Raises:
+        TaskCancelled: If the token was cancelled before or while the process ran.
+        subprocess.TimeoutExpired: If the process did not finish in time.
+    """
+    token = _current.get()
+    if token is None:
+        return subprocess.run(
+            args, timeout=timeout, input=input, capture_output=capture_output, **kwargs
+        )
+
+    token.raise_if_cancelled()
+    if capture_output:
+        kwargs["stdout"] = subprocess.PIPE
+        kwargs["stderr"] = subprocess.PIPE
+    if input is not None:
+        kwargs["stdin"] = subprocess.PIPE
+    if os.name == "posix":
+        # Own process group, so cancelling also kills what the child spawned.
+        kwargs.setdefault("start_new_session", True)
+
+    with subprocess.Popen(args, **kwargs) as proc:
+        remove = token.on_cancel(lambda: _kill(proc))
+        try:
+            stdout, stderr = proc.communicate(input, timeout=timeout)
+        except subprocess.TimeoutExpired as e:
+            _kill(proc)
+            stdout, stderr = proc.communicate()
+            raise subprocess.TimeoutExpired(
+                proc.args, timeout, output=stdout, stderr=stderr
+            ) from e
+        except BaseException:
+            _kill(proc)
+            raise
+        finally:
+            remove()
+
+    token.raise_if_cancelled()
+    return subprocess.CompletedProcess(proc.args, proc.returncode, stdout, stderr)
@@ -0,0 +1,319 @@
+"""Timeout budgets, bounded retries and device health for device commands.
+
+Every adb shell command (:func:`phone_agent.adb.shell.run_shell`), adb
+screen capture and hdc command goes through :meth:`CommandExecutor.run`:
+
+- Each command class ("input", "query", "screencap", "launch", "transfer",
+  "other") has a timeout budget (``TIMING_CONFIG.command``), so a wedged
+  adb server raises ``subprocess.TimeoutExpired`` instead of hanging.
+- Read-only classes are retried after a timeout with a jittered,
+  exponential pause.
+- After ``restart_after_timeouts`` consecutive timeouts on a device, the
+  server is restarted (``ADBConnection.restart_server``) and TCP devices are
+  reconnected, at most once per ``restart_cooldown``.
+- Each device keeps a :class:`DeviceHealth` score the step loop can consult,
+  and timeouts/retries are counted per device and command class in
+  :mod:`phone_agent.metrics`.
+"""
+
+import random
+import re
+import shlex
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, TypeVar
+
+from phone_agent import cancellation
+from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.metrics import (
+    COMMAND_RETRIES,
+    COMMAND_SECONDS,
+    COMMAND_TIMEOUTS,
+    DEVICE_RECOVERIES,
+)
+
+T = TypeVar("T")
+
+# Retrying these cannot repeat a side effect on the device.
+_RETRYABLE = frozenset({"query", "screencap", "transfer"})
+
+_OP_BY_PROGRAM = {
+    "input": "input",
+    "uitest": "input",
+    "screencap": "screencap",
+    "snapshot_display": "screencap",
+    "am": "launch",
+    "monkey": "launch",
+    "aa": "launch",
+    "dumpsys": "query",
+    "getprop": "query",
+    "settings": "query",
+    "pm": "query",
+    "cmd": "query",
+    "wm": "query",
+    "ime": "query",
+    "hidumper": "query",
+    "bm": "query",
+    "param": "query",
+    "ip": "query",
+}
+
+# Health is an exponentially weighted success rate: 1.0 is healthy, a
+# timeout pulls it towards 0, a slow command (over half its budget) towards 0.5.
+_HEALTH_ALPHA = 0.2
+HEALTHY_THRESHOLD = 0.5
+
+
+def classify_command(command: str | list[str]) -> str:
+    """
+    Classify a device command into a budget class.
+
+    Args:
+        command: Shell command line (``"dumpsys window | grep ..."``) or
+            argument list; for full ``adb``/``hdc`` argument lists the part
+            after ``shell`` is used.
+
+    Returns:
+        One of "input", "query", "screencap", "launch", "transfer", "other".
+    """
+    if isinstance(command, str):
+        try:
+            words = shlex.split(command)
+        except ValueError:
+            words = command.split()
+    else:
+        words = [str(word) for word in command]
+    if "shell" in words:
+        words = words[words.index("shell") + 1 :]
+        if len(words) == 1 and " " in words[0]:
+            words = words[0].split()
+    elif "exec-out" in words:
+        words = words[words.index("exec-out") + 1 :]
+    elif "file" in words or "pull" in words or "push" in words:
+        return "transfer"
+    if not words:
+        return "other"
+    # "getprop;" / "dumpsys|grep": shlex keeps shell operators on the word.
+    program = re.split(r"[;&|<>()]", words[0].rsplit("/", 1)[-1], maxsplit=1)[0]
+    return _OP_BY_PROGRAM.get(program, "other")
+
+
+@dataclass
+class DeviceHealth:
+    """Command health of one device."""
+
+    device: str
+    backend: str
+    score: float = 1.0
+    commands: int = 0
+    timeouts: int = 0
+    retries: int = 0
+    recoveries: int = 0
+    consecutive_timeouts: int = 0
+    last_timeout: float | None = None  # Wall-clock time
+    last_recovery: float | None = None  # Monotonic time
+
+    @property
+    def healthy(self) -> bool:
+        """Whether recent commands mostly completed within their budgets."""
+        return self.score >= HEALTHY_THRESHOLD
+
+    def _sample(self, value: float) -> None:
+        self.score += _HEALTH_ALPHA * (value - self.score)
+
+
+class CommandExecutor:
+    """
+    Run device commands under timeout budgets with retries and recovery.
+
+    Args:
+        recover: Called as ``recover(backend, device_id)`` after repeated
+            timeouts; defaults to restarting the adb/hdc server and
+            reconnecting TCP devices.
+
+    Example:
+        >>> executor = get_command_executor()
+        >>> result = executor.run(
+        ...     lambda timeout: subprocess.run(cmd, capture_output=True, timeout=timeout),
+        ...     device_id="emulator-5554",
+        ...     op="query",
+        ... )
+    """
+
+    def __init__(self, recover: Callable[[str, str | None], bool] | None = None):
+        self._recover = recover or _restart_server
+        self._health: dict[tuple[str, str], DeviceHealth] = {}
+        self._lock = threading.Lock()
+        self._recovering: set[str] = set()
+
+    @staticmethod
+    def budget(op: str) -> tuple[float, int]:
+        """Timeout (seconds per attempt) and retry count of a command class."""
+        config = TIMING_CONFIG.command
+        timeout = getattr(config, f"{op}_timeout", None)
+        if timeout is None:
+            timeout = (
+                config.screencap_timeout if op == "transfer" else config.other_timeout
+            )
+        return timeout, config.query_retries if op in _RETRYABLE else 0
+
+    def health(
+        self, device_id: str | None = None, backend: str = "adb"
+    ) -> DeviceHealth:
+        """Health record of a device (a fresh, healthy one if unseen)."""
+        key = (backend, device_id or "default")
+        with self._lock:
+            health = self._health.get(key)
+            if health is None:
+                health = self._health[key] = DeviceHealth(
+                    device=key[1], backend=backend
+                )
+            return health
+
+    def health_snapshot(self) -> list[dict[str, Any]]:
+        """All device health records as plain dicts."""
+        with self._lock:
+            records = list(self._health.values())
+        return [dict(asdict(h), healthy=h.healthy) for h in records]
+
+    def reset(self) -> None:
+        """Forget all health records."""
+        with self._lock:
+            self._health.clear()
+
+    def run(
+        self,
+        fn: Callable[[float], T],
+        device_id: str | None = None,
+        op: str = "other",
+        backend: str = "adb",
+        timeout: float | None = None,
+    ) -> T:
+        """
+        Run one command under its budget.
+
+        Args:
+            fn: Runs the command once with the given timeout and raises
+                ``subprocess.TimeoutExpired`` when it is exceeded.
+            device_id: Device the command targets.
+            op: Command class (see :func:`classify_command`).
+            backend: "adb" or "hdc".
+            timeout: Per-attempt timeout overriding the class budget.
+
+        Returns:
+            The result of ``fn``.
+
+        Raises:
+            subprocess.TimeoutExpired: If the last attempt timed out.
+            TaskCancelled: If the current task was cancelled.
+        """
+        budget, retries = self.budget(op)
+        if timeout is not None:
+            budget = timeout
+        labels = {"op": op, "backend": backend, "device": device_id or "default"}
+        health = self.health(device_id, backend)
+        attempt = 0
+        while True:
+            cancellation.check_cancelled()
+            start = time.perf_counter()
+            try:
+                result = fn(budget)
+            except subprocess.TimeoutExpired:
+                COMMAND_SECONDS.observe(time.perf_counter() - start, **labels)
+                COMMAND_TIMEOUTS.inc(**labels)
+                self._on_timeout(health, device_id)
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                COMMAND_RETRIES.inc(**labels)
+                with self._lock:
+                    health.retries += 1
+                cancellation.sleep(self._backoff(attempt))
+                continue
+
+            elapsed = time.perf_counter() - start
+            COMMAND_SECONDS.observe(elapsed, **labels)
+            with self._lock:
+                health.commands += 1
+                health.consecutive_timeouts = 0
+                health._sample(0.5 if elapsed > budget / 2 else 1.0)
+            return result
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        config = TIMING_CONFIG.command
+        jitter = random.uniform(1.0 - config.retry_jitter, 1.0 + config.retry_jitter)
+        return max(0.0, config.retry_backoff * (2 ** (attempt - 1)) * jitter)
+
+    def _on_timeout(self, health: DeviceHealth, device_id: str | None) -> None:
+        config = TIMING_CONFIG.command
+        now = time.monotonic()
+        with self._lock:
+            health.commands += 1
+            health.timeouts += 1
+            health.consecutive_timeouts += 1
+            health.last_timeout = time.time()
+            health._sample(0.0)
+            due = (
+                config.restart_after_timeouts > 0
+                and health.consecutive_timeouts >= config.restart_after_timeouts
+                and (
+                    health.last_recovery is None
+                    or now - health.last_recovery >= config.restart_cooldown
+                )
+                and health.backend not in self._recovering
+            )
+            if not due:
+                return
+            # One restart per server at a time; other devices share it.
+            self._recovering.add(health.backend)
+            health.last_recovery = now
+
+        try:
+            ok = bool(self._recover(health.backend, device_id))
+        except Exception:
+            ok = False
+        finally:
+            with self._lock:
+                self._recovering.discard(health.backend)
+        with self._lock:
+            health.recoveries += 1
+            health.consecutive_timeouts = 0
+        DEVICE_RECOVERIES.inc(
+            backend=health.backend,
+            device=health.device,
+            result="ok" if ok else "failed",
+        )
+
+
+def _restart_server(backend: str, device_id: str | None) -> bool:
+    """Restart the adb/hdc server and reconnect a TCP device."""
+    if backend == "hdc":
+        from phone_agent.hdc.connection import HDCConnection
+
+        connection = HDCConnection()
+    else:
+        from phone_agent.adb.connection import ADBConnection
+
+        connection = ADBConnection()
+    ok, _ = connection.restart_server()
+    if ok and device_id and ":" in device_id:
+        ok, _ = connection.connect(device_id)
+    return ok
+
+
+_executor = CommandExecutor()
+
+
+def get_command_executor() -> CommandExecutor:
+    """The process-wide command executor."""
+    return _executor
+
+
+def get_device_health(
+    device_id: str | None = None, backend: str = "adb"
+) -> DeviceHealth:
+    """Health record of a device from the process-wide executor."""
+    return _executor.health(device_id, backend)
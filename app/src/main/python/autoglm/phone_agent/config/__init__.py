@@ -8,8 +8,10 @@ from phone_agent.config.prompts_zh import SYSTEM_PROMPT as SYSTEM_PROMPT_ZH
 from phone_agent.config.timing import (
     TIMING_CONFIG,
     ActionTimingConfig,
+    CommandTimingConfig,
     ConnectionTimingConfig,
     DeviceTimingConfig,
+    SettleConfig,
     TimingConfig,
     get_timing_config,
     update_timing_config,
@@ -48,6 +50,8 @@ __all__ = [
     "ActionTimingConfig",
     "DeviceTimingConfig",
     "ConnectionTimingConfig",
+    "SettleConfig",
+    "CommandTimingConfig",
     "get_timing_config",
     "update_timing_config",
 ]
@@ -23,6 +23,7 @@ MESSAGES_ZH = {
     "time_to_first_token": "首 Token 延迟 (TTFT)",
     "time_to_thinking_end": "思考完成延迟",
     "total_inference_time": "总推理时间",
+    "shared_prompt_prefix": "与上次请求共享前缀",
 }
 
 # English messages
@@ -48,6 +49,7 @@ MESSAGES_EN = {
     "time_to_first_token": "Time to First Token (TTFT)",
     "time_to_thinking_end": "Time to Thinking End",
     "total_inference_time": "Total Inference Time",
+    "shared_prompt_prefix": "Prefix Shared With Previous Request",
 }
 
 
@@ -47,6 +47,9 @@ class DeviceTimingConfig:
     default_back_delay: float = 1.0  # Default delay after back button
     default_home_delay: float = 1.0  # Default delay after home button
     default_launch_delay: float = 1.0  # Default delay after launching app
+    launch_verify_timeout: float = (
+        3.0  # Wait for a launch to show up before trying another command
+    )
 
     def __post_init__(self):
         """Load values from environment variables if present."""
@@ -74,6 +77,48 @@ class DeviceTimingConfig:
         self.default_launch_delay = float(
             os.getenv("PHONE_AGENT_LAUNCH_DELAY", self.default_launch_delay)
         )
+        self.launch_verify_timeout = float(
+            os.getenv("PHONE_AGENT_LAUNCH_VERIFY_TIMEOUT", self.launch_verify_timeout)
+        )
+
+
+@dataclass
+class SettleConfig:
+    """Configuration for adaptive screen-settle detection after actions.
+
+    When enabled, the fixed post-action delays are replaced by polling cheap
+    frame fingerprints until consecutive samples stop changing.
+    """
+
+    enabled: bool = False  # Use settle detection instead of fixed delays
+    min_delay: float = 0.2  # Floor: always wait at least this long
+    max_timeout: float = 1.5  # Cap: stop polling after this long
+    launch_max_timeout: float = 3.0  # Cap used for app launches
+    poll_interval: float = 0.08  # Pause between two fingerprint samples
+    stable_samples: int = 2  # Consecutive identical samples that count as settled
+
+    def __post_init__(self):
+        """Load values from environment variables if present."""
+        self.enabled = os.getenv("PHONE_AGENT_SETTLE", str(self.enabled)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        self.min_delay = float(
+            os.getenv("PHONE_AGENT_SETTLE_MIN_DELAY", self.min_delay)
+        )
+        self.max_timeout = float(
+            os.getenv("PHONE_AGENT_SETTLE_MAX_TIMEOUT", self.max_timeout)
+        )
+        self.launch_max_timeout = float(
+            os.getenv("PHONE_AGENT_SETTLE_LAUNCH_MAX_TIMEOUT", self.launch_max_timeout)
+        )
+        self.poll_interval = float(
+            os.getenv("PHONE_AGENT_SETTLE_POLL_INTERVAL", self.poll_interval)
+        )
+        self.stable_samples = int(
+            os.getenv("PHONE_AGENT_SETTLE_STABLE_SAMPLES", self.stable_samples)
+        )
 
 
 @dataclass
@@ -96,6 +141,60 @@ class ConnectionTimingConfig:
         )
 
 
+@dataclass
+class CommandTimingConfig:
+    """Timeout budgets and retries for device commands (adb/hdc subprocesses).
+
+    Read-only commands (queries, screen captures, file transfers) are retried
+    after a timeout; input and launch commands are not, since repeating one
+    that did run would tap or launch twice.
+    """
+
+    input_timeout: float = 5.0  # input tap/swipe/keyevent/text, uitest
+    query_timeout: float = 8.0  # dumpsys, getprop, settings, pm, cmd, ...
+    screencap_timeout: float = 10.0  # screencap and screenshot pulls
+    launch_timeout: float = 15.0  # am start, monkey, aa start
+    other_timeout: float = 15.0  # Anything else
+    query_retries: int = 1  # Extra attempts for read-only commands
+    retry_backoff: float = 0.2  # Base pause before a retry, doubled per attempt
+    retry_jitter: float = 0.5  # Random +/- fraction applied to the pause
+    restart_after_timeouts: int = 3  # Consecutive timeouts before restarting the server
+    restart_cooldown: float = 60.0  # Minimum seconds between two restarts
+
+    def __post_init__(self):
+        """Load values from environment variables if present."""
+        self.input_timeout = float(
+            os.getenv("PHONE_AGENT_CMD_INPUT_TIMEOUT", self.input_timeout)
+        )
+        self.query_timeout = float(
+            os.getenv("PHONE_AGENT_CMD_QUERY_TIMEOUT", self.query_timeout)
+        )
+        self.screencap_timeout = float(
+            os.getenv("PHONE_AGENT_CMD_SCREENCAP_TIMEOUT", self.screencap_timeout)
+        )
+        self.launch_timeout = float(
+            os.getenv("PHONE_AGENT_CMD_LAUNCH_TIMEOUT", self.launch_timeout)
+        )
+        self.other_timeout = float(
+            os.getenv("PHONE_AGENT_CMD_OTHER_TIMEOUT", self.other_timeout)
+        )
+        self.query_retries = int(
+            os.getenv("PHONE_AGENT_CMD_QUERY_RETRIES", self.query_retries)
+        )
+        self.retry_backoff = float(
+            os.getenv("PHONE_AGENT_CMD_RETRY_BACKOFF", self.retry_backoff)
+        )
+        self.retry_jitter = float(
+            os.getenv("PHONE_AGENT_CMD_RETRY_JITTER", self.retry_jitter)
+        )
+        self.restart_after_timeouts = int(
+            os.getenv("PHONE_AGENT_CMD_RESTART_AFTER", self.restart_after_timeouts)
+        )
+        self.restart_cooldown = float(
+            os.getenv("PHONE_AGENT_CMD_RESTART_COOLDOWN", self.restart_cooldown)
+        )
+
+
 @dataclass
 class TimingConfig:
     """Master timing configuration combining all timing settings."""
@@ -103,12 +202,16 @@ class TimingConfig:
     action: ActionTimingConfig
     device: DeviceTimingConfig
     connection: ConnectionTimingConfig
+    settle: SettleConfig
+    command: CommandTimingConfig
 
     def __init__(self):
         """Initialize all timing configurations."""
         self.action = ActionTimingConfig()
         self.device = DeviceTimingConfig()
         self.connection = ConnectionTimingConfig()
+        self.settle = SettleConfig()
+        self.command = CommandTimingConfig()
 
 
 # Global timing configuration instance
@@ -130,6 +233,8 @@ def update_timing_config(
     action: ActionTimingConfig | None = None,
     device: DeviceTimingConfig | None = None,
     connection: ConnectionTimingConfig | None = None,
+    settle: SettleConfig | None = None,
+    command: CommandTimingConfig | None = None,
 ) -> None:
     """
     Update the global timing configuration.
@@ -138,6 +243,8 @@ def update_timing_config(
         action: New action timing configuration.
         device: New device timing configuration.
         connection: New connection timing configuration.
+        settle: New screen-settle configuration.
+        command: New device command timeout configuration.
 
     Example:
         >>> from phone_agent.config.timing import update_timing_config, ActionTimingConfig
@@ -154,12 +261,17 @@ def update_timing_config(
         TIMING_CONFIG.device = device
     if connection is not None:
         TIMING_CONFIG.connection = connection
+    if settle is not None:
+        TIMING_CONFIG.settle = settle
+    if command is not None:
+        TIMING_CONFIG.command = command
 
 
 __all__ = [
     "ActionTimingConfig",
     "DeviceTimingConfig",
     "ConnectionTimingConfig",
+    "SettleConfig",
     "TimingConfig",
     "TIMING_CONFIG",
     "get_timing_config",
@@ -1,8 +1,13 @@
 """Device factory for selecting ADB or HDC based on device type."""
 
+import time
 from enum import Enum
 from typing import Any
 
+from phone_agent.cancellation import check_cancelled
+from phone_agent.command_executor import DeviceHealth, get_device_health
+from phone_agent.metrics import DEVICE_OP_ERRORS, DEVICE_OP_SECONDS, untimed_seconds
+
 
 class DeviceType(Enum):
     """Type of device connection tool."""
@@ -11,6 +16,7 @@ class DeviceType(Enum):
     HDC = "hdc"
     IOS = "ios"
     SHIZUKU = "shizuku"
+    MOCK = "mock"  # Simulated device (phone_agent.mock), no hardware needed
 
 
 class DeviceFactory:
@@ -46,29 +52,87 @@ class DeviceFactory:
                 from phone_agent import shizuku
 
                 self._module = shizuku
+            elif self.device_type == DeviceType.MOCK:
+                from phone_agent import mock
+
+                self._module = mock
             else:
                 raise ValueError(f"Unknown device type: {self.device_type}")
         return self._module
 
-    def get_screenshot(self, device_id: str | None = None, timeout: int = 10):
-        """Get screenshot from device."""
-        return self.module.get_screenshot(device_id, timeout)
+    def _timed(self, op: str, device_id: str | None, fn, *args):
+        """
+        Call a backend function, recording its latency and failures.
+
+        Post-action delays the backend sleeps in ``metrics.untimed()`` are
+        not part of the recorded latency.
+        """
+        # Refuse to start device work for a cancelled task; backends check
+        # the same token while they block (phone_agent.cancellation).
+        check_cancelled()
+        labels = {
+            "op": op,
+            "backend": self.device_type.value,
+            "device": device_id or "default",
+        }
+        start = time.perf_counter()
+        untimed_start = untimed_seconds()
+        try:
+            return fn(*args)
+        except Exception:
+            DEVICE_OP_ERRORS.inc(**labels)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            elapsed -= untimed_seconds() - untimed_start
+            DEVICE_OP_SECONDS.observe(elapsed, **labels)
+
+    def device_health(self, device_id: str | None = None) -> DeviceHealth:
+        """Command health of a device (timeouts, retries, recoveries)."""
+        return get_device_health(device_id, backend=self.device_type.value)
+
+    def get_screenshot(self, device_id: str | None = None, timeout: int | None = None):
+        """Get screenshot from device (``timeout`` defaults to the backend's own)."""
+        args = (device_id,) if timeout is None else (device_id, timeout)
+        return self._timed("screenshot", device_id, self.module.get_screenshot, *args)
+
+    @property
+    def supports_frame_fingerprint(self) -> bool:
+        """Whether the backend can fingerprint frames for settle detection."""
+        return hasattr(self.module, "get_frame_fingerprint")
+
+    def get_frame_fingerprint(self, device_id: str | None = None) -> str | None:
+        """Get a cheap fingerprint of the current frame, or None if unsupported."""
+        fn = getattr(self.module, "get_frame_fingerprint", None)
+        if fn is None:
+            return None
+        return self._timed("frame_fingerprint", device_id, fn, device_id)
 
     def get_current_app(self, device_id: str | None = None) -> str:
         """Get current app name."""
-        return self.module.get_current_app(device_id)
+        return self._timed(
+            "current_app", device_id, self.module.get_current_app, device_id
+        )
+
+    def invalidate_current_app(self, device_id: str | None = None) -> None:
+        """Forget the cached foreground app after an action that may change it."""
+        fn = getattr(self.module, "invalidate_current_app", None)
+        if fn is not None:
+            fn(device_id)
 
     def tap(
         self, x: int, y: int, device_id: str | None = None, delay: float | None = None
     ):
         """Tap at coordinates."""
-        return self.module.tap(x, y, device_id, delay)
+        return self._timed("tap", device_id, self.module.tap, x, y, device_id, delay)
 
     def double_tap(
         self, x: int, y: int, device_id: str | None = None, delay: float | None = None
     ):
         """Double tap at coordinates."""
-        return self.module.double_tap(x, y, device_id, delay)
+        return self._timed(
+            "double_tap", device_id, self.module.double_tap, x, y, device_id, delay
+        )
 
     def long_press(
         self,
@@ -79,7 +143,16 @@ class DeviceFactory:
         delay: float | None = None,
     ):
         """Long press at coordinates."""
-        return self.module.long_press(x, y, duration_ms, device_id, delay)
+        return self._timed(
+            "long_press",
+            device_id,
+            self.module.long_press,
+            x,
+            y,
+            duration_ms,
+            device_id,
+            delay,
+        )
 
     def swipe(
         self,
@@ -92,39 +165,73 @@ class DeviceFactory:
         delay: float | None = None,
     ):
         """Swipe from start to end."""
-        return self.module.swipe(
-            start_x, start_y, end_x, end_y, duration_ms, device_id, delay
+        return self._timed(
+            "swipe",
+            device_id,
+            self.module.swipe,
+            start_x,
+            start_y,
+            end_x,
+            end_y,
+            duration_ms,
+            device_id,
+            delay,
         )
 
     def back(self, device_id: str | None = None, delay: float | None = None):
         """Press back button."""
-        return self.module.back(device_id, delay)
+        return self._timed("back", device_id, self.module.back, device_id, delay)
 
     def home(self, device_id: str | None = None, delay: float | None = None):
         """Press home button."""
-        return self.module.home(device_id, delay)
+        return self._timed("home", device_id, self.module.home, device_id, delay)
 
     def launch_app(
         self, app_name: str, device_id: str | None = None, delay: float | None = None
     ) -> bool:
         """Launch an app."""
-        return self.module.launch_app(app_name, device_id, delay)
+        return self._timed(
+            "launch_app", device_id, self.module.launch_app, app_name, device_id, delay
+        )
 
     def type_text(self, text: str, device_id: str | None = None):
         """Type text."""
-        return self.module.type_text(text, device_id)
+        return self._timed(
+            "type_text", device_id, self.module.type_text, text, device_id
+        )
 
     def clear_text(self, device_id: str | None = None):
         """Clear text."""
-        return self.module.clear_text(device_id)
+        return self._timed("clear_text", device_id, self.module.clear_text, device_id)
 
     def detect_and_set_adb_keyboard(self, device_id: str | None = None) -> str:
         """Detect and set keyboard."""
-        return self.module.detect_and_set_adb_keyboard(device_id)
+        return self._timed(
+            "set_keyboard",
+            device_id,
+            self.module.detect_and_set_adb_keyboard,
+            device_id,
+        )
 
     def restore_keyboard(self, ime: str, device_id: str | None = None):
         """Restore keyboard."""
-        return self.module.restore_keyboard(ime, device_id)
+        return self._timed(
+            "restore_keyboard", device_id, self.module.restore_keyboard, ime, device_id
+        )
+
+    def create_keyboard_session(self, device_id: str | None = None):
+        """
+        Create a keyboard session that switches input methods once per task.
+
+        Backends with a dedicated session (ADB) use it; others get the
+        generic session driving this factory's keyboard functions.
+        """
+        create = getattr(self.module, "create_keyboard_session", None)
+        if create is not None:
+            return create(device_id)
+        from phone_agent.keyboard import KeyboardSession
+
+        return KeyboardSession(self, device_id)
 
     def list_devices(self):
         """List connected devices."""
@@ -140,7 +247,7 @@ class DeviceFactory:
             from phone_agent.hdc import HDCConnection
 
             return HDCConnection
-        elif self.device_type == DeviceType.SHIZUKU:
+        elif self.device_type in (DeviceType.SHIZUKU, DeviceType.MOCK):
             return None
         else:
             raise ValueError(f"Unknown device type: {self.device_type}")
@@ -0,0 +1,249 @@
+"""Typed step events and a bus to subscribe to them.
+
+``ModelClient`` emits token and thinking-end events while a response
+streams; ``PhoneAgent`` adds screenshot, action and step-timing events.
+Consumers subscribe to an :class:`EventBus` instead of parsing stdout.
+:class:`CoalescingDispatcher` batches token events so that a slow sink (a
+JNI callback, a socket) is called every few tens of milliseconds instead of
+once per streamed fragment.
+"""
+
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+
+@dataclass(frozen=True)
+class TokenEvent:
+    """A fragment of streamed model output."""
+
+    text: str
+    phase: str = "thinking"  # "thinking" before the action call, then "action"
+
+
+@dataclass(frozen=True)
+class ThinkingEndEvent:
+    """The model finished thinking and started the action call."""
+
+    elapsed: float  # Seconds since the request was sent
+
+
+@dataclass(frozen=True)
+class ScreenshotEvent:
+    """The screenshot observed at the start of a step."""
+
+    step: int
+    base64_data: str
+    width: int
+    height: int
+    mime: str = "image/png"
+
+
+@dataclass(frozen=True)
+class ActionEvent:
+    """The parsed action of a step, before it is executed."""
+
+    step: int
+    action: dict[str, Any]
+    raw: str = ""
+
+
+@dataclass(frozen=True)
+class StepTimingEvent:
+    """Stage timings of a finished step (``StepResult.timings``)."""
+
+    step: int
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+class EventBus:
+    """
+    Synchronous publish/subscribe for step events.
+
+    Handlers run in the emitting thread and must be quick; wrap slow ones in
+    a :class:`CoalescingDispatcher`. Exceptions raised by handlers are
+    swallowed so a faulty consumer cannot break the agent loop.
+
+    Example:
+        >>> bus = EventBus()
+        >>> unsubscribe = bus.subscribe(lambda e: print(e.text, end=""), TokenEvent)
+        >>> agent = PhoneAgent(model_config, events=bus)
+    """
+
+    def __init__(self):
+        self._subscribers: tuple[
+            tuple[tuple[type, ...], Callable[[Any], None]], ...
+        ] = ()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """Whether anyone is subscribed (emitters can skip building events)."""
+        return bool(self._subscribers)
+
+    def subscribe(
+        self, handler: Callable[[Any], None], *event_types: type
+    ) -> Callable[[], None]:
+        """
+        Subscribe a handler.
+
+        Args:
+            handler: Called with each event.
+            *event_types: Event classes to receive; all events if omitted.
+
+        Returns:
+            Function that removes the subscription.
+        """
+        entry = (tuple(event_types), handler)
+        with self._lock:
+            self._subscribers = self._subscribers + (entry,)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                self._subscribers = tuple(
+                    s for s in self._subscribers if s is not entry
+                )
+
+        return unsubscribe
+
+    def emit(self, event: Any) -> None:
+        """Deliver an event to the matching subscribers."""
+        for event_types, handler in self._subscribers:
+            if event_types and not isinstance(event, event_types):
+                continue
+            try:
+                handler(event)
+            except Exception:
+                pass
+
+
+class _Flush:
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+def _default_interval() -> float:
+    try:
+        return float(os.getenv("PHONE_AGENT_EVENT_COALESCE_MS", "50")) / 1000.0
+    except ValueError:
+        return 0.05
+
+
+class CoalescingDispatcher:
+    """
+    Deliver events to a slow handler from a background thread, merging tokens.
+
+    Consecutive token events of the same phase that arrive within
+    ``interval`` seconds of the first one are delivered as one event. Other
+    events are delivered in order, after any pending tokens.
+
+    Args:
+        handler: Receives the (merged) events.
+        interval: Coalescing window in seconds; defaults to
+            ``PHONE_AGENT_EVENT_COALESCE_MS`` (50 ms).
+        max_chars: Deliver merged tokens early once they reach this size.
+
+    Example:
+        >>> dispatcher = CoalescingDispatcher(send_to_ui)
+        >>> bus.subscribe(dispatcher, TokenEvent)
+        >>> ...
+        >>> dispatcher.close()
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], None],
+        interval: float | None = None,
+        max_chars: int = 4096,
+    ):
+        self.handler = handler
+        self.interval = _default_interval() if interval is None else interval
+        self.max_chars = max_chars
+        self.received = 0
+        self.delivered = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="event-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def __call__(self, event: Any) -> None:
+        if not self._closed:
+            self.received += 1
+            self._queue.put(event)
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """Block until everything emitted so far has been delivered."""
+        if self._closed:
+            return
+        marker = _Flush()
+        self._queue.put(marker)
+        marker.done.wait(timeout)
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Deliver pending events and stop the dispatcher thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _deliver(self, event: Any) -> None:
+        self.delivered += 1
+        try:
+            self.handler(event)
+        except Exception:
+            pass
+
+    def _run(self) -> None:
+        parts: list[str] = []
+        phase = ""
+        size = 0
+        deadline = 0.0
+
+        def flush_tokens() -> None:
+            nonlocal parts, size
+            if parts:
+                self._deliver(TokenEvent("".join(parts), phase))
+                parts, size = [], 0
+
+        while True:
+            try:
+                if parts:
+                    item = self._queue.get(
+                        timeout=max(0.0, deadline - time.monotonic())
+                    )
+                else:
+                    item = self._queue.get()
+            except queue.Empty:
+                flush_tokens()
+                continue
+
+            if isinstance(item, TokenEvent):
+                if parts and item.phase != phase:
+                    flush_tokens()
+                if not parts:
+                    phase = item.phase
+                    deadline = time.monotonic() + self.interval
+                parts.append(item.text)
+                size += len(item.text)
+                if size >= self.max_chars:
+                    flush_tokens()
+                continue
+
+            flush_tokens()
+            if item is _STOP:
+                return
+            if isinstance(item, _Flush):
+                item.done.set()
+                continue
+            self._deliver(item)
@@ -0,0 +1,242 @@
+"""Run many PhoneAgent tasks in parallel across a fleet of devices."""
+
+import queue
+import statistics
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field, replace
+from typing import Callable, Iterable
+
+from phone_agent.agent import AgentConfig, PhoneAgent
+from phone_agent.device_factory import DeviceFactory, DeviceType
+from phone_agent.model import ModelClient, ModelConfig
+
+
+@dataclass
+class FleetTaskResult:
+    """Outcome of one task executed on one device."""
+
+    task: str
+    device_id: str
+    message: str
+    success: bool
+    steps: int
+    duration: float
+    step_latencies: list[float] = field(default_factory=list)
+    error: str | None = None
+
+
+@dataclass
+class FleetReport:
+    """Aggregate results and throughput of a fleet run."""
+
+    results: list[FleetTaskResult]
+    wall_time: float
+    devices: int
+
+    @property
+    def tasks(self) -> int:
+        return len(self.results)
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for r in self.results if not r.success)
+
+    @property
+    def steps(self) -> int:
+        return sum(r.steps for r in self.results)
+
+    @property
+    def tasks_per_hour(self) -> float:
+        return self.tasks * 3600.0 / self.wall_time if self.wall_time > 0 else 0.0
+
+    @property
+    def steps_per_sec(self) -> float:
+        return self.steps / self.wall_time if self.wall_time > 0 else 0.0
+
+    def step_latency_percentile(self, p: float) -> float:
+        """Step latency percentile in seconds over all tasks (p in 0..1)."""
+        latencies = sorted(x for r in self.results for x in r.step_latencies)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    def summary(self) -> dict[str, float]:
+        """Throughput figures as a flat dictionary."""
+        durations = [r.duration for r in self.results]
+        return {
+            "devices": self.devices,
+            "tasks": self.tasks,
+            "failed": self.failed,
+            "steps": self.steps,
+            "wall_time": self.wall_time,
+            "tasks_per_hour": self.tasks_per_hour,
+            "steps_per_sec": self.steps_per_sec,
+            "step_p50": self.step_latency_percentile(0.5),
+            "step_p95": self.step_latency_percentile(0.95),
+            "task_mean": statistics.mean(durations) if durations else 0.0,
+        }
+
+
+class FleetRunner:
+    """
+    Execute a queue of tasks over several devices in one process.
+
+    One worker thread per device pulls tasks from a shared queue and runs
+    them with its own PhoneAgent and DeviceFactory. All agents share one
+    ModelClient, and with it the pooled HTTP connections to the model server;
+    the shared client runs with ``verbose=False``.
+
+    Args:
+        device_ids: Devices to drive. Defaults to every ADB device in the
+            "device" state.
+        model_config: Configuration for the shared model client.
+        agent_config: Template agent configuration; ``device_id`` is filled
+            in per device.
+        device_type: Device backend for all devices.
+        on_result: Optional callback invoked (from worker threads) after each
+            task finishes.
+
+    Example:
+        >>> runner = FleetRunner(model_config=ModelConfig(base_url=url))
+        >>> report = runner.run(["Open Settings", "Open WeChat"])
+        >>> print(report.summary())
+    """
+
+    def __init__(
+        self,
+        device_ids: list[str] | None = None,
+        model_config: ModelConfig | None = None,
+        agent_config: AgentConfig | None = None,
+        device_type: DeviceType = DeviceType.ADB,
+        on_result: Callable[[FleetTaskResult], None] | None = None,
+    ):
+        self.device_type = device_type
+        self.device_ids = (
+            device_ids if device_ids is not None else self._discover_devices()
+        )
+        self.model_config = model_config or ModelConfig()
+        self.agent_config = agent_config or AgentConfig(verbose=False)
+        # Streamed thinking from several devices would interleave on stdout.
+        self.model_client = ModelClient(replace(self.model_config, verbose=False))
+        self.on_result = on_result
+        self._stop = threading.Event()
+
+    def _discover_devices(self) -> list[str]:
+        connection_class = DeviceFactory(self.device_type).get_connection_class()
+        if connection_class is None:
+            return []
+        return [
+            d.device_id
+            for d in connection_class().list_devices()
+            if d.status == "device"
+        ]
+
+    def stop(self) -> None:
+        """Stop handing out new tasks; running tasks finish normally."""
+        self._stop.set()
+
+    def create_agent(self, device_id: str) -> PhoneAgent:
+        """Create the agent for one device."""
+        return PhoneAgent(
+            model_config=self.model_config,
+            agent_config=replace(self.agent_config, device_id=device_id),
+            confirmation_callback=lambda message: False,
+            takeover_callback=lambda message: None,
+            model_client=self.model_client,
+            device_factory=DeviceFactory(self.device_type),
+        )
+
+    def run(self, tasks: Iterable[str]) -> FleetReport:
+        """
+        Run all tasks and block until they are done.
+
+        Args:
+            tasks: Natural language tasks; each runs on whichever device is free.
+
+        Returns:
+            FleetReport with per-task results and aggregate throughput.
+        """
+        if not self.device_ids:
+            raise ValueError("No devices available for the fleet")
+
+        pending: queue.Queue[str] = queue.Queue()
+        for task in tasks:
+            pending.put(task)
+
+        results: list[FleetTaskResult] = []
+        results_lock = threading.Lock()
+        self._stop.clear()
+
+        def worker(device_id: str) -> None:
+            agent = self.create_agent(device_id)
+            try:
+                while not self._stop.is_set():
+                    try:
+                        task = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    result = self._run_task(agent, device_id, task)
+                    with results_lock:
+                        results.append(result)
+                    if self.on_result is not None:
+                        self.on_result(result)
+            finally:
+                agent.close()
+
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(
+                target=worker, args=(device_id,), name=f"fleet-{device_id}"
+            )
+            for device_id in self.device_ids
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return FleetReport(
+            results=results,
+            wall_time=time.perf_counter() - start,
+            devices=len(self.device_ids),
+        )
+
+    def _run_task(
+        self, agent: PhoneAgent, device_id: str, task: str
+    ) -> FleetTaskResult:
+        agent.reset()
+        latencies: list[float] = []
+        start = time.perf_counter()
+        try:
+            step = agent.step(task)
+            latencies.append(step.timings.get("step", 0.0))
+            while not step.finished and agent.step_count < agent.agent_config.max_steps:
+                step = agent.step()
+                latencies.append(step.timings.get("step", 0.0))
+
+            if step.finished:
+                message = step.message or "Task completed"
+            else:
+                message = "Max steps reached"
+            return FleetTaskResult(
+                task=task,
+                device_id=device_id,
+                message=message,
+                success=step.finished and step.success,
+                steps=agent.step_count,
+                duration=time.perf_counter() - start,
+                step_latencies=latencies,
+            )
+        except Exception as e:
+            return FleetTaskResult(
+                task=task,
+                device_id=device_id,
+                message=f"Error: {e}",
+                success=False,
+                steps=agent.step_count,
+                duration=time.perf_counter() - start,
+                step_latencies=latencies,
+                error=traceback.format_exc(),
+            )
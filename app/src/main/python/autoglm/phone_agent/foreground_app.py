@@ -0,0 +1,163 @@
+"""Foreground app detection shared by the ADB, HDC and Shizuku backends.
+
+Each backend supplies a list of focus queries, from cheapest to most
+expensive, that return only the few lines naming the focused window or top
+activity. Package names found in those lines are resolved through a reverse
+index built once from the app tables. Results are cached per device until an
+action that may change focus invalidates them (or a maximum age passes, for
+focus changes nobody told us about).
+"""
+
+import functools
+import re
+import threading
+import time
+from typing import Callable
+
+from phone_agent.metrics import FOREGROUND_LOOKUPS, FOREGROUND_QUERY_SECONDS
+
+# Dotted identifiers such as "com.tencent.mm" or "com.tencent.mm.ui.LauncherUI".
+_PACKAGE_RE = re.compile(r"[A-Za-z][\w]*(?:\.[\w]+)+")
+
+DEFAULT_APP_NAME = "System Home"
+
+
+@functools.lru_cache(maxsize=4)
+def get_app_index(platform: str = "android") -> dict[str, str]:
+    """
+    Get the package/bundle -> display name index for all known apps.
+
+    Built once from ``APP_PACKAGES`` (Android), ``apps_harmonyos`` and
+    ``apps_ios``. When several names share a package, the first one in the
+    platform's own table wins, matching the old linear scan.
+
+    Args:
+        platform: "android" or "harmonyos"; its table takes precedence.
+
+    Returns:
+        Mapping of package name to app display name.
+    """
+    from phone_agent.config.apps import APP_PACKAGES
+    from phone_agent.config.apps_harmonyos import APP_PACKAGES as APP_PACKAGES_HARMONYOS
+    from phone_agent.config.apps_ios import APP_PACKAGES_IOS
+
+    if platform == "harmonyos":
+        tables = (APP_PACKAGES_HARMONYOS, APP_PACKAGES, APP_PACKAGES_IOS)
+    else:
+        tables = (APP_PACKAGES, APP_PACKAGES_HARMONYOS, APP_PACKAGES_IOS)
+
+    index: dict[str, str] = {}
+    for table in tables:
+        for name, package in table.items():
+            index.setdefault(package, name)
+    return index
+
+
+def resolve_app_name(text: str, platform: str = "android") -> str | None:
+    """
+    Find the first known app referenced in focus query output.
+
+    Args:
+        text: Output lines of a focus query (e.g. mCurrentFocus/mFocusedApp).
+        platform: Index to use, see :func:`get_app_index`.
+
+    Returns:
+        App display name, or None if no known package is referenced.
+    """
+    index = get_app_index(platform)
+    for line in text.splitlines():
+        for token in _PACKAGE_RE.findall(line):
+            name = index.get(token)
+            if name is not None:
+                return name
+    return None
+
+
+class ForegroundAppDetector:
+    """
+    Cached foreground app lookup for one backend.
+
+    Args:
+        queries: Focus queries ``fn(device_id) -> str``, cheapest first. The
+            first query that returns output is remembered per device and
+            tried first afterwards.
+        platform: App index to resolve names with.
+        max_age: Seconds after which a cached result is refreshed even if no
+            action invalidated it.
+    """
+
+    def __init__(
+        self,
+        queries: list[Callable[[str | None], str]],
+        platform: str = "android",
+        max_age: float = 15.0,
+    ):
+        self.queries = queries
+        self.platform = platform
+        self.max_age = max_age
+        self._cache: dict[str | None, tuple[str, float]] = {}
+        self._preferred: dict[str | None, int] = {}
+        # Bumped on invalidation so a query that raced with an action does
+        # not cache its (possibly stale) answer.
+        self._generation: dict[str | None, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, device_id: str | None = None) -> str:
+        """
+        Get the foreground app name.
+
+        Args:
+            device_id: Optional device ID for multi-device setups.
+
+        Returns:
+            The app name if recognized, otherwise "System Home".
+
+        Raises:
+            ValueError: If no focus query produced any output.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(device_id)
+            preferred = self._preferred.get(device_id, 0)
+            generation = self._generation.get(device_id, 0)
+        if cached is not None and now - cached[1] < self.max_age:
+            FOREGROUND_LOOKUPS.inc(platform=self.platform, result="hit")
+            return cached[0]
+        FOREGROUND_LOOKUPS.inc(platform=self.platform, result="miss")
+
+        query_start = time.perf_counter()
+        order = [preferred] + [i for i in range(len(self.queries)) if i != preferred]
+        output = ""
+        for i in order:
+            try:
+                output = self.queries[i](device_id) or ""
+            except Exception:
+                output = ""
+            if output.strip():
+                with self._lock:
+                    self._preferred[device_id] = i
+                break
+        FOREGROUND_QUERY_SECONDS.observe(
+            time.perf_counter() - query_start, platform=self.platform
+        )
+        if not output.strip():
+            raise ValueError("No output from foreground app query")
+
+        name = resolve_app_name(output, self.platform) or DEFAULT_APP_NAME
+        with self._lock:
+            if self._generation.get(device_id, 0) == generation:
+                self._cache[device_id] = (name, time.monotonic())
+        return name
+
+    def invalidate(self, device_id: str | None = None) -> None:
+        """Drop the cached result for a device."""
+        with self._lock:
+            self._cache.pop(device_id, None)
+            self._generation[device_id] = self._generation.get(device_id, 0) + 1
+
+    def invalidate_all(self) -> None:
+        """Drop cached results for all devices."""
+        with self._lock:
+            for device_id in set(self._cache) | set(self._generation):
+                self._generation[device_id] = self._generation.get(device_id, 0) + 1
+            self._cache.clear()
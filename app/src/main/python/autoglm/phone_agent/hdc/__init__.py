@@ -12,6 +12,7 @@ from phone_agent.hdc.device import (
     back,
     double_tap,
     get_current_app,
+    invalidate_current_app,
     home,
     launch_app,
     long_press,
@@ -24,6 +25,7 @@ from phone_agent.hdc.input import (
     restore_keyboard,
     type_text,
 )
+from phone_agent.hdc.launcher import AbilityIndex, get_ability_index
 from phone_agent.hdc.screenshot import get_screenshot
 
 __all__ = [
@@ -36,6 +38,7 @@ __all__ = [
     "restore_keyboard",
     # Device control
     "get_current_app",
+    "invalidate_current_app",
     "tap",
     "swipe",
     "back",
@@ -43,6 +46,8 @@ __all__ = [
     "double_tap",
     "long_press",
     "launch_app",
+    "AbilityIndex",
+    "get_ability_index",
     # Connection management
     "HDCConnection",
     "DeviceInfo",
@@ -7,6 +7,8 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
 
+from phone_agent.cancellation import run_process
+from phone_agent.command_executor import classify_command, get_command_executor
 from phone_agent.config.timing import TIMING_CONFIG
 
 
@@ -18,9 +20,14 @@ def _run_hdc_command(cmd: list, **kwargs) -> subprocess.CompletedProcess:
     """
     Run HDC command with optional verbose output.
 
+    The command runs under the command executor (timeout budget, retries of
+    read-only commands, device health), and is killed if the current task is
+    cancelled.
+
     Args:
         cmd: Command list to execute.
-        **kwargs: Additional arguments for subprocess.run.
+        **kwargs: Additional arguments for subprocess.run; ``timeout`` is
+            per attempt and defaults to the command class budget.
 
     Returns:
         CompletedProcess result.
@@ -28,7 +35,15 @@ def _run_hdc_command(cmd: list, **kwargs) -> subprocess.CompletedProcess:
     if _HDC_VERBOSE:
         print(f"[HDC] Running command: {' '.join(cmd)}")
 
-    result = subprocess.run(cmd, **kwargs)
+    timeout = kwargs.pop("timeout", None)
+    device_id = cmd[cmd.index("-t") + 1] if "-t" in cmd[:-1] else None
+    result = get_command_executor().run(
+        lambda t: run_process(cmd, timeout=t, **kwargs),
+        device_id=device_id,
+        op=classify_command(cmd),
+        backend="hdc",
+        timeout=timeout,
+    )
 
     if _HDC_VERBOSE and result.returncode != 0:
         print(f"[HDC] Command failed with return code {result.returncode}")
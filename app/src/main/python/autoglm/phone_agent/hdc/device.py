@@ -2,44 +2,76 @@
 
 import os
 import subprocess
-import time
 from typing import List, Optional, Tuple
 
-from phone_agent.config.apps_harmonyos import APP_ABILITIES, APP_PACKAGES
+from phone_agent import cancellation
+from phone_agent.config.apps_harmonyos import APP_PACKAGES
 from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.foreground_app import ForegroundAppDetector
 from phone_agent.hdc.connection import _run_hdc_command
+from phone_agent.hdc.launcher import launch_bundle
+from phone_agent.metrics import untimed
+
+
+def _query_focus_filtered(device_id: str | None) -> str:
+    # Filter on the device so only the focus lines are transferred.
+    hdc_prefix = _get_hdc_prefix(device_id)
+    result = _run_hdc_command(
+        hdc_prefix
+        + ["shell", "hidumper -s WindowManagerService -a -a | grep -iE 'focus|current'"],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        timeout=10,
+    )
+    return result.stdout
+
+
+def _query_focus_full(device_id: str | None) -> str:
+    hdc_prefix = _get_hdc_prefix(device_id)
+    result = _run_hdc_command(
+        hdc_prefix + ["shell", "hidumper", "-s", "WindowManagerService", "-a", "-a"],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        timeout=15,
+    )
+    output = result.stdout or ""
+    if not output:
+        return ""
+    lines = [
+        line
+        for line in output.split("\n")
+        if "focused" in line.lower() or "current" in line.lower()
+    ]
+    # Keep a non-empty answer so a dump without focus lines maps to "System Home".
+    return "\n".join(lines) or "\n"
+
+
+_foreground = ForegroundAppDetector(
+    [_query_focus_filtered, _query_focus_full], platform="harmonyos"
+)
 
 
 def get_current_app(device_id: str | None = None) -> str:
     """
     Get the currently focused app name.
 
+    The result is cached until :func:`invalidate_current_app` is called for
+    the device (after any action that may change focus).
+
     Args:
         device_id: Optional HDC device ID for multi-device setups.
 
     Returns:
         The app name if recognized, otherwise "System Home".
     """
-    hdc_prefix = _get_hdc_prefix(device_id)
-
-    result = _run_hdc_command(
-        hdc_prefix + ["shell", "hidumper", "-s", "WindowManagerService", "-a", "-a"],
-        capture_output=True,
-        text=True,
-        encoding="utf-8"
-    )
-    output = result.stdout
-    if not output:
-        raise ValueError("No output from hidumper")
+    return _foreground.get(device_id)
 
-    # Parse window focus info
-    for line in output.split("\n"):
-        if "focused" in line.lower() or "current" in line.lower():
-            for app_name, package in APP_PACKAGES.items():
-                if package in line:
-                    return app_name
 
-    return "System Home"
+def invalidate_current_app(device_id: str | None = None) -> None:
+    """Forget the cached foreground app of a device."""
+    _foreground.invalidate(device_id)
 
 
 def tap(
@@ -64,7 +96,8 @@ def tap(
         hdc_prefix + ["shell", "uitest", "uiInput", "click", str(x), str(y)],
         capture_output=True
     )
-    time.sleep(delay)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def double_tap(
@@ -89,7 +122,8 @@ def double_tap(
         hdc_prefix + ["shell", "uitest", "uiInput", "doubleClick", str(x), str(y)],
         capture_output=True
     )
-    time.sleep(delay)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def long_press(
@@ -120,7 +154,8 @@ def long_press(
         hdc_prefix + ["shell", "uitest", "uiInput", "longClick", str(x), str(y)],
         capture_output=True,
     )
-    time.sleep(delay)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def swipe(
@@ -172,7 +207,8 @@ def swipe(
         ],
         capture_output=True,
     )
-    time.sleep(delay)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def back(device_id: str | None = None, delay: float | None = None) -> None:
@@ -193,7 +229,8 @@ def back(device_id: str | None = None, delay: float | None = None) -> None:
         hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", "Back"],
         capture_output=True
     )
-    time.sleep(delay)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def home(device_id: str | None = None, delay: float | None = None) -> None:
@@ -214,7 +251,8 @@ def home(device_id: str | None = None, delay: float | None = None) -> None:
         hdc_prefix + ["shell", "uitest", "uiInput", "keyEvent", "Home"],
         capture_output=True
     )
-    time.sleep(delay)
+    with untimed():
+        cancellation.sleep(delay)
 
 
 def launch_app(
@@ -239,29 +277,13 @@ def launch_app(
         print(f"[HDC] Available apps: {', '.join(sorted(APP_PACKAGES.keys())[:10])}...")
         return False
 
-    hdc_prefix = _get_hdc_prefix(device_id)
     bundle = APP_PACKAGES[app_name]
 
-    # Get the ability name for this bundle
-    # Default to "EntryAbility" if not specified in APP_ABILITIES
-    ability = APP_ABILITIES.get(bundle, "EntryAbility")
-
-    # HarmonyOS uses 'aa start' command to launch apps
-    # Format: aa start -b {bundle} -a {ability}
-    _run_hdc_command(
-        hdc_prefix
-        + [
-            "shell",
-            "aa",
-            "start",
-            "-b",
-            bundle,
-            "-a",
-            ability,
-        ],
-        capture_output=True,
-    )
-    time.sleep(delay)
+    # HarmonyOS uses 'aa start -b {bundle} -a {ability}'; the ability comes
+    # from APP_ABILITIES or from a per-device cache filled via 'bm dump'.
+    launch_bundle(bundle, device_id)
+    with untimed():
+        cancellation.sleep(delay)
     return True
 
 
@@ -0,0 +1,156 @@
+"""Main-ability index and ``aa start`` launches for HarmonyOS."""
+
+import re
+import time
+
+from phone_agent.config.apps_harmonyos import APP_ABILITIES
+from phone_agent.hdc.connection import _run_hdc_command
+from phone_agent.persistent_cache import JsonCache
+
+_MAIN_ABILITY_RE = re.compile(r'"(?:mainElementName|mainAbility)"\s*:\s*"([^"]+)"')
+_VERSION_RE = re.compile(r'"versionCode"\s*:\s*(\d+)')
+
+DEFAULT_ABILITY = "EntryAbility"
+
+
+def _hdc_prefix(device_id: str | None) -> list:
+    return ["hdc", "-t", device_id] if device_id else ["hdc"]
+
+
+class AbilityIndex:
+    """
+    Per-device index of bundle main abilities, persisted across runs.
+
+    Bundles listed in ``APP_ABILITIES`` use the table. Others are resolved
+    once from ``bm dump -n`` and cached with their versionCode; an entry is
+    dropped when ``aa start`` fails with it.
+
+    Args:
+        cache: Backing store; defaults to ``hdc_abilities.json`` in the
+            persistent cache directory.
+    """
+
+    def __init__(self, cache: JsonCache | None = None):
+        self.cache = cache or JsonCache("hdc_abilities.json")
+
+    @staticmethod
+    def _key(bundle: str, device_id: str | None) -> str:
+        return f"{device_id or 'default'}|{bundle}"
+
+    def get(self, bundle: str, device_id: str | None = None) -> dict | None:
+        """Get the cached entry of a bundle, if any."""
+        return self.cache.get(self._key(bundle, device_id))
+
+    def resolve(self, bundle: str, device_id: str | None = None) -> str:
+        """
+        Get the ability to start for a bundle.
+
+        Args:
+            bundle: Bundle name.
+            device_id: Optional HDC device ID for multi-device setups.
+
+        Returns:
+            Ability name; "EntryAbility" if it cannot be determined.
+        """
+        if bundle in APP_ABILITIES:
+            return APP_ABILITIES[bundle]
+        entry = self.get(bundle, device_id)
+        if entry and entry.get("ability"):
+            return entry["ability"]
+
+        try:
+            result = _run_hdc_command(
+                _hdc_prefix(device_id) + ["shell", "bm", "dump", "-n", bundle],
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                timeout=10,
+            )
+            output = result.stdout or ""
+        except Exception:
+            return DEFAULT_ABILITY
+
+        ability = _MAIN_ABILITY_RE.search(output)
+        if ability is None:
+            return DEFAULT_ABILITY
+        version = _VERSION_RE.search(output)
+        self.cache.set(
+            self._key(bundle, device_id),
+            {
+                "ability": ability.group(1),
+                "version": int(version.group(1)) if version else None,
+            },
+        )
+        return ability.group(1)
+
+    def record_launch(
+        self, bundle: str, launch_ms: int, device_id: str | None = None
+    ) -> None:
+        """Store the last measured launch time of a bundle."""
+        key = self._key(bundle, device_id)
+        entry = self.cache.get(key)
+        # Only resolved entries; table and fallback abilities have none.
+        if entry and entry.get("ability"):
+            self.cache.set(key, {**entry, "launch_ms": launch_ms})
+
+    def invalidate(self, bundle: str, device_id: str | None = None) -> None:
+        """Drop the entry of a bundle."""
+        self.cache.pop(self._key(bundle, device_id))
+
+
+_index = AbilityIndex()
+
+
+def get_ability_index() -> AbilityIndex:
+    """Get the process-wide ability index."""
+    return _index
+
+
+def start_ability(
+    bundle: str, ability: str, device_id: str | None = None
+) -> tuple[bool, int]:
+    """
+    Start an ability with ``aa start``.
+
+    Returns:
+        Tuple of (success, wall-clock launch time in milliseconds).
+    """
+    start = time.perf_counter()
+    try:
+        result = _run_hdc_command(
+            _hdc_prefix(device_id)
+            + ["shell", "aa", "start", "-b", bundle, "-a", ability],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            timeout=15,
+        )
+        output = (result.stdout or "") + (result.stderr or "")
+        ok = result.returncode == 0 and "error" not in output.lower()
+    except Exception:
+        ok = False
+    return ok, int((time.perf_counter() - start) * 1000)
+
+
+def launch_bundle(bundle: str, device_id: str | None = None) -> tuple[bool, int]:
+    """
+    Launch a bundle through its cached main ability.
+
+    A failed start with a cached ability drops the entry and retries once
+    with a freshly resolved one.
+
+    Returns:
+        Tuple of (success, launch time in milliseconds).
+    """
+    index = get_ability_index()
+    entry = None if bundle in APP_ABILITIES else index.get(bundle, device_id)
+    cached = bool(entry and entry.get("ability"))
+    ok, launch_ms = start_ability(bundle, index.resolve(bundle, device_id), device_id)
+    if not ok and cached:
+        index.invalidate(bundle, device_id)
+        ok, launch_ms = start_ability(
+            bundle, index.resolve(bundle, device_id), device_id
+        )
+    if ok:
+        index.record_launch(bundle, launch_ms, device_id)
+    return ok, launch_ms
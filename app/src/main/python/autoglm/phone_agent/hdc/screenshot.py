@@ -11,6 +11,7 @@ from typing import Tuple
 
 from PIL import Image
 from phone_agent.hdc.connection import _run_hdc_command
+from phone_agent.imaging import fallback_frame
 
 
 @dataclass
@@ -112,10 +113,7 @@ def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
     """Create a black fallback image when screenshot fails."""
     default_width, default_height = 1080, 2400
 
-    black_img = Image.new("RGB", (default_width, default_height), color="black")
-    buffered = BytesIO()
-    black_img.save(buffered, format="PNG")
-    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
+    base64_data, _ = fallback_frame(default_width, default_height, image_format="PNG")
 
     return Screenshot(
         base64_data=base64_data,
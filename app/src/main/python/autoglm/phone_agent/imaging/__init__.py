@@ -0,0 +1,16 @@
+"""Shared image utilities for screenshot backends."""
+
+from phone_agent.imaging.frames import fallback_frame, is_likely_black_image
+from phone_agent.imaging.jpeg import JpegTargetEncoder, encode_jpeg_to_target
+from phone_agent.imaging.preview import make_preview
+from phone_agent.imaging.raw import decode_raw_screencap, parse_raw_screencap
+
+__all__ = [
+    "JpegTargetEncoder",
+    "decode_raw_screencap",
+    "encode_jpeg_to_target",
+    "fallback_frame",
+    "is_likely_black_image",
+    "make_preview",
+    "parse_raw_screencap",
+]
@@ -0,0 +1,96 @@
+"""Black-frame detection and cached fallback frames."""
+
+import base64
+import functools
+from io import BytesIO
+
+from PIL import Image, ImageChops
+
+from phone_agent.imaging.jpeg import encode_jpeg_to_target
+
+# A channel value above this counts as "lit".
+_BLACK_LEVEL = 10
+# Sample grid for the black-frame check and the number of lit samples that
+# make a frame non-black (~0.5% of a 64x64 grid).
+_SAMPLE_SIZE = 64
+_MIN_LIT_SAMPLES = 20
+
+
+def _sample(img: Image.Image, owned: bool) -> Image.Image:
+    """Decode a small RGB version of the image as cheaply as the format allows."""
+    w, h = img.size
+    target = (min(_SAMPLE_SIZE, w), min(_SAMPLE_SIZE, h))
+    if owned and img.format == "JPEG":
+        # DCT scaling: decode at 1/2..1/8 resolution straight from the stream.
+        # draft() mutates the image, so only do it on images we opened.
+        img.draft("RGB", target)
+        target = (min(target[0], img.size[0]), min(target[1], img.size[1]))
+    elif img.mode not in ("1", "P"):
+        # Box-reduce in C before any mode conversion touches the full frame.
+        factor = max(1, min(img.size[0] // target[0], img.size[1] // target[1]))
+        if factor > 1:
+            img = img.reduce(factor)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if img.size != target:
+        img = img.resize(target, resample=Image.BILINEAR)
+    return img
+
+
+def is_likely_black_image(img: Image.Image | bytes) -> bool:
+    """
+    Check whether a screenshot is (almost) entirely black.
+
+    Secure surfaces and a not-yet-ready virtual display both produce black
+    frames; callers treat them as capture failures.
+
+    Args:
+        img: Screenshot image, or encoded image bytes. Bytes allow a reduced
+            decode (JPEG draft mode) since no caller shares the image.
+
+    Returns:
+        True if fewer than a handful of samples have any channel above the
+        black level, or the image cannot be decoded.
+    """
+    try:
+        owned = isinstance(img, (bytes, bytearray))
+        if owned:
+            img = Image.open(BytesIO(img))
+        thumb = _sample(img, owned)
+        if all(hi <= _BLACK_LEVEL for _, hi in thumb.getextrema()):
+            return True
+        lit = thumb.point(lambda v: 255 if v > _BLACK_LEVEL else 0)
+        r, g, b = lit.split()
+        mask = ImageChops.lighter(ImageChops.lighter(r, g), b)
+        return mask.histogram()[255] < _MIN_LIT_SAMPLES
+    except Exception:
+        return True
+
+
+@functools.lru_cache(maxsize=8)
+def fallback_frame(
+    width: int = 1080,
+    height: int = 2400,
+    image_format: str = "JPEG",
+    target_bytes: int = 25 * 1024,
+) -> tuple[str, str]:
+    """
+    Get a black placeholder frame, encoded once and cached.
+
+    Args:
+        width: Frame width in pixels.
+        height: Frame height in pixels.
+        image_format: "JPEG" (size-bounded) or "PNG".
+        target_bytes: Byte budget for JPEG frames.
+
+    Returns:
+        Tuple of (base64 data, mime type).
+    """
+    black_img = Image.new("RGB", (width, height), color="black")
+    if image_format.upper() == "PNG":
+        buffered = BytesIO()
+        black_img.save(buffered, format="PNG")
+        data, mime = buffered.getvalue(), "image/png"
+    else:
+        data, mime = encode_jpeg_to_target(black_img, target_bytes=target_bytes)
+    return base64.b64encode(data).decode("utf-8"), mime
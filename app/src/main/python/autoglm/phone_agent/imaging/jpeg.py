@@ -0,0 +1,202 @@
+"""Target-size JPEG encoding for screenshots sent to the model."""
+
+import math
+import threading
+from io import BytesIO
+from typing import Any
+
+from PIL import Image
+
+from phone_agent.metrics import IMAGE_ENCODE_SECONDS
+
+
+class JpegTargetEncoder:
+    """
+    Encode images as JPEG under a byte budget with few trial encodes.
+
+    The quality/scale that met the budget for the previous frame of the same
+    source (device) and resolution is used as the first guess for the next
+    frame, and misses are corrected with a size model instead of a binary
+    search. Trial encodes skip ``optimize``/``progressive``; only the chosen
+    setting is encoded once more with them enabled.
+
+    Args:
+        target_bytes: Maximum size of the encoded JPEG.
+        min_quality: Lowest JPEG quality before falling back to downscaling.
+        max_quality: Highest JPEG quality to try.
+        min_scale: Smallest downscale factor relative to the input image.
+        max_attempts: Trial encodes per frame once one fits the budget. If
+            none fits after ``max_attempts``, the encoder keeps downscaling
+            (at ``min_quality``) until one fits or ``min_scale`` is reached;
+            only then is an over-budget frame returned.
+    """
+
+    # Empirically the encoded size roughly doubles every ~25 quality points
+    # in the 25-85 range for UI screenshots.
+    _QUALITY_PER_DOUBLING = 25.0
+
+    def __init__(
+        self,
+        target_bytes: int = 25 * 1024,
+        min_quality: int = 25,
+        max_quality: int = 85,
+        min_scale: float = 0.35,
+        max_attempts: int = 4,
+    ):
+        self.target_bytes = target_bytes
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.min_scale = min_scale
+        self.max_attempts = max_attempts
+        self.last_encodes = 0
+        self._hints: dict[tuple, tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _to_rgb(im: Image.Image) -> Image.Image:
+        if im.mode in ("RGB",):
+            return im
+        if im.mode in ("RGBA", "LA"):
+            bg = Image.new("RGB", im.size, (0, 0, 0))
+            bg.paste(im, mask=im.split()[-1])
+            return bg
+        return im.convert("RGB")
+
+    @staticmethod
+    def _encode(im: Image.Image, quality: int, final: bool) -> bytes:
+        buf = BytesIO()
+        im.save(
+            buf,
+            format="JPEG",
+            quality=int(quality),
+            optimize=final,
+            progressive=final,
+        )
+        return buf.getvalue()
+
+    def _predict_quality(self, quality: int, size: int, target: float) -> int:
+        delta = self._QUALITY_PER_DOUBLING * math.log2(target / max(1, size))
+        return int(max(self.min_quality, min(self.max_quality, quality + delta)))
+
+    def encode(
+        self, img: Image.Image, key: Any = None, target_bytes: int | None = None
+    ) -> tuple[bytes, str]:
+        """
+        Encode an image as JPEG under the byte budget.
+
+        Args:
+            img: Source image (any mode).
+            key: Source identifier (e.g. device ID) used to remember settings.
+            target_bytes: Override for the encoder's byte budget.
+
+        Returns:
+            Tuple of (jpeg bytes, mime type).
+        """
+        target = int(target_bytes or self.target_bytes)
+        hint_key = (key, img.size, target)
+        with self._lock:
+            quality, scale = self._hints.get(hint_key, (self.max_quality, 1.0))
+
+        rgb = self._to_rgb(img)
+        scaled: dict[float, Image.Image] = {1.0: rgb}
+
+        def working(s: float) -> Image.Image:
+            if s not in scaled:
+                size = (max(1, int(rgb.size[0] * s)), max(1, int(rgb.size[1] * s)))
+                scaled[s] = rgb.resize(size, resample=Image.BILINEAR, reducing_gap=2.0)
+            return scaled[s]
+
+        # Aim slightly below the budget: the final optimized pass only shrinks.
+        aim = target * 0.95
+        best: tuple[int, float, bytes] | None = None  # (quality, scale, data) that fit
+        smallest: tuple[int, float, bytes] | None = None
+        encodes = 0
+
+        while True:
+            if encodes >= self.max_attempts:
+                if best is not None:
+                    break
+                # Nothing fits yet (typically a cold frame): go straight to
+                # the lowest quality and keep downscaling until one fits.
+                if smallest[0] <= self.min_quality and smallest[1] <= self.min_scale:
+                    break
+                if quality > self.min_quality:
+                    quality = self.min_quality
+                    scale = smallest[1]
+
+            data = self._encode(working(scale), quality, final=False)
+            encodes += 1
+            size = len(data)
+            if smallest is None or size < len(smallest[2]):
+                smallest = (quality, scale, data)
+
+            if size <= target:
+                if best is None or (scale, quality) > (best[1], best[0]):
+                    best = (quality, scale, data)
+                # Good enough unless there is a lot of headroom left.
+                if size >= target * 0.75:
+                    break
+                if quality >= self.max_quality:
+                    if scale >= 1.0:
+                        break
+                    # Content got simpler than the remembered frame: scale back up.
+                    scale = min(1.0, round(scale * math.sqrt(aim / size), 3))
+                    continue
+                next_quality = self._predict_quality(quality, size, aim)
+                if next_quality <= quality:
+                    break
+                quality = next_quality
+                continue
+
+            if best is not None:
+                # Overshot after a fitting trial: the previous fit wins.
+                break
+
+            if quality > self.min_quality:
+                quality = self._predict_quality(quality, size, aim)
+                continue
+
+            if scale <= self.min_scale:
+                break
+            # Size scales with pixel area at fixed quality.
+            scale = max(self.min_scale, round(scale * math.sqrt(aim / size), 3))
+
+        if best is not None:
+            quality, scale, data = best
+        else:
+            # Over budget even at min_scale: send the smallest trial.
+            quality, scale, data = smallest
+        final = self._encode(working(scale), quality, final=True)
+        encodes += 1
+        # optimize/progressive almost always shrink the file; never let the
+        # final pass push a fitting frame over the budget.
+        if len(final) <= len(data) or len(final) <= target:
+            data = final
+
+        with self._lock:
+            self._hints[hint_key] = (quality, scale)
+        self.last_encodes = encodes
+        return data, "image/jpeg"
+
+
+_default_encoder = JpegTargetEncoder()
+
+
+def encode_jpeg_to_target(
+    img: Image.Image,
+    target_bytes: int = 25 * 1024,
+    key: Any = None,
+) -> tuple[bytes, str]:
+    """
+    Encode an image as JPEG under a byte budget with the shared encoder.
+
+    Args:
+        img: Source image (any mode).
+        target_bytes: Maximum size of the encoded JPEG.
+        key: Source identifier (e.g. device ID) used to remember settings.
+
+    Returns:
+        Tuple of (jpeg bytes, mime type).
+    """
+    with IMAGE_ENCODE_SECONDS.time():
+        return _default_encoder.encode(img, key=key, target_bytes=target_bytes)
@@ -0,0 +1,43 @@
+"""Small JPEG previews of screenshots for UI callbacks."""
+
+import base64
+from io import BytesIO
+
+from PIL import Image
+
+
+def make_preview(base64_data: str, max_side: int = 720, quality: int = 60) -> str:
+    """
+    Downscale a base64-encoded screenshot to a small JPEG.
+
+    JPEG input is decoded at reduced resolution (DCT scaling), so the full
+    frame is never materialized.
+
+    Args:
+        base64_data: Base64-encoded image (any format Pillow reads).
+        max_side: Longest side of the preview in pixels.
+        quality: JPEG quality of the preview.
+
+    Returns:
+        Base64-encoded JPEG preview, or the input if it is already a JPEG
+        that fits ``max_side``.
+    """
+    data = base64.b64decode(base64_data)
+    with Image.open(BytesIO(data)) as img:
+        w, h = img.size
+        longest = max(w, h)
+        if longest <= max_side and img.format == "JPEG":
+            return base64_data
+        if longest > max_side:
+            scale = max_side / longest
+            target = (max(1, int(w * scale)), max(1, int(h * scale)))
+        else:
+            target = (w, h)
+        if img.format == "JPEG":
+            img.draft("RGB", target)
+        preview = img if img.mode == "RGB" else img.convert("RGB")
+        if preview.size != target:
+            preview = preview.resize(target, resample=Image.BILINEAR)
+        buffer = BytesIO()
+        preview.save(buffer, format="JPEG", quality=quality)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
@@ -0,0 +1,85 @@
+"""Decoding of raw ``screencap`` framebuffer dumps."""
+
+import struct
+
+from PIL import Image
+
+# Android PixelFormat -> (bytes per pixel, PIL mode, PIL raw mode).
+# RGBA_8888 frames are opaque, so they are mapped as RGBX: the JPEG encoder
+# then converts them without alpha compositing.
+_PIXEL_FORMATS = {
+    1: (4, "RGBX", "RGBX"),  # RGBA_8888
+    2: (4, "RGBX", "RGBX"),  # RGBX_8888
+    3: (3, "RGB", "RGB"),  # RGB_888
+    4: (2, "RGB", "BGR;16"),  # RGB_565
+    5: (4, "RGB", "BGRX"),  # BGRA_8888
+}
+
+# screencap writes width, height and format as little-endian uint32; since
+# Android 10 a fourth field (the color space) follows.
+_HEADER_SIZES = (16, 12)
+
+
+def parse_raw_screencap(
+    data: bytes | bytearray | memoryview,
+) -> tuple[int, int, int, int]:
+    """
+    Parse the header of a raw ``screencap`` dump.
+
+    The header size is not announced, so it is inferred from which size
+    leaves exactly ``width * height * bpp`` bytes of pixels.
+
+    Args:
+        data: Output of ``screencap`` without ``-p``.
+
+    Returns:
+        Tuple of (width, height, pixel format, header size).
+
+    Raises:
+        ValueError: If the data is not a raw frame in a known pixel format.
+    """
+    if len(data) < 12:
+        raise ValueError("raw screencap too short")
+    width, height, pixel_format = struct.unpack_from("<III", data, 0)
+    if pixel_format not in _PIXEL_FORMATS:
+        raise ValueError(f"unsupported screencap pixel format: {pixel_format}")
+    bpp = _PIXEL_FORMATS[pixel_format][0]
+    for header_size in _HEADER_SIZES:
+        if len(data) - header_size == width * height * bpp:
+            return width, height, pixel_format, header_size
+    raise ValueError(
+        f"raw screencap size mismatch: {len(data)} bytes for {width}x{height}x{bpp}"
+    )
+
+
+def decode_raw_screencap(
+    data: bytes | bytearray | memoryview, max_side: int | None = None
+) -> Image.Image:
+    """
+    Wrap a raw ``screencap`` dump as an image.
+
+    32-bit RGBA/RGBX frames are mapped onto the buffer without copying. The
+    returned image keeps a reference to ``data``, which must not be modified
+    while the image is in use.
+
+    Args:
+        data: Output of ``screencap`` without ``-p``.
+        max_side: If set, box-downscale by an integer factor so the longer
+            side is at most this many pixels, before any encoding.
+
+    Returns:
+        The frame as a PIL image (mode RGBX or RGB).
+
+    Raises:
+        ValueError: If the data is not a raw frame in a known pixel format.
+    """
+    width, height, pixel_format, header_size = parse_raw_screencap(data)
+    _, mode, raw_mode = _PIXEL_FORMATS[pixel_format]
+    pixels = memoryview(data)[header_size:]
+    img = Image.frombuffer(mode, (width, height), pixels, "raw", raw_mode, 0, 1)
+
+    if max_side:
+        factor = -(-max(width, height) // max_side)
+        if factor > 1:
+            img = img.reduce(factor)
+    return img
@@ -0,0 +1,104 @@
+"""Keyboard sessions: switch to the ADB keyboard once per task, restore once."""
+
+import atexit
+import threading
+import weakref
+from typing import Any
+
+from phone_agent import cancellation
+from phone_agent.config.timing import TIMING_CONFIG
+
+
+class KeyboardSession:
+    """
+    Text entry through the ADB keyboard for the duration of a task.
+
+    The input method is switched on the first text entry and restored by
+    :meth:`close` at the end of the task (or at interpreter exit), instead
+    of around every Type action.
+
+    This generic session drives any backend module that provides
+    ``detect_and_set_adb_keyboard``, ``clear_text``, ``type_text`` and
+    ``restore_keyboard``; it keeps the configured delays because those
+    backends give no completion signal. See
+    :class:`phone_agent.adb.keyboard.ADBKeyboardSession` for the ADB version.
+
+    Args:
+        module: Backend module (e.g. ``phone_agent.hdc``).
+        device_id: Optional device ID for multi-device setups.
+    """
+
+    def __init__(self, module: Any, device_id: str | None = None):
+        self.module = module
+        self.device_id = device_id
+        self.original_ime: str | None = None
+        self.active = False
+        self._lock = threading.RLock()
+        _live_sessions.add(self)
+
+    def activate(self) -> None:
+        """Switch to the ADB keyboard if this session has not done so yet."""
+        with self._lock:
+            if self.active:
+                return
+            self.original_ime = self._switch()
+            self.active = True
+
+    def enter_text(self, text: str, clear: bool = True) -> None:
+        """
+        Replace (or append to) the text of the focused field.
+
+        Args:
+            text: Text to type.
+            clear: Clear the field first.
+        """
+        with self._lock:
+            self.activate()
+            self._enter(text, clear)
+
+    def close(self) -> None:
+        """
+        Restore the original input method (no-op if never switched).
+
+        Runs even when the current task was cancelled (the token is unbound
+        for the restore). The session stays active until the restore has
+        succeeded, so a failed restore is retried at interpreter exit.
+        """
+        with self._lock, cancellation.use_token(None):
+            if not self.active:
+                return
+            if self.original_ime:
+                self._restore(self.original_ime)
+            self.active = False
+            self.original_ime = None
+
+    def _switch(self) -> str:
+        ime = self.module.detect_and_set_adb_keyboard(self.device_id)
+        cancellation.sleep(TIMING_CONFIG.action.keyboard_switch_delay)
+        return ime
+
+    def _enter(self, text: str, clear: bool) -> None:
+        if clear:
+            self.module.clear_text(self.device_id)
+            cancellation.sleep(TIMING_CONFIG.action.text_clear_delay)
+        self.module.type_text(text, self.device_id)
+        cancellation.sleep(TIMING_CONFIG.action.text_input_delay)
+
+    def _restore(self, ime: str) -> None:
+        self.module.restore_keyboard(ime, self.device_id)
+        cancellation.sleep(TIMING_CONFIG.action.keyboard_restore_delay)
+
+
+_live_sessions: "weakref.WeakSet[KeyboardSession]" = weakref.WeakSet()
+
+
+def restore_keyboards() -> None:
+    """Restore the input method of every active session (run at exit)."""
+    for session in list(_live_sessions):
+        try:
+            session.close()
+        except Exception:
+            pass
+
+
+atexit.register(restore_keyboards)
@@ -0,0 +1,575 @@
+"""Process-wide performance metrics: counters and fixed-bucket histograms.
+
+Recording is a dictionary lookup, a bisect and a few additions under a
+per-metric lock, so it can stay on in production. Metrics are exported in
+two ways:
+
+- a pull endpoint on localhost serving the Prometheus text format at
+  ``/metrics`` (and a JSON snapshot at ``/metrics.json``), see
+  :func:`start_http_server`;
+- a JSON snapshot file rewritten periodically for the Android app, see
+  :func:`start_snapshot_writer`.
+
+Both can be enabled from the environment with :func:`start_exporters_from_env`
+(``PHONE_AGENT_METRICS_PORT``, ``PHONE_AGENT_METRICS_SNAPSHOT``).
+``PHONE_AGENT_METRICS=false`` turns recording off.
+"""
+
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Any, Iterator
+
+# Seconds; covers cached lookups (ms) up to slow model calls (tens of s).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = os.getenv("PHONE_AGENT_METRICS", "true").strip().lower() in (
+    "true",
+    "1",
+    "yes",
+)
+
+
+def set_enabled(enabled: bool) -> None:
+    """Turn metric recording on or off process-wide."""
+    global _enabled
+    _enabled = enabled
+
+
+def _label_key(labelnames: tuple[str, ...], labels: dict[str, Any]) -> tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter with labels.
+
+    Args:
+        name: Metric name (Prometheus style, ending in ``_total``).
+        documentation: One-line description.
+        labelnames: Label names; values are passed as keyword arguments.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Add ``amount`` to the series selected by ``labels``."""
+        if not _enabled:
+            return
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        """Current value of one series."""
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def _render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}"
+            for key, value in items
+        ]
+
+    def _snapshot(self) -> list[dict[str, Any]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            {"labels": dict(zip(self.labelnames, key)), "value": value}
+            for key, value in items
+        ]
+
+
+class _Series:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)  # Last slot: above the largest bound
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+
+class Histogram:
+    """
+    Histogram with fixed bucket bounds and labels.
+
+    Args:
+        name: Metric name (Prometheus style, e.g. ending in ``_seconds``).
+        documentation: One-line description.
+        labelnames: Label names; values are passed as keyword arguments.
+        buckets: Increasing upper bounds.
+
+    Example:
+        >>> with STEP_STAGE_SECONDS.time(stage="model", device="default"):
+        ...     response = client.request(messages)
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Record one observation in the series selected by ``labels``."""
+        if not _enabled:
+            return
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets))
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+            if value > series.max:
+                series.max = value
+
+    @contextlib.contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the ``with`` block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantile(self, q: float, **labels: Any) -> float:
+        """Estimate a quantile of one series by interpolating within its bucket."""
+        with self._lock:
+            series = self._series.get(_label_key(self.labelnames, labels))
+            if series is None:
+                return 0.0
+            return self._quantile(series, q)
+
+    def _quantile(self, series: _Series, q: float) -> float:
+        if not series.count:
+            return 0.0
+        rank = q * series.count
+        seen = 0
+        for index, count in enumerate(series.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else series.max
+                upper = min(upper, series.max)
+                return lower + (upper - lower) * max(0.0, rank - seen) / count
+            seen += count
+        return series.max
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def _render(self) -> list[str]:
+        lines = []
+        with self._lock:
+            items = sorted(self._series.items())
+            for key, series in items:
+                pairs = list(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+                    cumulative += count
+                    labels = _format_labels(
+                        pairs + [("le", _format_value(float(bound)))]
+                    )
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(
+                    f"{self.name}_sum{_format_labels(pairs)} {_format_value(series.sum)}"
+                )
+                lines.append(f"{self.name}_count{_format_labels(pairs)} {series.count}")
+        return lines
+
+    def _snapshot(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "labels": dict(zip(self.labelnames, key)),
+                    "count": series.count,
+                    "sum": series.sum,
+                    "mean": series.sum / series.count if series.count else 0.0,
+                    "p50": self._quantile(series, 0.5),
+                    "p95": self._quantile(series, 0.95),
+                    "p99": self._quantile(series, 0.99),
+                    "max": series.max,
+                }
+                for key, series in sorted(self._series.items())
+            ]
+
+
+class MetricsRegistry:
+    """Named collection of metrics with Prometheus and JSON rendering."""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(
+                    f"Metric {name} is already registered as a {metric.kind}"
+                )
+            return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> Counter:
+        """Get or create a counter."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def clear(self) -> None:
+        """Drop all recorded values (metric definitions are kept)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric._render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict[str, Any]:
+        """All metrics as a JSON-serializable dict, with quantile estimates."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return {
+            "timestamp": time.time(),
+            "metrics": {
+                metric.name: {"type": metric.kind, "series": metric._snapshot()}
+                for metric in metrics
+            },
+        }
+
+    def write_snapshot(self, path: str) -> None:
+        """Atomically write :meth:`snapshot` to ``path``."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+REGISTRY = MetricsRegistry()
+
+STEP_STAGE_SECONDS = REGISTRY.histogram(
+    "phone_agent_step_stage_seconds",
+    "Duration of each stage of the agent step loop.",
+    ("stage", "device"),
+)
+DEVICE_OP_SECONDS = REGISTRY.histogram(
+    "phone_agent_device_op_seconds",
+    "Duration of device backend operations, excluding post-action delays.",
+    ("op", "backend", "device"),
+)
+DEVICE_OP_ERRORS = REGISTRY.counter(
+    "phone_agent_device_op_errors_total",
+    "Device backend operations that raised.",
+    ("op", "backend", "device"),
+)
+ACTION_SECONDS = REGISTRY.histogram(
+    "phone_agent_action_seconds",
+    "Duration of executed actions, including post-action waits.",
+    ("action", "device"),
+)
+ACTIONS = REGISTRY.counter(
+    "phone_agent_actions_total",
+    "Executed actions by outcome.",
+    ("action", "device", "outcome"),
+)
+MODEL_SECONDS = REGISTRY.histogram(
+    "phone_agent_model_seconds",
+    "Model request latency by phase (ttft, thinking_end, action, total).",
+    ("phase",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 60.0),
+)
+MODEL_REQUESTS = REGISTRY.counter(
+    "phone_agent_model_requests_total",
+    "Model requests by outcome (complete, stopped_early, error).",
+    ("outcome",),
+)
+MODEL_PROMPT_CHARS = REGISTRY.counter(
+    "phone_agent_model_prompt_chars_total",
+    "Serialized prompt characters sent, and the part shared with the previous request.",
+    ("part",),
+)
+SCREENCAP_SECONDS = REGISTRY.histogram(
+    "phone_agent_screencap_seconds",
+    "Screen capture round trip by capture path.",
+    ("mode", "device"),
+)
+IMAGE_ENCODE_SECONDS = REGISTRY.histogram(
+    "phone_agent_image_encode_seconds",
+    "JPEG encoding of screenshots under the byte budget.",
+)
+FOREGROUND_QUERY_SECONDS = REGISTRY.histogram(
+    "phone_agent_foreground_query_seconds",
+    "Foreground app queries (dumpsys and equivalents) on cache misses.",
+    ("platform",),
+)
+FOREGROUND_LOOKUPS = REGISTRY.counter(
+    "phone_agent_foreground_lookups_total",
+    "Foreground app lookups by cache result.",
+    ("platform", "result"),
+)
+SETTLE_SECONDS = REGISTRY.histogram(
+    "phone_agent_settle_seconds",
+    "Post-action screen settle waits.",
+    ("action",),
+)
+
+COMMAND_SECONDS = REGISTRY.histogram(
+    "phone_agent_command_seconds",
+    "Device subprocess commands (one attempt each), by command class.",
+    ("op", "backend", "device"),
+)
+COMMAND_TIMEOUTS = REGISTRY.counter(
+    "phone_agent_command_timeouts_total",
+    "Device commands that exceeded their timeout budget.",
+    ("op", "backend", "device"),
+)
+COMMAND_RETRIES = REGISTRY.counter(
+    "phone_agent_command_retries_total",
+    "Device commands retried after a timeout.",
+    ("op", "backend", "device"),
+)
+DEVICE_RECOVERIES = REGISTRY.counter(
+    "phone_agent_device_recoveries_total",
+    "Server restarts/reconnects after repeated command timeouts.",
+    ("backend", "device", "result"),
+)
+
+_untimed = threading.local()
+
+
+@contextlib.contextmanager
+def untimed() -> Iterator[None]:
+    """
+    Leave the enclosed wait out of the enclosing device operation's latency.
+
+    Backends wrap their post-action delays in it, so
+    ``phone_agent_device_op_seconds`` measures the device rather than the
+    configured sleep.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _untimed.seconds = untimed_seconds() + time.perf_counter() - start
+
+
+def untimed_seconds() -> float:
+    """Time the calling thread has spent in :func:`untimed` blocks so far."""
+    return getattr(_untimed, "seconds", 0.0)
+
+
+def observe_step_timings(
+    timings: dict[str, float], device_id: str | None = None
+) -> None:
+    """Record the stage timings of one agent step (``StepResult.timings``)."""
+    device = device_id or "default"
+    for stage, value in timings.items():
+        STEP_STAGE_SECONDS.observe(value, stage=stage, device=device)
+
+
+_server: Any = None
+_snapshot_thread: threading.Thread | None = None
+_snapshot_stop = threading.Event()
+_exporters_lock = threading.Lock()
+
+
+def start_http_server(
+    port: int = 9464, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY
+):
+    """
+    Serve ``/metrics`` (Prometheus text) and ``/metrics.json`` on localhost.
+
+    Returns:
+        The running server; its ``server_address`` holds the bound port.
+    """
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path in ("/", "/metrics"):
+                body = registry.render_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif path == "/metrics.json":
+                body = json.dumps(registry.snapshot(), ensure_ascii=False).encode(
+                    "utf-8"
+                )
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    with _exporters_lock:
+        if _server is not None:
+            return _server
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(
+            target=server.serve_forever, name="metrics-http", daemon=True
+        ).start()
+        _server = server
+        return server
+
+
+def start_snapshot_writer(
+    path: str | None = None,
+    interval: float = 10.0,
+    registry: MetricsRegistry = REGISTRY,
+) -> str:
+    """
+    Rewrite a JSON snapshot of all metrics every ``interval`` seconds.
+
+    Args:
+        path: Snapshot file; defaults to ``metrics.json`` in the persistent
+            cache directory (the app's files directory on Android).
+        interval: Seconds between writes.
+
+    Returns:
+        The snapshot path.
+    """
+    global _snapshot_thread
+    if not path:
+        from phone_agent.persistent_cache import default_cache_dir
+
+        path = os.path.join(default_cache_dir(), "metrics.json")
+
+    def loop() -> None:
+        while not _snapshot_stop.wait(interval):
+            try:
+                registry.write_snapshot(path)
+            except OSError:
+                pass
+        try:
+            registry.write_snapshot(path)
+        except OSError:
+            pass
+
+    with _exporters_lock:
+        if _snapshot_thread is None or not _snapshot_thread.is_alive():
+            _snapshot_stop.clear()
+            _snapshot_thread = threading.Thread(
+                target=loop, name="metrics-snapshot", daemon=True
+            )
+            _snapshot_thread.start()
+    return path
+
+
+def stop_exporters() -> None:
+    """Stop the HTTP endpoint and write a last snapshot."""
+    global _server, _snapshot_thread
+    with _exporters_lock:
+        server, _server = _server, None
+        thread, _snapshot_thread = _snapshot_thread, None
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+    if thread is not None:
+        _snapshot_stop.set()
+        thread.join(timeout=2.0)
+
+
+def start_exporters_from_env() -> None:
+    """
+    Start the exporters configured in the environment (safe to call repeatedly).
+
+    ``PHONE_AGENT_METRICS_PORT``: port of the localhost pull endpoint.
+    ``PHONE_AGENT_METRICS_SNAPSHOT``: snapshot file path, or "true" for the
+    default path; ``PHONE_AGENT_METRICS_SNAPSHOT_INTERVAL`` sets the period.
+    """
+    port = (os.environ.get("PHONE_AGENT_METRICS_PORT") or "").strip()
+    if port:
+        try:
+            start_http_server(int(port))
+        except (OSError, ValueError):
+            pass
+
+    snapshot = (os.environ.get("PHONE_AGENT_METRICS_SNAPSHOT") or "").strip()
+    if snapshot and snapshot.lower() not in ("false", "0", "no"):
+        try:
+            interval = float(os.getenv("PHONE_AGENT_METRICS_SNAPSHOT_INTERVAL", "10"))
+        except ValueError:
+            interval = 10.0
+        path = None if snapshot.lower() in ("true", "1", "yes") else snapshot
+        try:
+            start_snapshot_writer(path, interval)
+        except OSError:
+            pass
@@ -0,0 +1,57 @@
+"""Simulated device backend for benchmarks and tests without a phone."""
+
+from phone_agent.mock.device import (
+    MockCall,
+    MockDevice,
+    MockFrame,
+    MockLatency,
+    back,
+    clear_text,
+    configure_mock_device,
+    create_keyboard_session,
+    detect_and_set_adb_keyboard,
+    double_tap,
+    get_current_app,
+    get_frame_fingerprint,
+    get_mock_device,
+    get_screenshot,
+    home,
+    launch_app,
+    list_devices,
+    load_trajectory,
+    long_press,
+    restore_keyboard,
+    swipe,
+    tap,
+    type_text,
+)
+
+__all__ = [
+    # Configuration
+    "MockDevice",
+    "MockLatency",
+    "MockFrame",
+    "MockCall",
+    "configure_mock_device",
+    "get_mock_device",
+    "load_trajectory",
+    # Screenshot
+    "get_screenshot",
+    "get_frame_fingerprint",
+    # Input
+    "type_text",
+    "clear_text",
+    "detect_and_set_adb_keyboard",
+    "restore_keyboard",
+    "create_keyboard_session",
+    # Device control
+    "get_current_app",
+    "tap",
+    "swipe",
+    "back",
+    "home",
+    "double_tap",
+    "long_press",
+    "launch_app",
+    "list_devices",
+]
@@ -0,0 +1,430 @@
+"""Mock device that replays a recorded trajectory with simulated latencies."""
+
+import base64
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any
+
+from PIL import Image
+
+from phone_agent import cancellation
+from phone_agent.adb.screenshot import Screenshot
+from phone_agent.keyboard import KeyboardSession
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+_MIME_BY_EXT = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class MockLatency:
+    """Simulated duration of each device call, in seconds."""
+
+    screenshot: float = field(
+        default_factory=lambda: _env_float("PHONE_AGENT_MOCK_SCREENSHOT_LATENCY", 0.25)
+    )
+    current_app: float = field(
+        default_factory=lambda: _env_float("PHONE_AGENT_MOCK_APP_LATENCY", 0.05)
+    )
+    fingerprint: float = 0.02
+    input: float = field(
+        default_factory=lambda: _env_float("PHONE_AGENT_MOCK_INPUT_LATENCY", 0.08)
+    )  # tap, swipe, back, home, keyboard
+    launch: float = 0.5
+
+    @classmethod
+    def zero(cls) -> "MockLatency":
+        """Latencies of zero, to measure pure framework overhead."""
+        return cls(
+            screenshot=0.0, current_app=0.0, fingerprint=0.0, input=0.0, launch=0.0
+        )
+
+
+@dataclass
+class MockFrame:
+    """One recorded screen: encoded image and the foreground app."""
+
+    base64_data: str
+    mime: str
+    width: int
+    height: int
+    current_app: str = "System Home"
+    digest: str = ""
+
+
+@dataclass
+class MockCall:
+    """A device call made by the agent."""
+
+    name: str
+    args: tuple
+    frame_index: int
+    timestamp: float
+
+
+def _synthetic_frames(
+    count: int = 6, size: tuple[int, int] = (1080, 2400)
+) -> list[MockFrame]:
+    """Plain frames with a different color each, for runs without a trajectory."""
+    frames = []
+    for i in range(count):
+        img = Image.new("RGB", size, (40 * i % 256, 90, 200 - 30 * i % 200))
+        buffer = BytesIO()
+        img.save(buffer, format="JPEG", quality=80)
+        data = buffer.getvalue()
+        frames.append(
+            MockFrame(
+                base64_data=base64.b64encode(data).decode("utf-8"),
+                mime="image/jpeg",
+                width=size[0],
+                height=size[1],
+                digest=hashlib.sha256(data).hexdigest()[:32],
+            )
+        )
+    return frames
+
+
+def _read_log(run_dir: str) -> list[dict[str, Any]]:
+    plain = os.path.join(run_dir, "steps.jsonl")
+    compressed = plain + ".zst"
+    if os.path.exists(plain):
+        with open(plain, "rb") as f:
+            data = f.read()
+    elif os.path.exists(compressed):
+        if zstandard is None:
+            raise RuntimeError(f"{compressed} needs the zstandard package")
+        with open(compressed, "rb") as f:
+            data = (
+                zstandard.ZstdDecompressor()
+                .stream_reader(f, read_across_frames=True)
+                .read()
+            )
+    else:
+        raise FileNotFoundError(f"No steps.jsonl in {run_dir}")
+
+    records = []
+    for line in data.decode("utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            # The last line of a run that was killed may be cut short.
+            continue
+    return records
+
+
+def load_trajectory(run_dir: str) -> tuple[list[MockFrame], list[str]]:
+    """
+    Load a run directory written by :class:`phone_agent.recorder.TrajectoryRecorder`.
+
+    Args:
+        run_dir: Run directory (containing ``steps.jsonl`` and ``frames/``).
+
+    Returns:
+        Tuple of (one frame per recorded step, raw model output per step).
+    """
+    frames: list[MockFrame] = []
+    responses: list[str] = []
+    decoded: dict[str, MockFrame] = {}
+    for record in _read_log(run_dir):
+        if record.get("type") != "step":
+            continue
+        if record.get("raw_content"):
+            responses.append(record["raw_content"])
+        digest = record.get("frame")
+        if not digest:
+            continue
+        if digest not in decoded:
+            paths = glob.glob(os.path.join(run_dir, "frames", f"{digest}.*"))
+            if not paths:
+                continue
+            with open(paths[0], "rb") as f:
+                data = f.read()
+            with Image.open(BytesIO(data)) as img:
+                width, height = img.size
+            ext = paths[0].rsplit(".", 1)[-1]
+            decoded[digest] = MockFrame(
+                base64_data=base64.b64encode(data).decode("utf-8"),
+                mime=_MIME_BY_EXT.get(ext, "image/png"),
+                width=width,
+                height=height,
+                digest=digest,
+            )
+        frame = decoded[digest]
+        frames.append(
+            MockFrame(
+                base64_data=frame.base64_data,
+                mime=frame.mime,
+                width=frame.width,
+                height=frame.height,
+                current_app=record.get("current_app") or frame.current_app,
+                digest=digest,
+            )
+        )
+    return frames, responses
+
+
+class MockDevice:
+    """
+    A simulated phone.
+
+    Screenshots come from a list of frames; every action that can change the
+    screen (tap, swipe, key press, text entry, launch) moves on to the next
+    frame, staying on the last one. Every call sleeps its configured
+    latency, is appended to :attr:`calls` and its sleep is added to
+    :attr:`simulated_io`, so callers can separate framework time from
+    simulated device time. Post-action ``delay`` arguments are ignored.
+
+    Args:
+        frames: Screens to replay; synthetic ones if empty.
+        latency: Simulated call latencies.
+    """
+
+    def __init__(
+        self, frames: list[MockFrame] | None = None, latency: MockLatency | None = None
+    ):
+        self.frames = frames or _synthetic_frames()
+        self.latency = latency or MockLatency()
+        self.index = 0
+        self.calls: list[MockCall] = []
+        self.simulated_io = 0.0
+        self.ime = "com.android.inputmethod.latin/.LatinIME"
+        self.text = ""
+        self._lock = threading.Lock()
+
+    @property
+    def frame(self) -> MockFrame:
+        """The frame currently on screen."""
+        return self.frames[self.index]
+
+    def reset(self) -> None:
+        """Go back to the first frame and forget recorded calls."""
+        with self._lock:
+            self.index = 0
+            self.calls = []
+            self.simulated_io = 0.0
+            self.text = ""
+
+    def call(self, name: str, latency: float, *args, advance: bool = False) -> None:
+        """Sleep ``latency`` and record the call; ``advance`` moves to the next frame."""
+        if latency > 0:
+            cancellation.sleep(latency)
+        with self._lock:
+            self.simulated_io += latency
+            self.calls.append(MockCall(name, args, self.index, time.time()))
+            if advance and self.index < len(self.frames) - 1:
+                self.index += 1
+
+    def get_screenshot(self) -> Screenshot:
+        self.call("screenshot", self.latency.screenshot)
+        frame = self.frame
+        return Screenshot(
+            base64_data=frame.base64_data,
+            width=frame.width,
+            height=frame.height,
+            mime=frame.mime,
+        )
+
+    def get_frame_fingerprint(self) -> str:
+        self.call("fingerprint", self.latency.fingerprint)
+        return self.frame.digest or str(self.index)
+
+    def get_current_app(self) -> str:
+        self.call("current_app", self.latency.current_app)
+        return self.frame.current_app
+
+    def input(self, name: str, *args) -> None:
+        """Simulate an input call that changes the screen."""
+        self.call(name, self.latency.input, *args, advance=True)
+
+    def launch(self, app_name: str) -> bool:
+        self.call("launch_app", self.latency.launch, app_name, advance=True)
+        return True
+
+
+_devices: dict[str | None, MockDevice] = {}
+_devices_lock = threading.Lock()
+_frames: list[MockFrame] | None = None
+_latency: MockLatency | None = None
+
+
+def configure_mock_device(
+    trajectory_dir: str | None = None,
+    latency: MockLatency | None = None,
+    frames: list[MockFrame] | None = None,
+) -> None:
+    """
+    Set the screens and latencies of mock devices and reset all devices.
+
+    Args:
+        trajectory_dir: Run directory to replay; defaults to
+            ``PHONE_AGENT_MOCK_TRAJECTORY`` or synthetic frames.
+        latency: Simulated call latencies.
+        frames: Frames to replay instead of a trajectory directory.
+    """
+    global _frames, _latency
+    if frames is None and trajectory_dir:
+        frames = load_trajectory(trajectory_dir)[0]
+    with _devices_lock:
+        _frames = frames
+        _latency = latency
+        _devices.clear()
+
+
+def get_mock_device(device_id: str | None = None) -> MockDevice:
+    """Get (creating on first use) the mock device with the given ID."""
+    global _frames
+    with _devices_lock:
+        device = _devices.get(device_id)
+        if device is None:
+            if _frames is None:
+                trajectory_dir = os.getenv("PHONE_AGENT_MOCK_TRAJECTORY")
+                _frames = load_trajectory(trajectory_dir)[0] if trajectory_dir else []
+            device = MockDevice(list(_frames), _latency)
+            _devices[device_id] = device
+        return device
+
+
+def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screenshot:
+    """Get the current mock screen."""
+    return get_mock_device(device_id).get_screenshot()
+
+
+def get_frame_fingerprint(device_id: str | None = None) -> str:
+    """Get the digest of the current mock screen."""
+    return get_mock_device(device_id).get_frame_fingerprint()
+
+
+def get_current_app(device_id: str | None = None) -> str:
+    """Get the foreground app recorded for the current screen."""
+    return get_mock_device(device_id).get_current_app()
+
+
+def tap(
+    x: int, y: int, device_id: str | None = None, delay: float | None = None
+) -> None:
+    get_mock_device(device_id).input("tap", x, y)
+
+
+def double_tap(
+    x: int, y: int, device_id: str | None = None, delay: float | None = None
+) -> None:
+    get_mock_device(device_id).input("double_tap", x, y)
+
+
+def long_press(
+    x: int,
+    y: int,
+    duration_ms: int = 3000,
+    device_id: str | None = None,
+    delay: float | None = None,
+) -> None:
+    get_mock_device(device_id).input("long_press", x, y, duration_ms)
+
+
+def swipe(
+    start_x: int,
+    start_y: int,
+    end_x: int,
+    end_y: int,
+    duration_ms: int | None = None,
+    device_id: str | None = None,
+    delay: float | None = None,
+) -> None:
+    get_mock_device(device_id).input(
+        "swipe", start_x, start_y, end_x, end_y, duration_ms
+    )
+
+
+def back(device_id: str | None = None, delay: float | None = None) -> None:
+    get_mock_device(device_id).input("back")
+
+
+def home(device_id: str | None = None, delay: float | None = None) -> None:
+    get_mock_device(device_id).input("home")
+
+
+def launch_app(
+    app_name: str, device_id: str | None = None, delay: float | None = None
+) -> bool:
+    return get_mock_device(device_id).launch(app_name)
+
+
+def type_text(text: str, device_id: str | None = None) -> None:
+    device = get_mock_device(device_id)
+    device.input("type_text", text)
+    device.text += text
+
+
+def clear_text(device_id: str | None = None) -> None:
+    device = get_mock_device(device_id)
+    device.call("clear_text", device.latency.input)
+    device.text = ""
+
+
+def detect_and_set_adb_keyboard(device_id: str | None = None) -> str:
+    device = get_mock_device(device_id)
+    device.call("set_keyboard", device.latency.input)
+    original, device.ime = device.ime, "com.android.adbkeyboard/.AdbIME"
+    return original
+
+
+def restore_keyboard(ime: str, device_id: str | None = None) -> None:
+    device = get_mock_device(device_id)
+    device.call("restore_keyboard", device.latency.input, ime)
+    device.ime = ime
+
+
+class _MockKeyboardSession(KeyboardSession):
+    """Keyboard session without the fixed delays; the mock latencies apply instead."""
+
+    def _switch(self) -> str:
+        return detect_and_set_adb_keyboard(self.device_id)
+
+    def _enter(self, text: str, clear: bool) -> None:
+        if clear:
+            clear_text(self.device_id)
+        type_text(text, self.device_id)
+
+    def _restore(self, ime: str) -> None:
+        restore_keyboard(ime, self.device_id)
+
+
+def create_keyboard_session(device_id: str | None = None) -> KeyboardSession:
+    """Create a keyboard session for a mock device."""
+    return _MockKeyboardSession(None, device_id)
+
+
+def list_devices() -> list:
+    """List mock devices created so far (at least one)."""
+    from phone_agent.adb.connection import ConnectionType, DeviceInfo
+
+    with _devices_lock:
+        ids = [device_id for device_id in _devices if device_id] or ["mock-0"]
+    return [
+        DeviceInfo(
+            device_id=device_id,
+            status="device",
+            connection_type=ConnectionType.USB,
+            model="Mock",
+        )
+        for device_id in ids
+    ]
@@ -2,13 +2,24 @@
 
 import json
 import os
+import socket
+import threading
 import time
 from dataclasses import dataclass, field
 from typing import Any
 
-from openai import OpenAI
-
+from phone_agent.cancellation import CancellationToken, TaskCancelled, current_token
 from phone_agent.config.i18n import get_message
+from phone_agent.events import EventBus, ThinkingEndEvent, TokenEvent
+from phone_agent.metrics import MODEL_PROMPT_CHARS, MODEL_REQUESTS, MODEL_SECONDS
+from phone_agent.model.prefix_cache import PrefixCacheTracker
+from phone_agent.model.stream_parser import StreamingActionParser
+from phone_agent.model.transport import (
+    get_openai_client,
+    get_runtime_model_config,
+    http_request,
+    invalidate_runtime_config,
+)
 
 
 @dataclass
@@ -24,6 +35,12 @@ class ModelConfig:
     frequency_penalty: float = 0.2
     extra_body: dict[str, Any] = field(default_factory=dict)
     lang: str = "cn"  # Language for UI messages: 'cn' or 'en'
+    verbose: bool = True  # Print streamed thinking and timing metrics to stdout
+    # Stop reading the stream once a complete action call has arrived
+    early_stop: bool = field(
+        default_factory=lambda: os.getenv("PHONE_AGENT_STREAM_EARLY_STOP", "true").lower()
+        in ("true", "1", "yes")
+    )
 
 
 @dataclass
@@ -37,6 +54,11 @@ class ModelResponse:
     time_to_first_token: float | None = None  # Time to first token (seconds)
     time_to_thinking_end: float | None = None  # Time to thinking end (seconds)
     total_time: float | None = None  # Total inference time (seconds)
+    time_to_action: float | None = None  # Time until the action call was complete (seconds)
+    stopped_early: bool = False  # Stream was closed right after the action call
+    # Prompt size and prefix shared with the previous request (serialized chars)
+    prompt_chars: int = 0
+    shared_prefix_chars: int = 0
 
 
 class ModelClient:
@@ -45,38 +67,23 @@ class ModelClient:
 
     Args:
         config: Model configuration.
+        events: Event bus receiving token and thinking-end events; see
+            :mod:`phone_agent.events`.
     """
 
-    def __init__(self, config: ModelConfig | None = None):
+    def __init__(self, config: ModelConfig | None = None, events: EventBus | None = None):
         self.config = config or ModelConfig()
-        self.client = OpenAI(base_url=self.config.base_url, api_key=self.config.api_key)
-
-    def _read_android_config(self) -> tuple[str | None, str | None, str | None]:
-        try:
-            from com.chaquo.python import Python as ChaquopyPython
-            from java import jclass
-
-            app = ChaquopyPython.getPlatform().getApplication()
-            ConfigManager = jclass("com.example.autoglm.ConfigManager")
-            cm = ConfigManager(app)
-            cfg = cm.getConfig()
-            base_url = str(cfg.getBaseUrl())
-            api_key = str(cfg.getApiKey())
-            model_name = str(cfg.getModelName())
-            return base_url, api_key, model_name
-        except Exception:
-            return None, None, None
+        self.events = events or EventBus()
+        self.client = get_openai_client(self.config.base_url, self.config.api_key)
+        self.prefix_tracker = PrefixCacheTracker()
 
     def _refresh_config_from_runtime(self) -> None:
-        base_url, api_key, model_name = self._read_android_config()
+        # Cached unless the injected config changed; no JNI call per step.
+        base_url, api_key, model_name = get_runtime_model_config()
 
-        env_base_url = os.environ.get("PHONE_AGENT_BASE_URL")
-        env_api_key = os.environ.get("PHONE_AGENT_API_KEY")
-        env_model_name = os.environ.get("PHONE_AGENT_MODEL")
-
-        new_base_url = (base_url or env_base_url or self.config.base_url).strip()
-        new_api_key = (api_key or env_api_key or self.config.api_key)
-        new_model_name = (model_name or env_model_name or self.config.model_name).strip()
+        new_base_url = (base_url or self.config.base_url).strip()
+        new_api_key = (api_key or self.config.api_key)
+        new_model_name = (model_name or self.config.model_name).strip()
 
         changed = (
             new_base_url != self.config.base_url
@@ -89,29 +96,95 @@ class ModelClient:
         self.config.model_name = new_model_name
 
         if changed:
-            self.client = OpenAI(base_url=self.config.base_url, api_key=self.config.api_key)
-
-    def request(self, messages: list[dict[str, Any]]) -> ModelResponse:
+            self.client = get_openai_client(self.config.base_url, self.config.api_key)
+
+    def request(
+        self,
+        messages: list[dict[str, Any]],
+        events: EventBus | None = None,
+        cancel_token: CancellationToken | None = None,
+        prefix_tracker: PrefixCacheTracker | None = None,
+    ) -> ModelResponse:
         """
         Send a request to the model.
 
         Args:
             messages: List of message dictionaries in OpenAI format.
+            events: Bus for this request's stream events, instead of
+                ``self.events`` (e.g. one per agent sharing this client).
+            cancel_token: Aborts the stream when cancelled; defaults to the
+                token bound to the current context.
+            prefix_tracker: Tracker comparing this request with the caller's
+                previous one, instead of ``self.prefix_tracker`` (e.g. one
+                per agent sharing this client).
 
         Returns:
             ModelResponse containing thinking and action.
 
         Raises:
             ValueError: If the response cannot be parsed.
+            TaskCancelled: If the token was cancelled; the connection is
+                closed so the server stops generating.
         """
+        try:
+            response = self._request(
+                messages,
+                events or self.events,
+                cancel_token or current_token(),
+                prefix_tracker or self.prefix_tracker,
+            )
+        except TaskCancelled:
+            MODEL_REQUESTS.inc(outcome="cancelled")
+            raise
+        except Exception:
+            MODEL_REQUESTS.inc(outcome="error")
+            raise
+
+        MODEL_REQUESTS.inc(outcome="stopped_early" if response.stopped_early else "complete")
+        for phase, value in (
+            ("ttft", response.time_to_first_token),
+            ("thinking_end", response.time_to_thinking_end),
+            ("action", response.time_to_action),
+            ("total", response.total_time),
+        ):
+            if value is not None:
+                MODEL_SECONDS.observe(value, phase=phase)
+        MODEL_PROMPT_CHARS.inc(response.prompt_chars, part="total")
+        MODEL_PROMPT_CHARS.inc(response.shared_prefix_chars, part="shared_prefix")
+        return response
+
+    def _request(
+        self,
+        messages: list[dict[str, Any]],
+        events: EventBus,
+        token: CancellationToken | None,
+        prefix_tracker: PrefixCacheTracker,
+    ) -> ModelResponse:
         self._refresh_config_from_runtime()
+        verbose = self.config.verbose
+
+        def emit_thinking(text: str) -> None:
+            if verbose:
+                print(text, end="", flush=True)
+            if text and events.active:
+                events.emit(TokenEvent(text, "thinking"))
+
+        def end_thinking(elapsed: float, rest: str = "") -> None:
+            if verbose:
+                print()
+            if events.active:
+                events.emit(ThinkingEndEvent(elapsed))
+                if rest:
+                    events.emit(TokenEvent(rest, "action"))
+        prompt_chars, shared_prefix_chars = prefix_tracker.observe(messages)
 
         # Start timing
         start_time = time.time()
         time_to_first_token = None
         time_to_thinking_end = None
 
-        stream = self.client.chat.completions.create(
+        stream = self._create_stream(
+            token,
             messages=messages,
             model=self.config.model_name,
             max_tokens=self.config.max_tokens,
@@ -127,8 +200,12 @@ class ModelClient:
         action_markers = ["finish(message=", "do(action="]
         in_action_phase = False  # Track if we've entered the action phase
         first_token_received = False
+        action_parser = StreamingActionParser() if self.config.early_stop else None
+        time_to_action = None
+        stopped_early = False
 
-        for chunk in stream:
+        chunks = self._iter_stream(stream, token)
+        for chunk in chunks:
             if len(chunk.choices) == 0:
                 continue
             if chunk.choices[0].delta.content is not None:
@@ -140,8 +217,30 @@ class ModelClient:
                     time_to_first_token = time.time() - start_time
                     first_token_received = True
 
+                if action_parser is not None and action_parser.feed(content):
+                    # The action call is complete: drop trailing tokens
+                    # (closing tags, repeats) instead of waiting for them.
+                    time_to_action = time.time() - start_time
+                    raw_content = action_parser.buffer[: action_parser.action_end]
+                    stopped_early = True
+                    if not in_action_phase:
+                        # Marker and closing parenthesis arrived in one chunk.
+                        pending = buffer + content
+                        cut = min(
+                            (i for i in map(pending.find, action_markers) if i >= 0),
+                            default=len(pending),
+                        )
+                        emit_thinking(pending[:cut])
+                        end_thinking(time_to_action, pending[cut:])
+                        time_to_thinking_end = time_to_action
+                    elif events.active:
+                        events.emit(TokenEvent(content, "action"))
+                    break
+
                 if in_action_phase:
                     # Already in action phase, just accumulate content without printing
+                    if events.active:
+                        events.emit(TokenEvent(content, "action"))
                     continue
 
                 buffer += content
@@ -152,14 +251,14 @@ class ModelClient:
                     if marker in buffer:
                         # Marker found, print everything before it
                         thinking_part = buffer.split(marker, 1)[0]
-                        print(thinking_part, end="", flush=True)
-                        print()  # Print newline after thinking is complete
                         in_action_phase = True
                         marker_found = True
 
                         # Record time to thinking end
                         if time_to_thinking_end is None:
                             time_to_thinking_end = time.time() - start_time
+                        emit_thinking(thinking_part)
+                        end_thinking(time_to_thinking_end, buffer[len(thinking_part) :])
 
                         break
 
@@ -179,42 +278,156 @@ class ModelClient:
 
                 if not is_potential_marker:
                     # Safe to print the buffer
-                    print(buffer, end="", flush=True)
+                    emit_thinking(buffer)
                     buffer = ""
 
+        chunks.close()
+        if stopped_early:
+            self._close_stream(stream)
+
         # Calculate total time
         total_time = time.time() - start_time
 
         # Parse thinking and action from response
         thinking, action = self._parse_response(raw_content)
 
-        # Print performance metrics
-        lang = self.config.lang
-        print()
-        print("=" * 50)
-        print(f"⏱️  {get_message('performance_metrics', lang)}:")
-        print("-" * 50)
-        if time_to_first_token is not None:
-            print(
-                f"{get_message('time_to_first_token', lang)}: {time_to_first_token:.3f}s"
-            )
-        if time_to_thinking_end is not None:
-            print(
-                f"{get_message('time_to_thinking_end', lang)}:        {time_to_thinking_end:.3f}s"
-            )
-        print(
-            f"{get_message('total_inference_time', lang)}:          {total_time:.3f}s"
-        )
-        print("=" * 50)
-
-        return ModelResponse(
+        response = ModelResponse(
             thinking=thinking,
             action=action,
             raw_content=raw_content,
             time_to_first_token=time_to_first_token,
             time_to_thinking_end=time_to_thinking_end,
             total_time=total_time,
+            time_to_action=time_to_action,
+            stopped_early=stopped_early,
+            prompt_chars=prompt_chars,
+            shared_prefix_chars=shared_prefix_chars,
+        )
+        if verbose:
+            print()
+            print(self.format_metrics(response))
+        return response
+
+    def format_metrics(self, response: ModelResponse) -> str:
+        """Format the timing metrics of a response as a printable block."""
+        lang = self.config.lang
+        lines = [
+            "=" * 50,
+            f"⏱️  {get_message('performance_metrics', lang)}:",
+            "-" * 50,
+        ]
+        if response.time_to_first_token is not None:
+            lines.append(
+                f"{get_message('time_to_first_token', lang)}: {response.time_to_first_token:.3f}s"
+            )
+        if response.time_to_thinking_end is not None:
+            lines.append(
+                f"{get_message('time_to_thinking_end', lang)}:        {response.time_to_thinking_end:.3f}s"
+            )
+        lines.append(
+            f"{get_message('total_inference_time', lang)}:          {response.total_time:.3f}s"
         )
+        if response.prompt_chars:
+            lines.append(
+                f"{get_message('shared_prompt_prefix', lang)}: "
+                f"{response.shared_prefix_chars}/{response.prompt_chars} "
+                f"({response.shared_prefix_chars / response.prompt_chars:.0%})"
+            )
+        lines.append("=" * 50)
+        return "\n".join(lines)
+
+    def _create_stream(self, token: CancellationToken | None, **kwargs: Any) -> Any:
+        """
+        Start a streaming completion; cancelling ``token`` before the
+        response headers arrive (queued request, slow gateway) raises
+        TaskCancelled at once.
+
+        The request is sent from a helper thread; a response that arrives
+        after the caller gave up is closed so the server stops generating.
+        """
+        if token is None:
+            return self.client.chat.completions.create(**kwargs)
+        token.raise_if_cancelled()
+
+        done = threading.Event()
+        lock = threading.Lock()
+        outcome: dict[str, Any] = {}
+
+        def send() -> None:
+            try:
+                result = ("stream", self.client.chat.completions.create(**kwargs))
+            except BaseException as e:
+                result = ("error", e)
+            with lock:
+                if outcome.get("abandoned"):
+                    if result[0] == "stream":
+                        self._close_stream(result[1])
+                    return
+                outcome[result[0]] = result[1]
+            done.set()
+
+        threading.Thread(target=send, name="model-request", daemon=True).start()
+        remove = token.on_cancel(done.set)
+        try:
+            done.wait()
+        finally:
+            remove()
+        with lock:
+            if "stream" in outcome:
+                # Cancelled after the headers arrived: _iter_stream aborts it.
+                return outcome["stream"]
+            if "error" in outcome:
+                raise outcome["error"]
+            outcome["abandoned"] = True
+        token.raise_if_cancelled()
+        raise TaskCancelled()
+
+    def _iter_stream(self, stream: Any, token: CancellationToken | None):
+        """Iterate a stream; cancelling ``token`` aborts it and raises TaskCancelled."""
+        if token is None:
+            yield from stream
+            return
+        remove = token.on_cancel(lambda: self._abort_stream(stream))
+        try:
+            for chunk in stream:
+                yield chunk
+        except Exception:
+            if token.cancelled:
+                self._close_stream(stream)
+                token.raise_if_cancelled()
+            raise
+        finally:
+            remove()
+        if token.cancelled:
+            self._close_stream(stream)
+            token.raise_if_cancelled()
+
+    @classmethod
+    def _abort_stream(cls, stream: Any) -> None:
+        """
+        Abort a stream from another thread.
+
+        Closing the response does not wake a thread blocked reading from it;
+        shutting the socket down does, and the server sees the disconnect.
+        """
+        try:
+            network_stream = stream.response.extensions["network_stream"]
+            sock = network_stream.get_extra_info("socket")
+            # Plain socket shutdown, also for TLS sockets (no close_notify).
+            socket.socket.shutdown(sock, socket.SHUT_RDWR)
+        except Exception:
+            cls._close_stream(stream)
+
+    @staticmethod
+    def _close_stream(stream: Any) -> None:
+        """Close a streaming response so the server stops generating."""
+        try:
+            close = getattr(stream, "close", None)
+            if close is None:
+                close = stream.response.close
+            close()
+        except Exception:
+            pass
 
     def _parse_response(self, content: str) -> tuple[str, str]:
         """
@@ -272,24 +485,10 @@ def test_api_connection() -> str:
                     pass
         return ", ".join(parts)
 
-    base_url = os.environ.get("PHONE_AGENT_BASE_URL")
-    api_key = os.environ.get("PHONE_AGENT_API_KEY")
-    model_name = os.environ.get("PHONE_AGENT_MODEL")
-
-    # Prefer Android ConfigManager (real-time), fallback to env.
-    try:
-        from com.chaquo.python import Python as ChaquopyPython
-        from java import jclass
-
-        app = ChaquopyPython.getPlatform().getApplication()
-        ConfigManager = jclass("com.example.autoglm.ConfigManager")
-        cm = ConfigManager(app)
-        cfg = cm.getConfig()
-        base_url = str(cfg.getBaseUrl()) or base_url
-        api_key = str(cfg.getApiKey()) or api_key
-        model_name = str(cfg.getModelName()) or model_name
-    except Exception:
-        pass
+    # Prefer Android ConfigManager (real-time), fallback to env. The test is
+    # user-initiated right after editing settings, so always re-read.
+    invalidate_runtime_config()
+    base_url, api_key, model_name = get_runtime_model_config()
 
     base_url = (base_url or "").strip()
     model_name = (model_name or "").strip()
@@ -307,11 +506,6 @@ def test_api_connection() -> str:
 
     header = f"base_url={base_url}, model={model_name}, api_key_len={len(api_key)}"
 
-    try:
-        import requests
-    except Exception as e:
-        return "失败：缺少 requests 依赖：" + _fmt_exc(e)
-
     def _snippet(text: str, limit: int = 500) -> str:
         t = (text or "").strip()
         return t if len(t) <= limit else (t[:limit] + "...<truncated>")
@@ -323,7 +517,7 @@ def test_api_connection() -> str:
     # Step 1: GET /models (optional; some providers may not implement it)
     try:
         url = base_url.rstrip("/") + "/models"
-        r = requests.get(url, headers=headers, timeout=20)
+        r = http_request("GET", url, headers=headers, timeout=20)
         if 200 <= r.status_code < 300:
             try:
                 data = r.json()
@@ -361,7 +555,7 @@ def test_api_connection() -> str:
             "temperature": 0.0,
             "stream": False,
         }
-        r = requests.post(url, headers=headers, json=payload, timeout=20)
+        r = http_request("POST", url, headers=headers, json=payload, timeout=20)
         if 200 <= r.status_code < 300:
             try:
                 j = r.json()
@@ -428,6 +622,32 @@ class MessageBuilder:
 
         return {"role": "user", "content": content}
 
+    @staticmethod
+    def create_task_message(
+        task: str,
+        screen_info: str,
+        image_base64: str | None = None,
+        image_mime: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        Create the first user message of a task.
+
+        Keeps the layout the model was trained on: the screenshot, then
+        ``"{task}\n\n{screen_info}"``. Once the image is removed, later
+        requests share the system prompt and this text as their prefix.
+
+        Args:
+            task: Task description.
+            screen_info: Screen info JSON from build_screen_info.
+            image_base64: Optional base64-encoded image.
+
+        Returns:
+            Message dictionary.
+        """
+        return MessageBuilder.create_user_message(
+            f"{task}\n\n{screen_info}", image_base64, image_mime
+        )
+
     @staticmethod
     def create_assistant_message(content: str) -> dict[str, Any]:
         """Create an assistant message."""
@@ -455,6 +675,9 @@ class MessageBuilder:
         """
         Build screen info string for the model.
 
+        Keys of extra info are sorted so the same state always serializes
+        to the same bytes.
+
         Args:
             current_app: Current app name.
             **extra_info: Additional info to include.
@@ -462,5 +685,5 @@ class MessageBuilder:
         Returns:
             JSON string with screen info.
         """
-        info = {"current_app": current_app, **extra_info}
+        info = {"current_app": current_app, **dict(sorted(extra_info.items()))}
         return json.dumps(info, ensure_ascii=False)
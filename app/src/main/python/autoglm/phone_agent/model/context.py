@@ -0,0 +1,225 @@
+"""Conversation context with token budget accounting and compaction."""
+
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class ContextConfig:
+    """Configuration for conversation context compaction."""
+
+    # Estimated prompt tokens above which older turns are compacted; 0 (the
+    # default unless PHONE_AGENT_CONTEXT_BUDGET is set) never compacts
+    budget_tokens: int = field(
+        default_factory=lambda: int(os.getenv("PHONE_AGENT_CONTEXT_BUDGET", "0"))
+    )
+    # Most recent turns that are always kept in full
+    keep_turns: int = 4
+    # Rough token cost of one screenshot in the prompt
+    image_tokens: int = 1200
+    # Once over budget, compact down to this fraction of it. Compacting in
+    # chunks keeps the prompt prefix stable for several steps in between,
+    # instead of rewriting the history block (and losing the server's prefix
+    # cache after it) on every step.
+    compact_ratio: float = 0.75
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the token count of a text.
+
+    CJK characters are counted as one token each and other characters as a
+    quarter token, which is close enough for budgeting without a tokenizer.
+
+    Args:
+        text: Text to estimate.
+
+    Returns:
+        Estimated number of tokens.
+    """
+    wide = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return wide + math.ceil((len(text) - wide) / 4)
+
+
+def estimate_message_tokens(message: dict[str, Any], image_tokens: int = 1200) -> int:
+    """
+    Estimate the token cost of one chat message.
+
+    Args:
+        message: Message dictionary in OpenAI format.
+        image_tokens: Cost assumed for each image part.
+
+    Returns:
+        Estimated number of tokens, including a small per-message overhead.
+    """
+    content = message.get("content")
+    tokens = 4
+    if isinstance(content, str):
+        return tokens + estimate_tokens(content)
+    for item in content or []:
+        if item.get("type") == "text":
+            tokens += estimate_tokens(item.get("text", ""))
+        elif item.get("type") == "image_url":
+            tokens += image_tokens
+    return tokens
+
+
+@dataclass
+class _Turn:
+    """One observation/response round of the conversation."""
+
+    user: dict[str, Any]
+    assistant: dict[str, Any] | None = None
+    current_app: str = ""
+    summary: str = ""
+    collapsed: bool = False
+
+
+class ContextManager:
+    """
+    Conversation context that stays within a token budget.
+
+    The system prompt and the first user message (the task) are always kept
+    verbatim, as are the last ``keep_turns`` turns. When the estimated prompt
+    exceeds the budget, the oldest full turns are collapsed into one-line
+    action summaries that are sent as a single assistant message right after
+    the task, until the estimate is below ``compact_ratio`` of the budget.
+    If that is still too large, the oldest summary lines are dropped.
+
+    Args:
+        config: Context configuration.
+
+    Example:
+        >>> ctx = ContextManager(ContextConfig(budget_tokens=8000))
+        >>> ctx.start(MessageBuilder.create_system_message(prompt))
+        >>> ctx.add_user(MessageBuilder.create_user_message(text), current_app="微信")
+        >>> response = model_client.request(ctx.messages)
+        >>> ctx.add_assistant(MessageBuilder.create_assistant_message(reply), summary=action)
+    """
+
+    def __init__(self, config: ContextConfig | None = None):
+        self.config = config or ContextConfig()
+        self._system: dict[str, Any] | None = None
+        self._turns: list[_Turn] = []
+        self._dropped = 0
+        self.prompt_tokens = 0
+
+    def reset(self) -> None:
+        """Forget the whole conversation."""
+        self._system = None
+        self._turns = []
+        self._dropped = 0
+        self.prompt_tokens = 0
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether no message has been added yet."""
+        return self._system is None and not self._turns
+
+    def start(self, system_message: dict[str, Any]) -> None:
+        """Reset the conversation and set the system message."""
+        self.reset()
+        self._system = system_message
+
+    def add_user(self, message: dict[str, Any], current_app: str = "") -> int:
+        """
+        Add the observation message for a new turn and compact if needed.
+
+        Args:
+            message: User message (screen info and screenshot).
+            current_app: Foreground app, used in the turn's summary.
+
+        Returns:
+            Estimated prompt tokens of the resulting context.
+        """
+        self._turns.append(_Turn(user=message, current_app=current_app))
+        self._compact()
+        return self.prompt_tokens
+
+    def add_assistant(self, message: dict[str, Any], summary: str = "") -> None:
+        """
+        Add the model's reply to the current turn.
+
+        Args:
+            message: Assistant message (thinking and action).
+            summary: Compact description of the action, e.g. the raw
+                ``do(...)`` call, used once the turn is collapsed.
+        """
+        if not self._turns:
+            raise ValueError("add_user must be called before add_assistant")
+        turn = self._turns[-1]
+        turn.assistant = message
+        turn.summary = " ".join(summary.split())
+
+    def replace_last_user(self, message: dict[str, Any]) -> None:
+        """Replace the latest user message (e.g. after removing its image)."""
+        if self._turns:
+            self._turns[-1].user = message
+
+    @property
+    def messages(self) -> list[dict[str, Any]]:
+        """The compacted message list to send to the model."""
+        messages: list[dict[str, Any]] = []
+        if self._system is not None:
+            messages.append(self._system)
+
+        history: list[str] = []
+        for index, turn in enumerate(self._turns):
+            if index == 0:
+                messages.append(turn.user)
+                if not turn.collapsed and turn.assistant is not None:
+                    messages.append(turn.assistant)
+                elif turn.collapsed:
+                    history.append(self._summary_line(1, turn))
+                continue
+            if turn.collapsed:
+                history.append(self._summary_line(index + 1, turn))
+                continue
+            if history:
+                messages.append(self._history_message(history))
+                history = []
+            messages.append(turn.user)
+            if turn.assistant is not None:
+                messages.append(turn.assistant)
+        if history:
+            messages.append(self._history_message(history))
+        return messages
+
+    def _summary_line(self, step: int, turn: _Turn) -> str:
+        app = f"[{turn.current_app}] " if turn.current_app else ""
+        return f"{step}. {app}{turn.summary or '(no action)'}"
+
+    def _history_message(self, lines: list[str]) -> dict[str, Any]:
+        kept = lines[self._dropped :]
+        header = "Earlier steps (summarized):"
+        if self._dropped:
+            header += f" {self._dropped} oldest omitted"
+        return {"role": "assistant", "content": "\n".join([header, *kept])}
+
+    def _estimate(self) -> int:
+        image_tokens = self.config.image_tokens
+        return sum(estimate_message_tokens(m, image_tokens) for m in self.messages)
+
+    def _compact(self) -> None:
+        self.prompt_tokens = self._estimate()
+        budget = self.config.budget_tokens
+        if budget <= 0 or self.prompt_tokens <= budget:
+            return
+        target = budget * self.config.compact_ratio
+
+        # Turns that may be collapsed: everything but the last keep_turns.
+        collapsible = self._turns[: max(0, len(self._turns) - self.config.keep_turns)]
+        for turn in collapsible:
+            if self.prompt_tokens <= target:
+                return
+            if turn.collapsed or turn.assistant is None:
+                continue
+            turn.collapsed = True
+            self.prompt_tokens = self._estimate()
+
+        collapsed = sum(1 for turn in self._turns if turn.collapsed)
+        while self.prompt_tokens > target and self._dropped < collapsed:
+            self._dropped += 1
+            self.prompt_tokens = self._estimate()
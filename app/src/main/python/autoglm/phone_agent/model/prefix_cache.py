@@ -0,0 +1,84 @@
+"""Diagnostics for server-side prompt prefix caching."""
+
+import json
+import threading
+from typing import Any
+
+
+def serialize_messages(messages: list[dict[str, Any]]) -> str:
+    """
+    Serialize messages the same way for every request.
+
+    Keys are sorted and separators fixed, so two requests that share leading
+    messages also share a byte-identical serialized prefix.
+
+    Args:
+        messages: Messages in OpenAI format.
+
+    Returns:
+        Canonical JSON text.
+    """
+    return json.dumps(
+        messages, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    )
+
+
+def shared_prefix_length(a: str, b: str) -> int:
+    """
+    Length of the common prefix of two strings.
+
+    Compares halving slices instead of characters so long prompts (with
+    inline base64 screenshots) stay cheap to compare.
+    """
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class PrefixCacheTracker:
+    """
+    Track how much of each request repeats the previous request.
+
+    Automatic prefix caching (vLLM, SGLang) can only reuse the KV cache for
+    the leading part of a prompt that is identical to an earlier one. The
+    shared prefix reported here is measured on the serialized messages, so
+    it is an upper bound of what the server can reuse; compare it against
+    the server's prefix cache hit metrics.
+
+    The previous request is remembered per thread, so a client shared by
+    agents running in separate threads compares each agent with itself.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self.last_prompt_chars = 0
+        self.last_shared_chars = 0
+
+    def observe(self, messages: list[dict[str, Any]]) -> tuple[int, int]:
+        """
+        Record a request.
+
+        Args:
+            messages: Messages about to be sent.
+
+        Returns:
+            Tuple of (serialized prompt length, prefix length shared with
+            the previous request), both in characters.
+        """
+        current = serialize_messages(messages)
+        shared = shared_prefix_length(getattr(self._local, "previous", ""), current)
+        self._local.previous = current
+        self.last_prompt_chars = len(current)
+        self.last_shared_chars = shared
+        return len(current), shared
+
+    def reset(self) -> None:
+        """Forget the previous request of the calling thread."""
+        self._local.previous = ""
+        self.last_prompt_chars = 0
+        self.last_shared_chars = 0
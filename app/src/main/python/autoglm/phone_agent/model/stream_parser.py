@@ -0,0 +1,122 @@
+"""Incremental detection of a complete action call in a streamed response."""
+
+import ast
+
+ACTION_MARKERS = ("finish(message=", "do(action=")
+
+
+def is_complete_action(candidate: str) -> bool:
+    """
+    Check whether a string is one well-formed ``do(...)`` / ``finish(...)`` call.
+
+    Uses the same escaping as ``parse_action`` so a candidate accepted here is
+    one the action parser can handle.
+
+    Args:
+        candidate: Text starting at the action marker and ending at ``)``.
+
+    Returns:
+        True if the text parses as a call with literal keyword arguments only.
+    """
+    text = candidate.replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
+    try:
+        tree = ast.parse(text, mode="eval")
+    except SyntaxError:
+        return False
+    call = tree.body
+    if not isinstance(call, ast.Call) or not isinstance(call.func, ast.Name):
+        return False
+    if call.func.id not in ("do", "finish") or call.args:
+        return False
+    try:
+        for keyword in call.keywords:
+            ast.literal_eval(keyword.value)
+    except (ValueError, SyntaxError):
+        return False
+    return True
+
+
+class StreamingActionParser:
+    """
+    Find the end of the first action call while the model is still streaming.
+
+    Content is fed chunk by chunk. Once an action marker has been seen, the
+    parser tracks parenthesis depth outside of string literals; every ``)``
+    that brings the depth back to zero is validated with ``ast`` and the first
+    valid candidate is reported. Candidates that fail validation (for example
+    a quote inside a ``Type`` text) are skipped, so the caller simply falls
+    back to parsing the full response when the stream ends.
+
+    Example:
+        >>> parser = StreamingActionParser()
+        >>> parser.feed('Tap it. do(action="Tap", ')
+        >>> parser.feed('element=[1,2])</answer>')
+        'do(action="Tap", element=[1,2])'
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.action_start: int | None = None
+        self.action_end: int | None = None
+        self._pos = 0
+        self._depth = 0
+        self._quote: str | None = None
+        self._escaped = False
+
+    @property
+    def action(self) -> str | None:
+        """The complete action call, once found."""
+        if self.action_end is None:
+            return None
+        return self.buffer[self.action_start : self.action_end]
+
+    def feed(self, content: str) -> str | None:
+        """
+        Add streamed content.
+
+        Args:
+            content: Next chunk of model output.
+
+        Returns:
+            The complete action call if it is now available, else None.
+        """
+        if self.action_end is not None:
+            return self.action
+        self.buffer += content
+
+        if self.action_start is None:
+            found = [
+                idx
+                for idx in (self.buffer.find(marker) for marker in ACTION_MARKERS)
+                if idx >= 0
+            ]
+            if not found:
+                return None
+            self.action_start = min(found)
+            self._pos = self.action_start
+
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if self._quote is not None:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == self._quote:
+                    self._quote = None
+                continue
+            if ch in ("'", '"'):
+                self._quote = ch
+            elif ch in "([{":
+                self._depth += 1
+            elif ch in ")]}":
+                self._depth -= 1
+                if ch == ")" and self._depth <= 0:
+                    candidate = buf[self.action_start : i + 1]
+                    if is_complete_action(candidate):
+                        self.action_end = i + 1
+                        self._pos = i + 1
+                        return candidate
+        self._pos = len(buf)
+        return None
@@ -0,0 +1,263 @@
+"""Process-wide HTTP transport shared by model clients and health checks.
+
+Every ``OpenAI`` client, API connectivity test and health check in the
+process goes through one pooled keep-alive HTTP client, so TLS sessions to
+the model gateway are reused across steps, agents and tasks instead of being
+renegotiated whenever a client is rebuilt.
+
+Runtime model configuration (base URL, key, model name) is resolved through
+a cheap version stamp: the environment variables injected by the Android
+side. The Android ``ConfigManager`` is only read over JNI when that stamp
+changes.
+"""
+
+import atexit
+import importlib.util
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - httpx ships with openai
+    httpx = None
+
+from openai import OpenAI
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in ("true", "1", "yes")
+
+
+@dataclass
+class TransportConfig:
+    """Configuration for the shared HTTP transport."""
+
+    connect_timeout: float = field(
+        default_factory=lambda: _env_float("PHONE_AGENT_CONNECT_TIMEOUT", 10.0)
+    )
+    read_timeout: float = field(
+        default_factory=lambda: _env_float("PHONE_AGENT_READ_TIMEOUT", 120.0)
+    )
+    write_timeout: float = 30.0
+    pool_timeout: float = 10.0
+    max_connections: int = 32
+    max_keepalive_connections: int = 16
+    keepalive_expiry: float = field(
+        default_factory=lambda: _env_float("PHONE_AGENT_KEEPALIVE_EXPIRY", 120.0)
+    )
+    # HTTP/2 multiplexes concurrent requests over one TLS connection; it
+    # needs the optional "h2" package and is ignored without it.
+    http2: bool = field(default_factory=lambda: _env_flag("PHONE_AGENT_HTTP2"))
+
+
+_config = TransportConfig()
+_lock = threading.Lock()
+_http_client: Any = None
+_requests_session: Any = None
+_openai_clients: dict[tuple[str, str], OpenAI] = {}
+
+
+def configure_transport(config: TransportConfig) -> None:
+    """
+    Replace the transport configuration and drop pooled connections.
+
+    Args:
+        config: New transport configuration.
+    """
+    global _config
+    close_transport()
+    with _lock:
+        _config = config
+
+
+def get_transport_config() -> TransportConfig:
+    """Get the current transport configuration."""
+    return _config
+
+
+def _timeout() -> Any:
+    return httpx.Timeout(
+        connect=_config.connect_timeout,
+        read=_config.read_timeout,
+        write=_config.write_timeout,
+        pool=_config.pool_timeout,
+    )
+
+
+def get_http_client() -> Any:
+    """
+    Get the shared pooled ``httpx.Client``.
+
+    Returns:
+        The client, or None if httpx is not installed.
+    """
+    global _http_client
+    if httpx is None:
+        return None
+    with _lock:
+        if _http_client is None:
+            http2 = _config.http2 and importlib.util.find_spec("h2") is not None
+            _http_client = httpx.Client(
+                http2=http2,
+                timeout=_timeout(),
+                limits=httpx.Limits(
+                    max_connections=_config.max_connections,
+                    max_keepalive_connections=_config.max_keepalive_connections,
+                    keepalive_expiry=_config.keepalive_expiry,
+                ),
+                follow_redirects=True,
+            )
+        return _http_client
+
+
+def get_openai_client(base_url: str, api_key: str) -> OpenAI:
+    """
+    Get an ``OpenAI`` client for an endpoint, backed by the shared pool.
+
+    Clients are cached per (base_url, api_key), so switching back and forth
+    between configurations never rebuilds a client or its connections.
+
+    Args:
+        base_url: OpenAI-compatible API base URL.
+        api_key: API key (may be empty for local servers).
+
+    Returns:
+        Cached OpenAI client.
+    """
+    key = (base_url, api_key)
+    with _lock:
+        client = _openai_clients.get(key)
+    if client is not None:
+        return client
+
+    http_client = get_http_client()
+    kwargs: dict[str, Any] = {"base_url": base_url, "api_key": api_key}
+    if http_client is not None:
+        kwargs["http_client"] = http_client
+        kwargs["timeout"] = _timeout()
+    client = OpenAI(**kwargs)
+    with _lock:
+        return _openai_clients.setdefault(key, client)
+
+
+def http_request(method: str, url: str, **kwargs) -> Any:
+    """
+    Send a plain HTTP request over the shared pool.
+
+    Used by connectivity tests and health checks. Falls back to a shared
+    ``requests.Session`` if httpx is not installed. Both response types
+    provide ``status_code``, ``text`` and ``json()``.
+
+    Args:
+        method: HTTP method, e.g. "GET".
+        url: Absolute URL.
+        **kwargs: headers, json, timeout.
+
+    Returns:
+        The HTTP response.
+    """
+    global _requests_session
+    client = get_http_client()
+    if client is not None:
+        return client.request(method, url, **kwargs)
+
+    import requests
+
+    with _lock:
+        if _requests_session is None:
+            _requests_session = requests.Session()
+        session = _requests_session
+    return session.request(method, url, **kwargs)
+
+
+def close_transport() -> None:
+    """Close pooled connections and forget cached clients."""
+    global _http_client, _requests_session
+    with _lock:
+        client, _http_client = _http_client, None
+        session, _requests_session = _requests_session, None
+        _openai_clients.clear()
+    for closable in (client, session):
+        if closable is not None:
+            try:
+                closable.close()
+            except Exception:
+                pass
+
+
+atexit.register(close_transport)
+
+
+_RUNTIME_ENV_VARS = ("PHONE_AGENT_BASE_URL", "PHONE_AGENT_API_KEY", "PHONE_AGENT_MODEL")
+_runtime_stamp: tuple | None = None
+_runtime_config: tuple[str | None, str | None, str | None] = (None, None, None)
+
+
+def _read_android_config() -> tuple[str | None, str | None, str | None]:
+    try:
+        from com.chaquo.python import Python as ChaquopyPython
+        from java import jclass
+
+        app = ChaquopyPython.getPlatform().getApplication()
+        ConfigManager = jclass("com.example.autoglm.ConfigManager")
+        cm = ConfigManager(app)
+        cfg = cm.getConfig()
+        return str(cfg.getBaseUrl()), str(cfg.getApiKey()), str(cfg.getModelName())
+    except Exception:
+        return None, None, None
+
+
+def config_version() -> tuple:
+    """
+    Cheap version stamp of the runtime model configuration.
+
+    The Android side re-injects the model settings into ``os.environ``
+    whenever they may have changed (app start, before each task), so the
+    injected values identify the configuration version.
+    """
+    return tuple(os.environ.get(name) for name in _RUNTIME_ENV_VARS)
+
+
+def get_runtime_model_config() -> tuple[str | None, str | None, str | None]:
+    """
+    Resolve (base_url, api_key, model_name) from the Android app and env.
+
+    Android ``ConfigManager`` values take precedence over the environment,
+    but are only re-read over JNI when :func:`config_version` changes.
+
+    Returns:
+        Tuple of (base_url, api_key, model_name); entries may be None/empty.
+    """
+    global _runtime_stamp, _runtime_config
+    stamp = config_version()
+    with _lock:
+        if stamp == _runtime_stamp:
+            return _runtime_config
+
+    base_url, api_key, model_name = _read_android_config()
+    env_base_url, env_api_key, env_model_name = stamp
+    resolved = (
+        base_url or env_base_url,
+        api_key or env_api_key,
+        model_name or env_model_name,
+    )
+    with _lock:
+        _runtime_stamp = stamp
+        _runtime_config = resolved
+    return resolved
+
+
+def invalidate_runtime_config() -> None:
+    """Force the next lookup to re-read the Android configuration."""
+    global _runtime_stamp
+    with _lock:
+        _runtime_stamp = None
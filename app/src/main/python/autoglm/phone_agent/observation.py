@@ -0,0 +1,153 @@
+"""One captured screen state per step, shared by the agent and the UI."""
+
+import contextvars
+import hashlib
+import os
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Callable
+
+from phone_agent.device_factory import DeviceFactory
+from phone_agent.imaging.preview import make_preview
+
+# Sent instead of a preview when the frame did not change since the last one.
+FRAME_UNCHANGED_PREFIX = "[[FRAME_UNCHANGED]]"
+
+
+@dataclass
+class Observation:
+    """
+    Screenshot and foreground app captured at the start of a step.
+
+    Attributes:
+        screenshot: Screenshot returned by the device backend.
+        current_app: Foreground app name.
+        timings: Capture timings in seconds (``screenshot``, ``current_app``,
+            ``observe``).
+        captured_at: Wall-clock time of the capture.
+    """
+
+    screenshot: Any
+    current_app: str
+    timings: dict[str, float] = field(default_factory=dict)
+    captured_at: float = field(default_factory=time.time)
+
+    @cached_property
+    def digest(self) -> str:
+        """Hash of the encoded frame, to detect unchanged screens."""
+        data = self.screenshot.base64_data.encode("ascii")
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _timed(fn: Callable[..., Any], *args) -> tuple[Any, float]:
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - start
+
+
+def capture_observation(
+    device_factory: DeviceFactory,
+    device_id: str | None = None,
+    executor: Executor | None = None,
+) -> Observation:
+    """
+    Capture the screenshot and the foreground app.
+
+    Args:
+        device_factory: Device backend to query.
+        device_id: Optional device ID.
+        executor: If given, the foreground app is queried on it while the
+            screenshot is taken, so the capture costs max(screenshot,
+            current_app) instead of their sum.
+
+    Returns:
+        The observation.
+    """
+    timings: dict[str, float] = {}
+    start = time.perf_counter()
+
+    if executor is not None:
+        # Run in a copy of this context so the cancellation token follows.
+        app_future = executor.submit(
+            contextvars.copy_context().run,
+            _timed,
+            device_factory.get_current_app,
+            device_id,
+        )
+        screenshot, timings["screenshot"] = _timed(
+            device_factory.get_screenshot, device_id
+        )
+        current_app, timings["current_app"] = app_future.result()
+    else:
+        screenshot, timings["screenshot"] = _timed(
+            device_factory.get_screenshot, device_id
+        )
+        current_app, timings["current_app"] = _timed(
+            device_factory.get_current_app, device_id
+        )
+
+    timings["observe"] = time.perf_counter() - start
+    return Observation(screenshot=screenshot, current_app=current_app, timings=timings)
+
+
+def _default_max_side() -> int:
+    try:
+        return int(os.getenv("PHONE_AGENT_PREVIEW_MAX_SIDE", "720"))
+    except ValueError:
+        return 720
+
+
+class PreviewPublisher:
+    """
+    Send screen previews to a UI callback.
+
+    Each observation is sent as a downscaled JPEG, or as
+    ``FRAME_UNCHANGED_PREFIX + digest`` when its frame is identical to the
+    previous one, so an unchanged screen costs a few bytes instead of a full
+    image across the bridge.
+
+    Args:
+        send: Receives the base64 preview or the unchanged marker.
+        max_side: Longest preview side in pixels; defaults to
+            ``PHONE_AGENT_PREVIEW_MAX_SIDE`` (720). 0 sends full frames.
+        quality: JPEG quality of the preview.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], None],
+        max_side: int | None = None,
+        quality: int = 60,
+    ):
+        self.send = send
+        self.max_side = _default_max_side() if max_side is None else max_side
+        self.quality = quality
+        self._last_digest: str | None = None
+
+    def reset(self) -> None:
+        """Forget the last frame, so the next one is always sent."""
+        self._last_digest = None
+
+    def publish(self, observation: Observation) -> bool:
+        """
+        Send the preview of an observation.
+
+        Returns:
+            True if a preview was sent, False if only the unchanged marker was.
+        """
+        digest = observation.digest
+        if digest == self._last_digest:
+            self.send(FRAME_UNCHANGED_PREFIX + digest)
+            return False
+
+        data = observation.screenshot.base64_data
+        if self.max_side > 0:
+            try:
+                data = make_preview(data, self.max_side, self.quality)
+            except Exception:
+                pass
+        self._last_digest = digest
+        self.send(data)
+        return True
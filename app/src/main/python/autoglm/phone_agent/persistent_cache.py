@@ -0,0 +1,116 @@
+"""Small JSON key-value caches persisted across runs."""
+
+import json
+import os
+import tempfile
+import threading
+from typing import Any
+
+
+def default_cache_dir() -> str:
+    """
+    Directory for persistent caches.
+
+    ``PHONE_AGENT_CACHE_DIR`` if set; on Android the app's files dir (via
+    Chaquopy); otherwise ``~/.cache/phone_agent``.
+    """
+    env_dir = (os.environ.get("PHONE_AGENT_CACHE_DIR") or "").strip()
+    if env_dir:
+        return env_dir
+    try:
+        from com.chaquo.python import Python as ChaquopyPython
+
+        app = ChaquopyPython.getPlatform().getApplication()
+        return os.path.join(str(app.getFilesDir().getAbsolutePath()), "phone_agent")
+    except Exception:
+        pass
+    home = os.path.expanduser("~")
+    if not home or home == "~":
+        home = tempfile.gettempdir()
+    return os.path.join(home, ".cache", "phone_agent")
+
+
+class JsonCache:
+    """
+    A JSON object on disk used as a string-keyed cache.
+
+    The file is loaded on first access and rewritten atomically on every
+    change. A missing or corrupt file is treated as an empty cache, and
+    write errors are ignored: the cache is an optimization only.
+
+    Args:
+        filename: File name inside ``cache_dir``.
+        cache_dir: Directory of the file; defaults to :func:`default_cache_dir`.
+
+    Example:
+        >>> cache = JsonCache("launch_strategies.json")
+        >>> cache.set("fingerprint|com.tencent.mm", {"strategy": "am_start"})
+        >>> cache.get("fingerprint|com.tencent.mm")
+    """
+
+    def __init__(self, filename: str, cache_dir: str | None = None):
+        self.filename = filename
+        self.cache_dir = cache_dir
+        self._data: dict[str, Any] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.cache_dir or default_cache_dir(), self.filename)
+
+    def _load(self) -> dict[str, Any]:
+        if self._data is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self._data = data if isinstance(data, dict) else {}
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def _save(self) -> None:
+        path = self.path
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False, sort_keys=True)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a cached value."""
+        with self._lock:
+            return self._load().get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value and persist the cache."""
+        with self._lock:
+            data = self._load()
+            if data.get(key) == value:
+                return
+            data[key] = value
+            self._save()
+
+    def update(self, values: dict[str, Any]) -> None:
+        """Store several values with a single write."""
+        with self._lock:
+            self._load().update(values)
+            self._save()
+
+    def pop(self, key: str) -> Any:
+        """Remove a value and persist the cache."""
+        with self._lock:
+            data = self._load()
+            if key not in data:
+                return None
+            value = data.pop(key)
+            self._save()
+            return value
+
+    def clear(self) -> None:
+        """Remove all values."""
+        with self._lock:
+            self._data = {}
+            self._save()
@@ -0,0 +1,253 @@
+"""Append-only trajectory recorder for agent runs.
+
+A run directory holds one JSONL log (``steps.jsonl``, or ``steps.jsonl.zst``
+when compressed) and a ``frames/`` directory of screenshots named by the
+SHA-256 of their bytes, so identical frames are stored once. Inline images in
+recorded prompt messages are replaced by ``frame:<digest>`` references.
+
+The agents write the system prompt once in the "task" record and, per
+"step" record, only the user turn added that step (the model's reply is its
+``raw_content``), so the log grows linearly with the number of steps.
+
+All encoding and I/O happens on a background writer thread. Records are
+handed over through a bounded queue; when it is full the record is dropped
+(and counted) instead of blocking the agent loop.
+"""
+
+import base64
+import hashlib
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+_MIME_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+_DATA_URL_PREFIX = "data:"
+
+_run_counter = itertools.count(1)
+
+
+def _default_run_name() -> str:
+    # Unique per process even when several agents start in the same second.
+    return time.strftime("run-%Y%m%d-%H%M%S") + f"-{os.getpid()}-{next(_run_counter)}"
+
+
+class TrajectoryRecorder:
+    """
+    Record agent steps to a run directory without slowing down the loop.
+
+    Args:
+        base_dir: Directory under which the run directory is created.
+        run_name: Name of the run directory; defaults to a timestamp.
+        compress: Write the log zstd-compressed. Needs the optional
+            ``zstandard`` package; without it the log is written as plain
+            JSONL. Each flush ends a zstd frame, so a log cut short by a
+            crash still decodes up to the last flush.
+        max_queue: Maximum records waiting for the writer; further records
+            are dropped.
+
+    Example:
+        >>> recorder = TrajectoryRecorder("/sdcard/phone_agent_runs")
+        >>> recorder.record("task", task="Open WeChat")
+        >>> recorder.record_step(1, messages=msgs, raw_content=raw, action=action,
+        ...                      timings=timings, screenshot=b64, screenshot_mime="image/jpeg")
+        >>> recorder.close()
+    """
+
+    def __init__(
+        self,
+        base_dir: str,
+        run_name: str | None = None,
+        compress: bool = False,
+        max_queue: int = 256,
+    ):
+        self.run_dir = os.path.join(base_dir, run_name or _default_run_name())
+        self.frames_dir = os.path.join(self.run_dir, "frames")
+        os.makedirs(self.frames_dir, exist_ok=True)
+
+        self.compressed = bool(compress and zstandard is not None)
+        log_name = "steps.jsonl.zst" if self.compressed else "steps.jsonl"
+        self.log_path = os.path.join(self.run_dir, log_name)
+
+        self.dropped = 0
+        self.written = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._known_frames: set[str] = set(
+            name.split(".", 1)[0] for name in os.listdir(self.frames_dir)
+        )
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._writer_loop, name="trajectory-recorder", daemon=True
+        )
+        self._thread.start()
+
+    def record(self, kind: str, **fields: Any) -> bool:
+        """
+        Queue a record; never blocks.
+
+        Args:
+            kind: Record type, e.g. "task", "step" or "done".
+            **fields: JSON-serializable fields. A base64 ``screenshot`` (with
+                ``screenshot_mime``) is stored as a frame file, and inline
+                images inside ``messages`` are replaced by frame references.
+
+        Returns:
+            False if the record was dropped because the queue was full or
+            the recorder is closed.
+        """
+        if self._closed:
+            return False
+        fields["type"] = kind
+        fields["ts"] = time.time()
+        if "messages" in fields and fields["messages"] is not None:
+            # The caller's list keeps growing; the writer runs later.
+            fields["messages"] = list(fields["messages"])
+        try:
+            self._queue.put_nowait(fields)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def record_step(
+        self,
+        step: int,
+        messages: list[dict[str, Any]] | None = None,
+        raw_content: str | None = None,
+        action: dict[str, Any] | None = None,
+        timings: dict[str, float] | None = None,
+        screenshot: str | None = None,
+        screenshot_mime: str | None = None,
+        **extra: Any,
+    ) -> bool:
+        """Queue the record of one agent step (see :meth:`record`)."""
+        return self.record(
+            "step",
+            step=step,
+            messages=messages,
+            raw_content=raw_content,
+            action=action,
+            timings=timings,
+            screenshot=screenshot,
+            screenshot_mime=screenshot_mime,
+            **extra,
+        )
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush queued records and stop the writer."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+
+    def _store_frame(self, b64: str, mime: str | None) -> str:
+        data = base64.b64decode(b64)
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        if digest not in self._known_frames:
+            ext = _MIME_EXTENSIONS.get(mime or "", "bin")
+            path = os.path.join(self.frames_dir, f"{digest}.{ext}")
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self._known_frames.add(digest)
+        return digest
+
+    def _strip_images(self, messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        stripped = []
+        for message in messages:
+            content = message.get("content")
+            if not isinstance(content, list):
+                stripped.append(message)
+                continue
+            parts = []
+            for part in content:
+                url = (part.get("image_url") or {}).get("url", "")
+                if part.get("type") == "image_url" and url.startswith(_DATA_URL_PREFIX):
+                    header, _, b64 = url.partition(",")
+                    mime = header[len(_DATA_URL_PREFIX) :].split(";", 1)[0]
+                    digest = self._store_frame(b64, mime)
+                    part = {
+                        "type": "image_url",
+                        "image_url": {"url": f"frame:{digest}"},
+                    }
+                parts.append(part)
+            stripped.append({**message, "content": parts})
+        return stripped
+
+    def _encode(self, record: dict[str, Any]) -> bytes:
+        screenshot = record.pop("screenshot", None)
+        mime = record.pop("screenshot_mime", None)
+        if screenshot:
+            record["frame"] = self._store_frame(screenshot, mime)
+        if record.get("messages"):
+            record["messages"] = self._strip_images(record["messages"])
+        if self.dropped:
+            record["dropped_before"] = self.dropped
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        return (line + "\n").encode("utf-8")
+
+    def _writer_loop(self) -> None:
+        raw = open(self.log_path, "ab")
+        if self.compressed:
+            compressor = zstandard.ZstdCompressor(level=3)
+            out = compressor.stream_writer(raw, closefd=True)
+        else:
+            out = raw
+        try:
+            stop = False
+            while not stop:
+                batch = [self._queue.get()]
+                # Drain whatever else is waiting and write it in one go.
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                for record in batch:
+                    if record is None:
+                        stop = True
+                        continue
+                    try:
+                        out.write(self._encode(record))
+                        self.written += 1
+                    except Exception:
+                        self.dropped += 1
+                if self.compressed:
+                    out.flush(zstandard.FLUSH_FRAME)
+                else:
+                    out.flush()
+        finally:
+            out.close()
+
+
+def create_recorder_from_env() -> TrajectoryRecorder | None:
+    """
+    Create a recorder if ``PHONE_AGENT_RECORD_DIR`` is set.
+
+    ``PHONE_AGENT_RECORD_ZSTD=true`` enables compression.
+    """
+    base_dir = (os.environ.get("PHONE_AGENT_RECORD_DIR") or "").strip()
+    if not base_dir:
+        return None
+    compress = os.getenv("PHONE_AGENT_RECORD_ZSTD", "false").strip().lower() in (
+        "true",
+        "1",
+        "yes",
+    )
+    try:
+        return TrajectoryRecorder(base_dir, compress=compress)
+    except OSError:
+        return None
@@ -0,0 +1,155 @@
+"""Adaptive screen-settle detection after device actions.
+
+Instead of sleeping a fixed delay after every action, the settler polls a
+cheap frame fingerprint from the device (for example an on-device hash of
+the raw framebuffer) and returns as soon as consecutive samples stop
+changing. A minimum delay floor and a maximum timeout bound the wait.
+
+Observed settle times are recorded per action type so the floor and cap
+can be tuned from real data, see :func:`get_settle_stats`.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from phone_agent import cancellation
+from phone_agent.config.timing import TIMING_CONFIG, SettleConfig
+from phone_agent.metrics import SETTLE_SECONDS
+
+
+@dataclass
+class SettleRecord:
+    """Aggregated settle observations for one action type."""
+
+    count: int = 0
+    timeouts: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    samples: list[float] = field(default_factory=list)
+
+    # Keep a bounded window of recent samples for percentiles.
+    max_samples: int = 200
+
+    def add(self, elapsed: float, timed_out: bool) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        if timed_out:
+            self.timeouts += 1
+        self.samples.append(elapsed)
+        if len(self.samples) > self.max_samples:
+            del self.samples[0]
+
+    def summary(self) -> dict[str, float]:
+        ordered = sorted(self.samples)
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return {
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": pct(0.5),
+            "p95": pct(0.95),
+            "max": self.max,
+        }
+
+
+_stats: dict[str, SettleRecord] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(action_type: str, elapsed: float, timed_out: bool) -> None:
+    SETTLE_SECONDS.observe(elapsed, action=action_type)
+    with _stats_lock:
+        record = _stats.get(action_type)
+        if record is None:
+            record = SettleRecord()
+            _stats[action_type] = record
+        record.add(elapsed, timed_out)
+
+
+def get_settle_stats() -> dict[str, dict[str, float]]:
+    """
+    Get observed settle times per action type.
+
+    Returns:
+        Mapping of action type to count/timeouts/mean/p50/p95/max (seconds).
+    """
+    with _stats_lock:
+        return {name: record.summary() for name, record in _stats.items()}
+
+
+def reset_settle_stats() -> None:
+    """Clear all recorded settle observations."""
+    with _stats_lock:
+        _stats.clear()
+
+
+def wait_for_settle(
+    action_type: str,
+    probe: Callable[[], str | None] | None,
+    config: SettleConfig | None = None,
+    sleep: Callable[[float], None] = cancellation.sleep,
+) -> float:
+    """
+    Block until the screen stops changing after an action.
+
+    The wait is measured from the moment this function is called, which
+    should be right after the action command returned.
+
+    Args:
+        action_type: Action name used for statistics, e.g. "Tap".
+        probe: Callable returning a frame fingerprint, or None if the device
+            cannot provide one. Without a probe the settler falls back to
+            sleeping ``max_timeout``.
+        config: Settle configuration (defaults to TIMING_CONFIG.settle).
+        sleep: Sleep function; the default wakes up when the task is cancelled.
+
+    Returns:
+        Observed settle time in seconds.
+    """
+    config = config or TIMING_CONFIG.settle
+    cap = config.launch_max_timeout if action_type == "Launch" else config.max_timeout
+    start = time.perf_counter()
+
+    if config.min_delay > 0:
+        sleep(config.min_delay)
+
+    if probe is None:
+        sleep(max(0.0, cap - (time.perf_counter() - start)))
+        elapsed = time.perf_counter() - start
+        _record(action_type, elapsed, timed_out=True)
+        return elapsed
+
+    previous: str | None = None
+    stable = 0
+    timed_out = True
+    while time.perf_counter() - start < cap:
+        try:
+            current = probe()
+        except Exception:
+            current = None
+        if current is None:
+            # The device cannot fingerprint frames right now; use the cap.
+            sleep(max(0.0, cap - (time.perf_counter() - start)))
+            break
+
+        if current == previous:
+            stable += 1
+            if stable + 1 >= config.stable_samples:
+                timed_out = False
+                break
+        else:
+            stable = 0
+        previous = current
+        sleep(config.poll_interval)
+
+    elapsed = time.perf_counter() - start
+    _record(action_type, elapsed, timed_out)
+    return elapsed
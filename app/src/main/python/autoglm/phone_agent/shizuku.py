@@ -7,14 +7,24 @@ It executes shell commands via Kotlin ShizukuBridge (rikka.shizuku).
 from __future__ import annotations
 
 import base64
+import functools
 import os
 import re
+import sys
+import threading
 import time
 from dataclasses import dataclass
 from io import BytesIO
 
 from PIL import Image
+from phone_agent import cancellation
 from phone_agent.config.apps import APP_PACKAGES
+from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.foreground_app import ForegroundAppDetector
+from phone_agent.imaging import encode_jpeg_to_target, fallback_frame, is_likely_black_image
+from phone_agent.keyboard import KeyboardSession
+from phone_agent.metrics import untimed
+from phone_agent.persistent_cache import JsonCache
 
 
 def _get_bridge():
@@ -76,9 +86,7 @@ def _get_virtual_display_id() -> int | None:
         return None
 
 
-def _ensure_virtual_display_started() -> int | None:
-    if not _is_virtual_isolated_mode():
-        return None
+def _prepare_virtual_display() -> int | None:
     try:
         from java import jclass
 
@@ -103,12 +111,7 @@ def _ensure_virtual_display_started() -> int | None:
     return _get_virtual_display_id()
 
 
-def _ensure_virtual_display_focused_best_effort(display_id: int | None) -> None:
-    did = int(display_id) if display_id is not None else 0
-    if did <= 0:
-        return
-    if not _is_virtual_isolated_mode():
-        return
+def _focus_virtual_display(did: int) -> None:
     try:
         from java import jclass
 
@@ -132,6 +135,159 @@ def _ensure_virtual_display_focused_best_effort(display_id: int | None) -> None:
         pass
 
 
+class _DisplaySession:
+    """虚拟显示会话：每个任务只准备一次，缓存 display id 与焦点状态。
+
+    仅在以下情况重新准备/聚焦：调用 invalidate()（注入器返回 false、截图黑屏、任务开始），
+    或 PHONE_AGENT_DISPLAY_ID / PHONE_AGENT_EXECUTION_ENV 发生变化。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: tuple | None = None
+        self._display_id: int | None = None
+        self._focused: int | None = None
+        # name -> [调用次数, 命中缓存次数, 累计耗时(秒)]
+        self._counters: dict[str, list] = {}
+
+    @staticmethod
+    def _env_key() -> tuple:
+        return (
+            os.environ.get("PHONE_AGENT_EXECUTION_ENV"),
+            os.environ.get("PHONE_AGENT_DISPLAY_ID"),
+        )
+
+    def record(self, name: str, seconds: float, hit: bool = False) -> None:
+        with self._lock:
+            c = self._counters.setdefault(name, [0, 0, 0.0])
+            c[0] += 1
+            c[1] += 1 if hit else 0
+            c[2] += seconds
+
+    def display_id(self) -> int | None:
+        if not _is_virtual_isolated_mode():
+            return None
+        t0 = time.perf_counter()
+        key = self._env_key()
+        with self._lock:
+            if self._key == key and self._display_id is not None:
+                did = self._display_id
+                hit = True
+            else:
+                did = None
+                hit = False
+        if not hit:
+            did = _prepare_virtual_display()
+            with self._lock:
+                self._key = key if did is not None else None
+                self._display_id = did
+                self._focused = None
+        self.record("prepare", time.perf_counter() - t0, hit)
+        return did
+
+    def ensure_focused(self, display_id: int | None) -> None:
+        did = int(display_id) if display_id is not None else 0
+        if did <= 0 or not _is_virtual_isolated_mode():
+            return
+        with self._lock:
+            hit = self._focused == did
+        t0 = time.perf_counter()
+        if not hit:
+            _focus_virtual_display(did)
+            self.mark_focused(did)
+        self.record("focus", time.perf_counter() - t0, hit)
+
+    def mark_focused(self, display_id: int) -> None:
+        with self._lock:
+            if self._display_id == display_id:
+                self._focused = display_id
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._key = None
+            self._display_id = None
+            self._focused = None
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                name: {"calls": c[0], "cached": c[1], "total_ms": c[2] * 1000.0}
+                for name, c in self._counters.items()
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+_display_session = _DisplaySession()
+
+
+def _ensure_virtual_display_started() -> int | None:
+    return _display_session.display_id()
+
+
+def _ensure_virtual_display_focused_best_effort(display_id: int | None) -> None:
+    _display_session.ensure_focused(display_id)
+
+
+def _inject_on_display(method: str, display_id: int | None, *args: int) -> bool:
+    """通过 VirtualDisplayController 的注入方法向虚拟屏注入事件。
+
+    注入器在虚拟屏引擎已停止、displayId 过期或注入异常时返回 false。
+    """
+    if display_id is None:
+        return False
+    try:
+        from java import jclass
+
+        Vdc = jclass("com.example.autoglm.VirtualDisplayController")
+        return bool(getattr(Vdc, method)(int(display_id), *args))
+    except Exception:
+        return False
+
+
+def _display_after_failed_injection(display_id: int | None) -> int | None:
+    """注入失败：使缓存的 display id 失效并重新准备/聚焦虚拟屏，返回新的 display id。"""
+    if display_id is None:
+        return None
+    _display_session.invalidate()
+    did = _ensure_virtual_display_started()
+    _ensure_virtual_display_focused_best_effort(did)
+    return did
+
+
+def _display_flag(display_id: int | None) -> str:
+    return f" -d {int(display_id)}" if display_id is not None else ""
+
+
+def _timed(name: str):
+    """记录被装饰调用的次数与耗时（见 get_display_session_stats）。"""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _display_session.record(name, time.perf_counter() - t0)
+
+        return wrapper
+
+    return decorator
+
+
+def reset_display_session() -> None:
+    """任务开始或显示变化时调用：下一次操作会重新准备虚拟显示并聚焦。"""
+    _display_session.invalidate()
+
+
+def get_display_session_stats() -> dict[str, dict[str, float]]:
+    """每类调用的计数与耗时：prepare/focus 的 cached 为命中缓存的次数。"""
+    return _display_session.stats()
+
+
 def _find_task_id_for_package_from_dumpsys(text: str, package_name: str) -> int | None:
     if not text or not package_name:
         return None
@@ -246,44 +402,167 @@ def _resolve_launcher_component(pkg: str) -> str:
     return ""
 
 
-def _is_likely_black_image(img: Image.Image) -> bool:
+_LAUNCH_FLAGS = 0x10000000
+
+# 虚拟显示启动命令，按原有尝试顺序排列。需要 {component} 的策略仅在解析到 LAUNCHER Activity 时可用。
+_LAUNCH_STRATEGIES: list[tuple[str, str]] = [
+    ("start_activity_windowing_reorder", "cmd activity start-activity --user 0 --display {did} --windowingMode 1 --activity-reorder-to-front -n {component} -f {flags}"),
+    ("start_activity_windowing", "cmd activity start-activity --user 0 --display {did} --windowingMode 1 -n {component} -f {flags}"),
+    ("start_activity_reorder", "cmd activity start-activity --user 0 --display {did} --activity-reorder-to-front -n {component} -f {flags}"),
+    ("start_activity_component", "cmd activity start-activity --user 0 --display {did} -n {component} -f {flags}"),
+    ("am_start_component_reorder", "am start --user 0 -n {component} --display {did} --activity-reorder-to-front -f {flags}"),
+    ("am_start_component", "am start --user 0 -n {component} --display {did} -f {flags}"),
+    ("start_activity_package", "cmd activity start-activity --user 0 --display {did} -a android.intent.action.MAIN -c android.intent.category.LAUNCHER -p {pkg}"),
+    ("am_start_package_user", "am start --user 0 --display {did} -a android.intent.action.MAIN -c android.intent.category.LAUNCHER -p {pkg}"),
+    ("am_start_package", "am start --display {did} -a android.intent.action.MAIN -c android.intent.category.LAUNCHER -p {pkg}"),
+    ("monkey", "monkey --display {did} -p {pkg} -c android.intent.category.LAUNCHER 1"),
+]
+
+_launch_cache = JsonCache("shizuku_launch_strategies.json")
+_rom_fingerprint: str | None = None
+
+
+def _get_rom_fingerprint() -> str:
+    global _rom_fingerprint
+    if _rom_fingerprint is None:
+        try:
+            _rom_fingerprint = _exec_text("getprop ro.build.fingerprint").strip() or "unknown"
+        except Exception:
+            return "unknown"
+    return _rom_fingerprint
+
+
+def _is_package_on_display(pkg: str, display_id: int, timeout: float = 0.8) -> bool | None:
+    """检查 pkg 是否已成为目标显示上的 resumed Activity（轮询至 timeout）。
+
+    Returns:
+        是否已在目标显示上 resumed；dumpsys 输出中没有任何 "Display #" 段（该 ROM 无法验证）时返回 None。
+    """
+    display_re = re.compile(r"Display #(\d+)")
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            out = _exec_text(
+                "dumpsys activity activities 2>/dev/null | grep -E 'Display #|ResumedActivity'"
+            )
+        except Exception:
+            out = ""
+        has_sections = False
+        current: int | None = None
+        for line in out.splitlines():
+            m = display_re.search(line)
+            if m:
+                has_sections = True
+                current = int(m.group(1))
+                continue
+            body = line.lstrip()
+            if body.startswith("ResumedActivity") and len(line) - len(body) <= 2:
+                # 末尾的全局 ResumedActivity 汇总行不属于最后一个 Display 段。
+                current = None
+            elif current == display_id and f"{pkg}/" in line:
+                return True
+        if not has_sections:
+            return None
+        if time.monotonic() >= deadline:
+            return False
+        cancellation.sleep(0.15)
+
+
+def _launch_on_virtual_display(pkg: str, did: int) -> str | None:
+    """在虚拟显示上启动应用，优先使用该 (ROM, 包名) 上次验证成功的启动策略。
+
+    Returns:
+        生效的策略名；全部未验证成功或该 ROM 无法验证时返回 None（仍按旧逻辑尽力而为）。
+    """
+    key = f"{_get_rom_fingerprint()}|{pkg}"
+    cached = _launch_cache.get(key) or {}
+    templates = dict(_LAUNCH_STRATEGIES)
+    names = [n for n, _ in _LAUNCH_STRATEGIES] + ["move_task"]
+
+    def fire(name: str, component: str) -> bool:
+        try:
+            if name == "move_task":
+                # Critical: some ROMs ignore --display on start, so we must try moving existing task.
+                return bool(_try_move_existing_task_to_display(pkg, did))
+            template = templates.get(name)
+            if template is None or ("{component}" in template and not component):
+                return False
+            _exec_text(template.format(did=did, component=component, pkg=pkg, flags=_LAUNCH_FLAGS))
+            return True
+        except Exception:
+            return False
+
+    def attempt(name: str, component: str, verify_timeout: float = 0.8) -> bool | None:
+        if not fire(name, component):
+            return False
+        return _is_package_on_display(pkg, did, timeout=verify_timeout)
+
+    def focus() -> None:
+        # Best effort: focus to reduce black frames and input mis-routing.
+        try:
+            _exec_text(f"cmd input set-focused-display {int(did)}")
+            _display_session.mark_focused(int(did))
+        except Exception:
+            pass
+
+    def succeeded(name: str, component: str) -> str:
+        _launch_cache.set(key, {"strategy": name, "component": component})
+        focus()
+        return name
+
+    def fire_rest(component: str, done: set[str]) -> None:
+        # 无法验证时退回旧逻辑：不再逐条等待，依次执行其余全部命令。
+        for name in names:
+            if name not in done:
+                fire(name, component)
+        focus()
+
+    # 第一条命令（缓存的或首个候选）给足冷启动时间：重型应用冷启动常超过 0.8s，
+    # 过早判定失败会让后续候选再次启动应用。
+    first_timeout = max(0.8, TIMING_CONFIG.device.launch_verify_timeout)
+    strategy = cached.get("strategy")
+    done: set[str] = set()
+    if strategy:
+        component = cached.get("component") or ""
+        result = attempt(strategy, component, first_timeout)
+        if result:
+            return succeeded(strategy, component)
+        done.add(strategy)
+        if result is not None:
+            _launch_cache.pop(key)
+
+    # Virtual isolated mode: align with MonitorActivity by preferring explicit component (-n pkg/cls)
+    # and activity-reorder-to-front when possible.
     try:
-        rgb = img.convert("RGB")
-        w, h = rgb.size
-        tw, th = min(64, w), min(64, h)
-        thumb = rgb.resize((tw, th), resample=Image.BILINEAR)
-        pixels = thumb.getdata()
-        non_black = 0
-        for r, g, b in pixels:
-            if r > 10 or g > 10 or b > 10:
-                non_black += 1
-                if non_black >= 20:
-                    return False
-        return True
+        component = _resolve_launcher_component(pkg)
     except Exception:
-        return True
-
-
-def _encode_jpeg_to_target(img: Image.Image, target_bytes: int = 25 * 1024) -> tuple[bytes, str]:
-    def _to_rgb(im: Image.Image) -> Image.Image:
-        if im.mode in ("RGB",):
-            return im
-        if im.mode in ("RGBA", "LA"):
-            bg = Image.new("RGB", im.size, (0, 0, 0))
-            bg.paste(im, mask=im.split()[-1])
-            return bg
-        return im.convert("RGB")
-
-    lo, hi = 25, 85
-    best = None
-    for q in (85, 70, 55, 45, 35, 25):
-        buf = BytesIO()
-        _to_rgb(img).save(buf, format="JPEG", quality=int(q), optimize=True, progressive=True)
-        b = buf.getvalue()
-        best = b
-        if len(b) <= target_bytes:
-            break
-    return best or b"", "image/jpeg"
+        component = ""
+
+    if strategy and result is None:
+        fire_rest(component, done)
+        return None
+
+    last = strategy
+    for name in names:
+        if name in done:
+            continue
+        if last is not None and _is_package_on_display(pkg, did, timeout=0):
+            # 上一条命令只是生效较慢：记录它，不再重复启动。
+            return succeeded(last, component)
+        result = attempt(name, component, 0.8 if last is not None else first_timeout)
+        done.add(name)
+        if result:
+            return succeeded(name, component)
+        if result is None:
+            fire_rest(component, done)
+            return None
+        last = name
+
+    try:
+        _exec_text(f"cmd input set-focused-display {int(did)}")
+    except Exception:
+        pass
+    return None
 
 
 @dataclass
@@ -295,6 +574,7 @@ class Screenshot:
     is_sensitive: bool = False
 
 
+@_timed("get_screenshot")
 def get_screenshot(device_id=None, timeout: int = 10) -> Screenshot:
     # timeout kept for signature compatibility
     _ = device_id
@@ -313,13 +593,15 @@ def get_screenshot(device_id=None, timeout: int = 10) -> Screenshot:
                 png_bytes = base64.b64decode(b64)
                 if png_bytes and len(png_bytes) >= 2048:
                     img = Image.open(BytesIO(png_bytes))
-                    if not _is_likely_black_image(img):
+                    if not is_likely_black_image(img):
                         w, h = img.size
-                        jpeg, mime = _encode_jpeg_to_target(img)
+                        jpeg, mime = encode_jpeg_to_target(img, key="shizuku")
                         b64jpg = base64.b64encode(jpeg).decode("utf-8")
                         return Screenshot(base64_data=b64jpg, width=w, height=h, mime=mime, is_sensitive=False)
         except Exception:
             pass
+        # 虚拟显示抓帧失败/黑屏：下次操作重新准备并聚焦。
+        _display_session.invalidate()
 
     # shell fallback
     if did is not None:
@@ -331,95 +613,91 @@ def get_screenshot(device_id=None, timeout: int = 10) -> Screenshot:
 
     try:
         img = Image.open(BytesIO(png))
-        if _is_likely_black_image(img):
+        if is_likely_black_image(img):
             return _fallback_screenshot(is_sensitive=True)
         w, h = img.size
-        jpeg, mime = _encode_jpeg_to_target(img)
+        jpeg, mime = encode_jpeg_to_target(img, key="shizuku")
         b64 = base64.b64encode(jpeg).decode("utf-8")
         return Screenshot(base64_data=b64, width=w, height=h, mime=mime, is_sensitive=False)
     except Exception:
         return _fallback_screenshot(is_sensitive=False)
 
 
+@_timed("get_frame_fingerprint")
+def get_frame_fingerprint(device_id=None) -> str | None:
+    """Hash the raw framebuffer on the device (used for settle detection)."""
+    _ = device_id
+    did = _ensure_virtual_display_started()
+    cmd = f"screencap -d {int(did)} | md5sum" if did is not None else "screencap | md5sum"
+    try:
+        parts = _exec_text(cmd).split()
+    except Exception:
+        return None
+    if not parts or len(parts[0]) != 32:
+        return None
+    return parts[0]
+
+
 def _fallback_screenshot(is_sensitive: bool) -> Screenshot:
     w, h = 1080, 2400
-    img = Image.new("RGB", (w, h), color="black")
-    jpeg, mime = _encode_jpeg_to_target(img)
-    b64 = base64.b64encode(jpeg).decode("utf-8")
+    b64, mime = fallback_frame(w, h)
     return Screenshot(base64_data=b64, width=w, height=h, mime=mime, is_sensitive=is_sensitive)
 
 
+@_timed("tap")
 def tap(x: int, y: int, device_id=None, delay: float | None = None) -> None:
     _ = device_id
     did = _ensure_virtual_display_started()
     _ensure_virtual_display_focused_best_effort(did)
-    if did is not None:
-        try:
-            from java import jclass
-
-            Vdc = jclass("com.example.autoglm.VirtualDisplayController")
-            Vdc.injectTapBestEffort(int(did), int(x), int(y))
-        except Exception:
-            _exec_text(f"input -d {int(did)} tap {int(x)} {int(y)}")
-    else:
-        _exec_text(f"input tap {int(x)} {int(y)}")
-    time.sleep(delay if delay is not None else 0.15)
+    if not _inject_on_display("injectTapBestEffort", did, int(x), int(y)):
+        did = _display_after_failed_injection(did)
+        _exec_text(f"input{_display_flag(did)} tap {int(x)} {int(y)}")
+    with untimed():
+        cancellation.sleep(delay if delay is not None else 0.15)
 
 
+@_timed("swipe")
 def swipe(start_x: int, start_y: int, end_x: int, end_y: int, duration_ms: int | None = None, device_id=None, delay: float | None = None) -> None:
     _ = device_id
     dur = int(duration_ms) if duration_ms is not None else 600
     did = _ensure_virtual_display_started()
     _ensure_virtual_display_focused_best_effort(did)
-    if did is not None:
-        try:
-            from java import jclass
-
-            Vdc = jclass("com.example.autoglm.VirtualDisplayController")
-            Vdc.injectSwipeBestEffort(int(did), int(start_x), int(start_y), int(end_x), int(end_y), int(dur))
-        except Exception:
-            _exec_text(
-                f"input -d {int(did)} swipe {int(start_x)} {int(start_y)} {int(end_x)} {int(end_y)} {dur}"
-            )
-    else:
-        _exec_text(f"input swipe {int(start_x)} {int(start_y)} {int(end_x)} {int(end_y)} {dur}")
-    time.sleep(delay if delay is not None else 0.2)
+    if not _inject_on_display(
+        "injectSwipeBestEffort", did, int(start_x), int(start_y), int(end_x), int(end_y), dur
+    ):
+        did = _display_after_failed_injection(did)
+        _exec_text(
+            f"input{_display_flag(did)} swipe {int(start_x)} {int(start_y)} {int(end_x)} {int(end_y)} {dur}"
+        )
+    with untimed():
+        cancellation.sleep(delay if delay is not None else 0.2)
 
 
+@_timed("back")
 def back(device_id=None, delay: float | None = None) -> None:
     _ = device_id
     did = _ensure_virtual_display_started()
     _ensure_virtual_display_focused_best_effort(did)
-    if did is not None:
-        try:
-            from java import jclass
-
-            Vdc = jclass("com.example.autoglm.VirtualDisplayController")
-            Vdc.injectBackBestEffort(int(did))
-        except Exception:
-            _exec_text(f"input -d {int(did)} keyevent 4")
-    else:
-        _exec_text("input keyevent 4")
-    time.sleep(delay if delay is not None else 0.2)
+    if not _inject_on_display("injectBackBestEffort", did):
+        did = _display_after_failed_injection(did)
+        _exec_text(f"input{_display_flag(did)} keyevent 4")
+    with untimed():
+        cancellation.sleep(delay if delay is not None else 0.2)
 
 
+@_timed("home")
 def home(device_id=None, delay: float | None = None) -> None:
     _ = device_id
     did = _ensure_virtual_display_started()
     _ensure_virtual_display_focused_best_effort(did)
-    if did is not None:
-        try:
-            from java import jclass
-
-            Vdc = jclass("com.example.autoglm.VirtualDisplayController")
-            Vdc.injectHomeBestEffort(int(did))
-        except Exception:
-            _exec_text(f"input -d {int(did)} keyevent 3")
-    else:
-        _exec_text("input keyevent 3")
-    time.sleep(delay if delay is not None else 0.2)
+    if not _inject_on_display("injectHomeBestEffort", did):
+        did = _display_after_failed_injection(did)
+        _exec_text(f"input{_display_flag(did)} keyevent 3")
+    with untimed():
+        cancellation.sleep(delay if delay is not None else 0.2)
 
 
+@_timed("type_text")
 def type_text(text: str, device_id=None) -> None:
     _ = device_id
     did = _ensure_virtual_display_started()
@@ -435,6 +713,7 @@ def type_text(text: str, device_id=None) -> None:
     _exec_text(f"input text \"{safe}\"")
 
 
+@_timed("clear_text")
 def clear_text(device_id=None) -> None:
     _ = device_id
     did = _ensure_virtual_display_started()
@@ -445,6 +724,7 @@ def clear_text(device_id=None) -> None:
     _exec_text("input keyevent --longpress 67")
 
 
+@_timed("detect_and_set_adb_keyboard")
 def detect_and_set_adb_keyboard(device_id=None) -> str:
     _ = device_id
     did = _ensure_virtual_display_started()
@@ -456,6 +736,7 @@ def detect_and_set_adb_keyboard(device_id=None) -> str:
     return current_ime
 
 
+@_timed("restore_keyboard")
 def restore_keyboard(ime: str, device_id=None) -> None:
     _ = device_id
     did = _ensure_virtual_display_started()
@@ -466,6 +747,23 @@ def restore_keyboard(ime: str, device_id=None) -> None:
     _exec_text(f"ime set {target}")
 
 
+class _ShizukuKeyboardSession(KeyboardSession):
+    """clear_text/type_text 已按 "Broadcast completed" 确认（失败时回退 input），无需固定等待。"""
+
+    def _enter(self, text: str, clear: bool) -> None:
+        if clear:
+            clear_text(self.device_id)
+        type_text(text, self.device_id)
+
+    def _restore(self, ime: str) -> None:
+        restore_keyboard(ime, self.device_id)
+
+
+def create_keyboard_session(device_id=None) -> KeyboardSession:
+    return _ShizukuKeyboardSession(sys.modules[__name__], device_id)
+
+
+@_timed("launch_app")
 def launch_app(app_name: str, device_id=None, delay: float | None = None) -> bool:
     _ = device_id
     pkg = _resolve_package(app_name)
@@ -475,60 +773,7 @@ def launch_app(app_name: str, device_id=None, delay: float | None = None) -> boo
     did = _ensure_virtual_display_started()
 
     if did is not None:
-        # Virtual isolated mode: align with MonitorActivity by preferring explicit component (-n pkg/cls)
-        # and activity-reorder-to-front when possible.
-        component = ""
-        try:
-            component = _resolve_launcher_component(pkg)
-        except Exception:
-            component = ""
-
-        flags = 0x10000000
-        candidates: list[str] = []
-
-        if component:
-            candidates.extend(
-                [
-                    f"cmd activity start-activity --user 0 --display {int(did)} --windowingMode 1 --activity-reorder-to-front -n {component} -f {flags}",
-                    f"cmd activity start-activity --user 0 --display {int(did)} --windowingMode 1 -n {component} -f {flags}",
-                    f"cmd activity start-activity --user 0 --display {int(did)} --activity-reorder-to-front -n {component} -f {flags}",
-                    f"cmd activity start-activity --user 0 --display {int(did)} -n {component} -f {flags}",
-                    f"am start --user 0 -n {component} --display {int(did)} --activity-reorder-to-front -f {flags}",
-                    f"am start --user 0 -n {component} --display {int(did)} -f {flags}",
-                ]
-            )
-
-        # Fallback to old behavior (package-based start + monkey).
-        candidates.extend(
-            [
-                f"cmd activity start-activity --user 0 --display {int(did)} -a android.intent.action.MAIN -c android.intent.category.LAUNCHER -p {pkg}",
-                f"am start --user 0 --display {int(did)} -a android.intent.action.MAIN -c android.intent.category.LAUNCHER -p {pkg}",
-                f"am start --display {int(did)} -a android.intent.action.MAIN -c android.intent.category.LAUNCHER -p {pkg}",
-            ]
-        )
-
-        for c in candidates:
-            try:
-                _exec_text(c)
-            except Exception:
-                pass
-
-        try:
-            _exec_text(f"monkey --display {int(did)} -p {pkg} -c android.intent.category.LAUNCHER 1")
-        except Exception:
-            pass
-
-        # Critical: some ROMs ignore --display on start, so we must try moving existing task.
-        try:
-            _try_move_existing_task_to_display(pkg, int(did))
-        except Exception:
-            pass
-
-        # Best effort: focus to reduce black frames and input mis-routing.
-        try:
-            _exec_text(f"cmd input set-focused-display {int(did)}")
-        except Exception:
-            pass
+        _launch_on_virtual_display(pkg, int(did))
     else:
         # Prefer am start (more direct); fall back to monkey.
         _exec_text(
@@ -546,18 +791,41 @@ def launch_app(app_name: str, device_id=None, delay: float | None = None) -> boo
             )
         )
         _exec_text(f"monkey -p {pkg} -c android.intent.category.LAUNCHER 1")
-    time.sleep(delay if delay is not None else 0.6)
+    with untimed():
+        cancellation.sleep(delay if delay is not None else 0.6)
     return True
 
 
-def get_current_app(device_id=None) -> str:
+def _query_focus(device_id=None) -> str:
     _ = device_id
-    out = _exec_text("dumpsys window | grep -E 'mCurrentFocus|mFocusedApp' -m 1")
-    return out.strip() or "System"
+    return _exec_text(
+        "dumpsys window displays 2>/dev/null | grep -E 'mCurrentFocus|mFocusedApp'"
+    )
+
+
+def _query_focus_full(device_id=None) -> str:
+    _ = device_id
+    return _exec_text("dumpsys window 2>/dev/null | grep -E 'mCurrentFocus|mFocusedApp'")
+
+
+_foreground = ForegroundAppDetector([_query_focus, _query_focus_full])
+
+
+def get_current_app(device_id=None) -> str:
+    # 与 ADB 后端共用前台应用检测：按包名反查应用名，动作执行后失效缓存。
+    try:
+        return _foreground.get(device_id)
+    except ValueError:
+        return "System Home"
+
+
+def invalidate_current_app(device_id=None) -> None:
+    _foreground.invalidate(device_id)
 
 
 __all__ = [
     "get_screenshot",
+    "get_frame_fingerprint",
     "tap",
     "swipe",
     "back",
@@ -566,7 +834,11 @@ __all__ = [
     "clear_text",
     "detect_and_set_adb_keyboard",
     "restore_keyboard",
+    "create_keyboard_session",
     "launch_app",
     "get_current_app",
+    "invalidate_current_app",
+    "reset_display_session",
+    "get_display_session_stats",
     "Screenshot",
 ]
@@ -10,6 +10,8 @@ from io import BytesIO
 
 from PIL import Image
 
+from phone_agent.imaging import fallback_frame
+
 
 @dataclass
 class Screenshot:
@@ -169,10 +171,7 @@ def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
     # Default iPhone screen size (iPhone 14 Pro)
     default_width, default_height = 1179, 2556
 
-    black_img = Image.new("RGB", (default_width, default_height), color="black")
-    buffered = BytesIO()
-    black_img.save(buffered, format="PNG")
-    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
+    base64_data, _ = fallback_frame(default_width, default_height, image_format="PNG")
 
     return Screenshot(
         base64_data=base64_data,